@@ -0,0 +1,48 @@
+from fastapi import Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, exists, or_
+from .auth import get_current_user
+from .db import get_db
+from .models import Event, CompanyMember, User
+
+
+def event_access_clause(user_id: int):
+    """Условие «событие видно пользователю»: своё или компании, где он участник (EXISTS)."""
+    return or_(
+        Event.user_id == user_id,
+        exists().where(CompanyMember.company_id == Event.company_id, CompanyMember.user_id == user_id),
+    )
+
+
+async def get_user_company_ids(db: AsyncSession, user_id: int) -> tuple[int, ...]:
+    result = await db.execute(select(CompanyMember.company_id).where(CompanyMember.user_id == user_id))
+    return tuple(result.scalars().all())
+
+
+async def current_company_ids(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+) -> tuple[int, ...]:
+    """Компании текущего пользователя: из БД, один раз за запрос.
+
+    Между запросами не кэшируется: исключённый из компании участник
+    теряет доступ сразу, в том числе в других процессах.
+    """
+    company_ids = getattr(request.state, "company_ids", None)
+    if company_ids is None:
+        company_ids = request.state.company_ids = await get_user_company_ids(db, user.id)
+    return company_ids
+
+
+async def get_accessible_event(
+    event_id: int,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+) -> Event:
+    """Событие, доступное пользователю, за один запрос к БД; иначе 404."""
+    result = await db.execute(select(Event).where(Event.id == event_id, event_access_clause(user.id)))
+    event = result.scalar_one_or_none()
+    if not event:
+        raise HTTPException(status_code=404, detail="Event not found")
+    return event
@@ -1,4 +1,8 @@
-from datetime import datetime, timedelta
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
@@ -6,30 +10,105 @@ from jose import jwt, JWTError
 from passlib.context import CryptContext
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from .cache import LRUCache
 from .config import settings
 from .db import get_db
 from .models import User
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+# min/max = default: хэш с другим числом раундов считается устаревшим и перехэшируется при входе
+pwd_context = CryptContext(
+    schemes=["pbkdf2_sha256"],
+    deprecated="auto",
+    pbkdf2_sha256__default_rounds=settings.password_hash_rounds,
+    pbkdf2_sha256__min_rounds=settings.password_hash_rounds,
+    pbkdf2_sha256__max_rounds=settings.password_hash_rounds,
+)
+_hash_executor: Optional[ThreadPoolExecutor] = None
 
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+async def _run_hasher(func, *args):
+    # pbkdf2 занимает десятки миллисекунд; hashlib отпускает GIL, поэтому потоки работают параллельно,
+    # а размер пула ограничивает число одновременных хэширований
+    global _hash_executor
+    if settings.password_hash_workers <= 0:
+        return func(*args)
+    if _hash_executor is None:
+        _hash_executor = ThreadPoolExecutor(max_workers=settings.password_hash_workers, thread_name_prefix="pwhash")
+    return await asyncio.get_running_loop().run_in_executor(_hash_executor, func, *args)
 
 
-def verify_password(password: str, password_hash: str) -> bool:
-    return pwd_context.verify(password, password_hash)
+async def hash_password_async(password: str) -> str:
+    return await _run_hasher(pwd_context.hash, password)
 
 
-def create_access_token(subject: str, expires_delta: Optional[timedelta] = None) -> str:
+async def verify_and_update_password(password: str, password_hash: str) -> tuple[bool, Optional[str]]:
+    """Проверить пароль вне event loop; второй элемент — новый хэш, если параметры хэширования поменялись."""
+    return await _run_hasher(pwd_context.verify_and_update, password, password_hash)
+
+
+def close_password_hasher() -> None:
+    global _hash_executor
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=False)
+        _hash_executor = None
+
+
+def create_access_token(subject: str, expires_delta: Optional[timedelta] = None, user_id: Optional[int] = None) -> str:
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=settings.access_token_expire_minutes))
     to_encode = {"sub": subject, "exp": expire}
+    if user_id is not None:
+        # по uid пользователь ищется по первичному ключу
+        to_encode["uid"] = user_id
     return jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
 
 
+@dataclass(frozen=True)
+class _Principal:
+    id: int
+    name: Optional[str]
+    email: str
+    telegram_id: Optional[str]
+    # time.monotonic() до чтения строки users — сравнивается с моментом инвалидации
+    loaded_at: float
+
+
+# токен -> проверенный пользователь; запись живёт не дольше токена и auth_cache_ttl_seconds
+_principal_cache = LRUCache(maxsize=settings.auth_cache_size, ttl=settings.auth_cache_ttl_seconds)
+# user_id -> момент последнего изменения строки users; запись нужна не дольше, чем живут
+# закэшированные до неё токены, поэтому размер и TTL те же, что у кэша токенов
+_invalidated_at = LRUCache(maxsize=settings.auth_cache_size, ttl=settings.auth_cache_ttl_seconds)
+
+
+def invalidate_user(user_id: int) -> None:
+    """Сбросить кэшированные токены пользователя (например, после привязки Telegram)."""
+    evictions = _invalidated_at.evictions
+    _invalidated_at.set(user_id, time.monotonic())
+    if _invalidated_at.evictions != evictions:
+        # вытесненная отметка могла ещё защищать чужие токены — сбрасываем кэш целиком
+        _principal_cache.clear()
+
+
+def clear_principal_cache() -> None:
+    _principal_cache.clear()
+    _invalidated_at.clear()
+
+
+def principal_cache_stats() -> dict:
+    return _principal_cache.stats()
+
+
+def _as_user(principal: _Principal) -> User:
+    # отдельный объект на каждый запрос, чтобы обработчики не делили состояние
+    return User(id=principal.id, name=principal.name, email=principal.email, telegram_id=principal.telegram_id)
+
+
 async def get_current_user(db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme)) -> User:
+    principal = _principal_cache.get(token)
+    if principal is not None and principal.loaded_at > _invalidated_at.get(principal.id, 0.0):
+        return _as_user(principal)
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -43,10 +122,20 @@ async def get_current_user(db: AsyncSession = Depends(get_db), token: str = Depe
     except JWTError:
         raise credentials_exception
 
-    result = await db.execute(select(User).where(User.email == email))
+    loaded_at = time.monotonic()
+    user_id = payload.get("uid")
+    if user_id is not None:
+        result = await db.execute(select(User).where(User.id == user_id))
+    else:
+        result = await db.execute(select(User).where(User.email == email))
     user = result.scalar_one_or_none()
     if user is None:
         raise credentials_exception
+
+    lifetime = payload["exp"] - datetime.now(timezone.utc).timestamp()
+    if lifetime > 0:
+        principal = _Principal(user.id, user.name, user.email, user.telegram_id, loaded_at)
+        _principal_cache.set(token, principal, ttl=min(lifetime, settings.auth_cache_ttl_seconds))
     return user
 
 
@@ -8,6 +8,92 @@ class Settings(BaseSettings):
     algorithm: str = "HS256"
     bot_token: str = ""
     api_url: str = "http://localhost:8000"
+    # реплика для GET-маршрутов; пусто — читаем с основной базы
+    database_read_url: str = ""
+    # пул соединений (для Postgres; SQLite работает с пулом по умолчанию)
+    db_pool_size: int = 10
+    db_max_overflow: int = 20
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_statement_cache_size: int = 100
+    # режим SQLite: прагмы (WAL, synchronous=NORMAL, mmap, кэш) и один писатель,
+    # который коммитит мелкие записи маршрутов пачками
+    sqlite_tuning: bool = True
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_cache_size_kb: int = 64 * 1024
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_write_batching: bool = True
+    sqlite_write_batch_size: int = 100
+    sqlite_write_batch_delay_ms: float = 2.0
+    # при старте применять недостающие миграции; False — только проверить ревизию
+    database_auto_migrate: bool = True
+    # сколько напоминаний диспетчер забирает из БД за один запрос
+    reminder_batch_size: int = 500
+    # таймер держит в памяти напоминания ближайших N минут; опрос БД остаётся страховкой
+    reminder_timer_horizon_minutes: int = 15
+    reminder_sweep_seconds: int = 60
+    # отправка в Telegram: адрес Bot API (можно указать локальный фейковый сервер) и лимиты
+    telegram_api_url: str = "https://api.telegram.org"
+    # транспорт уведомлений: "telegram" или "fake" (в памяти, для тестов и бенчмарков)
+    notification_backend: str = "telegram"
+    telegram_http2: bool = True
+    telegram_max_connections: int = 100
+    telegram_max_keepalive: int = 20
+    telegram_keepalive_expiry: float = 30.0
+    telegram_connect_timeout: float = 5.0
+    telegram_read_timeout: float = 10.0
+    telegram_pool_timeout: float = 5.0
+    # режим webhook для бота: секрет обязателен (заголовок X-Telegram-Bot-Api-Secret-Token),
+    # публичный адрес — если приложение само регистрирует webhook при старте
+    telegram_webhook_secret: str = ""
+    telegram_webhook_url: str = ""
+    delivery_workers: int = 16
+    telegram_global_rate: float = 30.0
+    telegram_chat_rate: float = 1.0
+    # повторы в памяти движка доставки; диспетчер напоминаний их не использует — его повторы ведёт ledger
+    delivery_max_retries: int = 3
+    # кэш получателей корпоративных напоминаний (company_id -> chat id)
+    recipient_directory_size: int = 10000
+    recipient_directory_ttl_seconds: float = 300.0
+    # повторяющиеся события: на сколько часов вперёд создавать напоминания
+    recurrence_horizon_hours: int = 24
+    recurrence_batch_size: int = 500
+    recurrence_max_occurrences: int = 1000
+    # правила повторения чаще этого интервала (MINUTELY, SECONDLY, поминутный cron) отклоняются
+    recurrence_min_interval_minutes: int = 60
+    # компакция: отправленные напоминания старше N дней переносятся в reminders_archive
+    # (или удаляются при reminder_compaction_archive=False) пачками, раз в сутки в указанный час UTC
+    reminder_retention_days: int = 30
+    reminder_compaction_archive: bool = True
+    reminder_compaction_batch_size: int = 1000
+    reminder_compaction_hour: int = 3
+    # массовый импорт событий: сколько событий вставляется одной транзакцией
+    import_chunk_size: int = 1000
+    # хэширование паролей: число раундов pbkdf2 (хэши с другим числом обновляются при входе)
+    # и потоков, в которых оно выполняется; 0 — прямо в event loop
+    password_hash_rounds: int = 29000
+    password_hash_workers: int = 4
+    # кэш проверенных токенов в get_current_user; другие процессы увидят изменения пользователя не позже чем через TTL
+    auth_cache_size: int = 10000
+    auth_cache_ttl_seconds: float = 60.0
+    # GET /events: размер страницы по умолчанию и жёсткий предел
+    events_page_size: int = 200
+    events_page_max: int = 1000
+    # GET /events: наибольшая длина окна from..to, в котором разворачиваются повторения
+    events_window_max_days: int = 366
+    # GET /companies/{id}/members: размер страницы по умолчанию и жёсткий предел
+    members_page_size: int = 200
+    members_page_max: int = 1000
+    # POST /companies/{id}/members/bulk: сколько email можно прислать за раз
+    members_bulk_max: int = 5000
+    # GET /metrics (формат Prometheus) и замер латентности маршрутов;
+    # если задан metrics_token, /metrics требует заголовок Authorization: Bearer <token>
+    metrics_enabled: bool = True
+    metrics_token: str = ""
+    # повторы недоставленных получателей между тиками диспетчера
+    delivery_max_attempts: int = 5
+    delivery_retry_seconds: int = 60
 
     class Config:
         env_file = ".env"
@@ -1,5 +1,9 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+import threading
+import time
+from sqlalchemy import event, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from .config import settings
 
 
@@ -7,12 +11,133 @@ class Base(DeclarativeBase):
     pass
 
 
-engine = create_async_engine(settings.database_url, echo=False, future=True)
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Очередь соединений, которая считает, сколько запросы ждали свободное соединение.
+
+    Ожиданием считается только выдача из исчерпанного пула (нет свободных
+    соединений и места для переполнения); остальные выдачи, включая открытие
+    нового соединения, попадают только в `checkout_count`.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkout_count = 0
+        self.wait_count = 0
+        self.wait_seconds = 0.0
+        self.wait_max = 0.0
+
+    def _exhausted(self) -> bool:
+        return self.checkedin() == 0 and self._max_overflow > -1 and self.overflow() >= self._max_overflow
+
+    def _do_get(self):
+        exhausted = self._exhausted()
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self.checkout_count += 1
+                if exhausted:
+                    self.wait_count += 1
+                    self.wait_seconds += waited
+                    self.wait_max = max(self.wait_max, waited)
+
+
+def configure_sqlite(engine: AsyncEngine) -> None:
+    """Режим SQLite: WAL, synchronous=NORMAL, mmap и кэш страниц, ожидание блокировки, внешние ключи.
+
+    Заодно транзакции открываются явным BEGIN (рецепт SQLAlchemy для pysqlite):
+    без этого драйвер сам решает, когда начинать транзакцию, и SAVEPOINT не работает.
+    """
+    pragmas = (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA mmap_size={settings.sqlite_mmap_size}",
+        f"PRAGMA cache_size=-{settings.sqlite_cache_size_kb}",
+        f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}",
+        "PRAGMA foreign_keys=ON",
+        "PRAGMA temp_store=MEMORY",
+    )
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    @event.listens_for(engine.sync_engine, "begin")
+    def on_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+
+
+def is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def create_engine(url: str) -> AsyncEngine:
+    created = create_async_engine(url, **engine_options(url))
+    if is_sqlite(url) and settings.sqlite_tuning:
+        configure_sqlite(created)
+    return created
+
+
+def engine_options(url: str) -> dict:
+    """Параметры пула из настроек; у SQLite пул по умолчанию (своих настроек там нет)."""
+    parsed = make_url(url)
+    options = {"echo": False, "pool_pre_ping": settings.db_pool_pre_ping}
+    if parsed.get_backend_name() == "sqlite":
+        return options
+    options.update(
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+    )
+    if parsed.get_driver_name() == "asyncpg":
+        # кэш подготовленных запросов asyncpg; 0 — для pgbouncer в режиме transaction
+        options["connect_args"] = {"statement_cache_size": settings.db_statement_cache_size}
+    return options
+
+
+def pool_stats(engine: AsyncEngine) -> dict:
+    """Снимок пула: занятые и свободные соединения, переполнение, ожидание свободного соединения."""
+    pool = engine.sync_engine.pool
+    stats = {"checked_out": pool.checkedout() if hasattr(pool, "checkedout") else 0}
+    if hasattr(pool, "size"):
+        stats.update(size=pool.size(), checked_in=pool.checkedin(), overflow=max(pool.overflow(), 0))
+    if isinstance(pool, InstrumentedQueuePool):
+        stats.update(
+            checkout_count=pool.checkout_count,
+            wait_count=pool.wait_count,
+            wait_seconds_total=pool.wait_seconds,
+            wait_seconds_max=pool.wait_max,
+        )
+    return stats
+
+
+engine = create_engine(settings.database_url)
 AsyncSessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
 
+# реплика для чтения; без database_read_url читаем с основной базы
+read_engine = create_engine(settings.database_read_url) if settings.database_read_url else engine
+ReadSessionLocal = async_sessionmaker(bind=read_engine, expire_on_commit=False, class_=AsyncSession)
+
 
 async def get_db() -> AsyncSession:
     async with AsyncSessionLocal() as session:
         yield session
 
 
+async def get_read_db() -> AsyncSession:
+    """Сессия только для чтения (GET-маршруты): реплика, если настроена.
+
+    Реплика может отставать на доли секунды — маршруты, которым нужно
+    прочитать только что записанное, используют get_db.
+    """
+    async with ReadSessionLocal() as session:
+        yield session
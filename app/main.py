@@ -1,11 +1,19 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .db import engine, Base
+from .config import settings
+from .db import engine
+from .schema import ensure_schema
+from .auth import close_password_hasher
 from .routes_auth import router as auth_router
 from .routes_events import router as events_router
 from .routes_telegram import router as telegram_router
 from .routes_companies import router as companies_router
-from .services_scheduler import start_scheduler
+from .routes_metrics import router as metrics_router
+from .metrics import MetricsMiddleware
+from .services_scheduler import start_scheduler, stop_scheduler
+from .services_delivery import delivery_engine
+from .services_writer import write_batcher
+from .services_notifications import init_notifications, close_notifications
 
 # FastAPI app
 app = FastAPI(title="Calendar Reminder API")
@@ -24,8 +32,13 @@ app.add_middleware(
     allow_credentials=True,     # куки/авторизация
     allow_methods=["*"],        # GET/POST/PUT/DELETE/OPTIONS
     allow_headers=["*"],        # любые заголовки (в т.ч. Content-Type, Authorization)
+    expose_headers=["X-Next-Cursor"],  # курсор следующей страницы GET /events
 )
 
+if settings.metrics_enabled:
+    # латентность маршрутов для /metrics
+    app.add_middleware(MetricsMiddleware)
+
 @app.get("/health")
 async def health():
     return {"status": "ok"}
@@ -33,66 +46,40 @@ async def health():
 
 @app.on_event("startup")
 async def on_startup():
-    # Create tables if not exist (for dev). In prod use Alembic.
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-        # lightweight auto-migration to ensure corporate column exists on events
-        # 1) add company_id column if missing
-        await conn.exec_driver_sql(
-            """
-            DO $$
-            BEGIN
-                IF NOT EXISTS (
-                    SELECT 1
-                    FROM information_schema.columns
-                    WHERE table_name = 'events' AND column_name = 'company_id'
-                ) THEN
-                    ALTER TABLE events ADD COLUMN company_id INTEGER;
-                END IF;
-            END
-            $$;
-            """
-        )
-        # 2) add index for company_id if missing
-        await conn.exec_driver_sql(
-            """
-            DO $$
-            BEGIN
-                IF NOT EXISTS (
-                    SELECT 1 FROM pg_class c
-                    JOIN pg_namespace n ON n.oid = c.relnamespace
-                    WHERE c.relname = 'ix_events_company_id' AND n.nspname = 'public'
-                ) THEN
-                    CREATE INDEX ix_events_company_id ON events (company_id);
-                END IF;
-            END
-            $$;
-            """
-        )
-        # 3) add foreign key to companies if missing
-        await conn.exec_driver_sql(
-            """
-            DO $$
-            BEGIN
-                IF NOT EXISTS (
-                    SELECT 1
-                    FROM pg_constraint
-                    WHERE conname = 'fk_events_company_id_companies_id'
-                ) THEN
-                    ALTER TABLE events
-                    ADD CONSTRAINT fk_events_company_id_companies_id
-                    FOREIGN KEY (company_id) REFERENCES companies (id) ON DELETE CASCADE;
-                END IF;
-            END
-            $$;
-            """
-        )
+    # схема ведётся миграциями Alembic (migrations/); при актуальной ревизии DDL не выполняется
+    await ensure_schema(engine)
+    await init_notifications()
     start_scheduler()
+    if settings.telegram_webhook_secret:
+        # бот работает внутри приложения: апдейты приходят в POST /telegram/webhook;
+        # aiogram импортируется долго, поэтому только в этом режиме
+        from src import bot as telegram_bot
+
+        await telegram_bot.start_webhook(
+            app,
+            token=settings.bot_token,
+            webhook_url=settings.telegram_webhook_url,
+            secret=settings.telegram_webhook_secret,
+        )
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await stop_scheduler()
+    await delivery_engine.close()
+    await write_batcher.close()
+    await close_notifications()
+    close_password_hasher()
+    if settings.telegram_webhook_secret:
+        from src import bot as telegram_bot
+
+        await telegram_bot.stop_webhook()
 
 
 app.include_router(auth_router)
 app.include_router(events_router)
 app.include_router(telegram_router)
 app.include_router(companies_router)
+app.include_router(metrics_router)
 
 
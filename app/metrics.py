@@ -0,0 +1,204 @@
+import math
+import time
+from bisect import bisect_left
+from typing import Callable, Iterable, Optional
+
+
+# границы гистограмм по умолчанию, секунды
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# (имя, тип, описание, [(метки, значение)]) — так коллекторы отдают снимки чужой статистики
+Family = tuple[str, str, str, list[tuple[dict, float]]]
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+class Registry:
+    """Метрики процесса и коллекторы снимков; `render()` — текстовый формат Prometheus 0.0.4."""
+
+    def __init__(self):
+        self._metrics: list["_Metric"] = []
+        self._collectors: list[Callable[[], Iterable[Family]]] = []
+
+    def register(self, metric: "_Metric") -> None:
+        self._metrics.append(metric)
+
+    def collector(self, collect: Callable[[], Iterable[Family]]) -> Callable[[], Iterable[Family]]:
+        """Зарегистрировать функцию, которая при выдаче снимает значения (пулы, кэши, движок доставки)."""
+        self._collectors.append(collect)
+        return collect
+
+    def render(self) -> str:
+        lines: list[str] = []
+        families: list[Family] = [metric.collect() for metric in self._metrics]
+        for collect in self._collectors:
+            families.extend(collect())
+        for name, kind, documentation, samples in families:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                sample_name = labels.pop("__name__", name)
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), registry: Registry = registry):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple, object] = {}
+        registry.register(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: tuple) -> dict:
+        return dict(zip(self.labelnames, key))
+
+    def collect(self) -> Family:
+        return self.name, self.kind, self.documentation, [
+            (self._labels(key), value) for key, value in self._values.items()
+        ]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    """Гистограмма с фиксированными границами: наблюдение — bisect и два сложения."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (),
+                 buckets: tuple[float, ...] = DEFAULT_BUCKETS, registry: Registry = registry):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            # счётчики по корзинам (последняя — +Inf), сумма, количество
+            state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def collect(self) -> Family:
+        samples = []
+        for key, (counts, total, count) in self._values.items():
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                samples.append(({"__name__": f"{self.name}_bucket", **labels, "le": _format_value(bound)}, cumulative))
+            samples.append(({"__name__": f"{self.name}_sum", **labels}, total))
+            samples.append(({"__name__": f"{self.name}_count", **labels}, count))
+        return self.name, self.kind, self.documentation, samples
+
+
+# диспетчер напоминаний
+dispatch_lag_seconds = Histogram(
+    "reminder_dispatch_lag_seconds",
+    "Delay between remind_at and a successful send",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0),
+)
+dispatch_tick_seconds = Histogram(
+    "reminder_dispatch_tick_seconds", "Duration of one dispatcher tick (expansion and sending)",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0),
+)
+dispatch_ticks_total = Counter("reminder_dispatch_ticks_total", "Dispatcher ticks by outcome", ("outcome",))
+reminders_sent_total = Counter("reminders_sent_total", "Reminders whose deliveries all reached a final status")
+due_backlog = Gauge("reminders_due_backlog", "Unsent reminders whose remind_at has passed")
+due_oldest_seconds = Gauge("reminders_due_oldest_seconds", "Age of the oldest unsent due reminder")
+
+# отправка в Telegram (и другие бэкенды уведомлений)
+send_seconds = Histogram("notification_send_seconds", "Notification send latency", ("backend",))
+sends_total = Counter(
+    "notification_sends_total", "Notification sends by response status (0 — transport error)", ("backend", "status")
+)
+
+# HTTP
+http_request_seconds = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route", "status"),
+)
+
+
+class MetricsMiddleware:
+    """ASGI-middleware: латентность запросов по шаблону маршрута (/events/{event_id}, а не /events/42).
+
+    Чистый ASGI без BaseHTTPMiddleware — не буферизует потоковые ответы и
+    добавляет к запросу только замер времени и одно наблюдение гистограммы.
+    Время считается до начала ответа (заголовков): у потоковых ответов
+    длительность выдачи тела зависит от клиента.
+    """
+
+    def __init__(self, app, histogram: Histogram = http_request_seconds):
+        self.app = app
+        self.histogram = histogram
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status: Optional[int] = None
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                self._observe(scope, status, started)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            if status is None:
+                self._observe(scope, 500, started)
+            raise
+
+    def _observe(self, scope, status: int, started: float) -> None:
+        route = scope.get("route")
+        # запросы мимо маршрутов (404) в одну серию, чтобы сканеры не плодили метки
+        path = getattr(route, "path", None) or "unmatched"
+        self.histogram.observe(time.perf_counter() - started, method=scope["method"], route=path, status=status)
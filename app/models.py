@@ -1,6 +1,6 @@
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import String, Integer, DateTime, Boolean, ForeignKey, Text
+from sqlalchemy import String, Integer, DateTime, Boolean, ForeignKey, Text, Index, UniqueConstraint, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from .db import Base
 
@@ -30,6 +30,8 @@ class Event(Base):
     description: Mapped[Optional[str]] = mapped_column(Text)
     start_time: Mapped[datetime] = mapped_column(DateTime, index=True)
     recurrence: Mapped[Optional[str]] = mapped_column(String(50))  # e.g. cron or RRULE
+    reminder_offsets: Mapped[Optional[str]] = mapped_column(String(255))  # минуты до начала, "0,5,30"
+    expanded_until: Mapped[Optional[datetime]] = mapped_column(DateTime, index=True, nullable=True)  # до какого момента созданы напоминания повторений
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
     user: Mapped["User"] = relationship(back_populates="events")
@@ -39,6 +41,14 @@ class Event(Base):
 
 class Reminder(Base):
     __tablename__ = "reminders"
+    # диспетчер ищет неотправленные напоминания, у которых наступило время; частичный
+    # индекс содержит только их и не растёт вместе с историей отправленных
+    __table_args__ = (
+        Index(
+            "ix_reminders_pending_remind_at", "remind_at", "id",
+            sqlite_where=text("sent = 0"), postgresql_where=text("sent = false"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     event_id: Mapped[int] = mapped_column(ForeignKey("events.id", ondelete="CASCADE"), index=True)
@@ -46,6 +56,35 @@ class Reminder(Base):
     sent: Mapped[bool] = mapped_column(Boolean, default=False)
 
     event: Mapped["Event"] = relationship(back_populates="reminders")
+    deliveries: Mapped[list["ReminderDelivery"]] = relationship(back_populates="reminder", cascade="all, delete-orphan")
+
+
+class ReminderArchive(Base):
+    """Отправленные напоминания старше срока хранения, перенесённые из reminders (services_compaction)."""
+    __tablename__ = "reminders_archive"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # id исходной строки reminders; не ключ — SQLite переиспользует освободившиеся id
+    reminder_id: Mapped[int] = mapped_column(Integer, index=True)
+    # без внешнего ключа: архив переживает удаление события
+    event_id: Mapped[int] = mapped_column(Integer, index=True)
+    remind_at: Mapped[datetime] = mapped_column(DateTime)
+    archived_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+
+class ReminderDelivery(Base):
+    __tablename__ = "reminder_deliveries"
+    __table_args__ = (UniqueConstraint("reminder_id", "chat_id", name="uq_reminder_deliveries_reminder_chat"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    reminder_id: Mapped[int] = mapped_column(ForeignKey("reminders.id", ondelete="CASCADE"), index=True)
+    chat_id: Mapped[str] = mapped_column(String(64))
+    status: Mapped[str] = mapped_column(String(16), default="pending")  # pending, sent, failed, retry
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    next_attempt_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+    reminder: Mapped["Reminder"] = relationship(back_populates="deliveries")
 
 
 class TelegramLink(Base):
@@ -76,6 +115,12 @@ class Company(Base):
 
 class CompanyMember(Base):
     __tablename__ = "company_members"
+    __table_args__ = (
+        # проверки доступа: EXISTS (участник user_id в компании company_id)
+        Index("ix_company_members_user_company", "user_id", "company_id"),
+        # список участников страницами по (joined_at, id)
+        Index("ix_company_members_company_joined", "company_id", "joined_at", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
     company_id: Mapped[int] = mapped_column(ForeignKey("companies.id", ondelete="CASCADE"), index=True)
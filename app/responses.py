@@ -0,0 +1,66 @@
+import base64
+import json
+from datetime import datetime
+from typing import AsyncIterator, Iterable, Optional, Union
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+try:
+    import orjson
+except ImportError:  # orjson необязателен: без него работает стандартный json
+    orjson = None
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        # как у pydantic: naive datetime без смещения
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON-ответ из готовых dict/list без валидации через pydantic."""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def encode_cursor(moment: datetime, row_id: int) -> str:
+    """Курсор keyset-пагинации по (время, id) для заголовка X-Next-Cursor."""
+    raw = f"{moment.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        moment_str, id_str = raw.split("|", 1)
+        return datetime.fromisoformat(moment_str), int(id_str)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+
+
+def wants_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def ndjson_response(items: Union[Iterable[dict], AsyncIterator[dict]], headers: Optional[dict] = None) -> StreamingResponse:
+    """Потоковый ответ: по JSON-объекту на строку, без сборки всего списка в памяти."""
+    if hasattr(items, "__aiter__"):
+        async def body():
+            async for item in items:
+                yield dumps(item) + b"\n"
+    else:
+        def body():
+            for item in items:
+                yield dumps(item) + b"\n"
+    return StreamingResponse(body(), media_type=NDJSON_MEDIA_TYPE, headers=headers)
@@ -2,11 +2,13 @@ from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
 from .db import get_db
 from .models import User
 from .schemas import UserCreate, UserOut, Token
-from .auth import hash_password, verify_password, create_access_token, get_current_user
+from .services_writer import write_batcher
+from .auth import hash_password_async, verify_and_update_password, create_access_token, get_current_user
 
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -17,20 +19,38 @@ async def register(user_in: UserCreate, db: AsyncSession = Depends(get_db)):
     exists = await db.execute(select(User).where(User.email == user_in.email))
     if exists.scalar_one_or_none():
         raise HTTPException(status_code=400, detail="Email already registered")
-    user = User(name=user_in.name, email=user_in.email, password_hash=hash_password(user_in.password))
-    db.add(user)
-    await db.commit()
-    await db.refresh(user)
-    return user
+    password_hash = await hash_password_async(user_in.password)
+
+    async def insert_user(session: AsyncSession) -> User:
+        user = User(name=user_in.name, email=user_in.email, password_hash=password_hash)
+        session.add(user)
+        return user
+
+    try:
+        return await write_batcher.submit(insert_user, db)
+    except IntegrityError:
+        # тот же email успели зарегистрировать параллельным запросом
+        raise HTTPException(status_code=400, detail="Email already registered")
 
 
 @router.post("/login", response_model=Token)
 async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(User).where(User.email == form_data.username))
     user = result.scalar_one_or_none()
-    if user is None or not verify_password(form_data.password, user.password_hash):
+    if user is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
-    token = create_access_token(subject=user.email, expires_delta=timedelta(minutes=60))
+    verified, new_hash = await verify_and_update_password(form_data.password, user.password_hash)
+    if not verified:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    if new_hash:
+        # поменялось число раундов — тихо перехэшируем пароль
+        user_id = user.id
+
+        async def rehash(session: AsyncSession) -> None:
+            await session.execute(update(User).where(User.id == user_id).values(password_hash=new_hash))
+
+        await write_batcher.submit(rehash, db)
+    token = create_access_token(subject=user.email, expires_delta=timedelta(minutes=60), user_id=user.id)
     return {"access_token": token, "token_type": "bearer"}
 
 
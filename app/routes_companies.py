@@ -1,10 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException
+import csv
+import io
+import json
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete, update
-from .db import get_db
+from sqlalchemy import select, delete, exists, insert, update, and_, or_
+from sqlalchemy.orm import aliased
+from sqlalchemy.orm.attributes import set_committed_value
+from .config import settings
+from .db import get_db, get_read_db
 from .models import Company, CompanyMember, User
 from .schemas import CompanyCreate, CompanyOut, CompanyMemberCreate, CompanyMemberOut, UserOut
 from .auth import get_current_user
+from .services_directory import recipient_directory
+from .responses import FastJSONResponse, decode_cursor, encode_cursor
+from .services_writer import write_batcher
 
 router = APIRouter(prefix="/companies", tags=["companies"])
 
@@ -16,29 +26,33 @@ async def create_company(
     user: User = Depends(get_current_user)
 ):
     """Создать новую компанию"""
-    company = Company(
-        name=payload.name,
-        description=payload.description,
-        created_by=user.id
-    )
-    db.add(company)
-    await db.flush()
-    
-    # Автоматически добавляем создателя как владельца компании
-    member = CompanyMember(
-        company_id=company.id,
-        user_id=user.id,
-        role="owner"
-    )
-    db.add(member)
-    await db.commit()
-    await db.refresh(company)
+    user_id = user.id
+
+    async def insert_company(session: AsyncSession) -> Company:
+        company = Company(
+            name=payload.name,
+            description=payload.description,
+            created_by=user_id
+        )
+        session.add(company)
+        await session.flush()
+
+        # Автоматически добавляем создателя как владельца компании
+        member = CompanyMember(
+            company_id=company.id,
+            user_id=user_id,
+            role="owner"
+        )
+        session.add(member)
+        return company
+
+    company = await write_batcher.submit(insert_company, db)
     return company
 
 
 @router.get("/", response_model=list[CompanyOut])
 async def list_my_companies(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     user: User = Depends(get_current_user)
 ):
     """Получить список компаний, в которых состоит пользователь"""
@@ -54,7 +68,7 @@ async def list_my_companies(
 @router.get("/{company_id}", response_model=CompanyOut)
 async def get_company(
     company_id: int,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     user: User = Depends(get_current_user)
 ):
     """Получить информацию о компании"""
@@ -95,8 +109,11 @@ async def delete_company(
     if not member:
         raise HTTPException(status_code=403, detail="Только владелец может удалить компанию")
     
-    await db.execute(delete(Company).where(Company.id == company_id))
-    await db.commit()
+    async def delete_company_rows(session: AsyncSession) -> None:
+        await session.execute(delete(Company).where(Company.id == company_id))
+
+    await write_batcher.submit(delete_company_rows, db)
+    recipient_directory.invalidate(company_id)
     return {"status": "deleted"}
 
 
@@ -136,51 +153,180 @@ async def add_member(
     if existing:
         raise HTTPException(status_code=400, detail="Пользователь уже является участником компании")
     
-    # Добавляем участника
-    new_member = CompanyMember(
-        company_id=company_id,
-        user_id=new_user.id,
-        role="member"
-    )
-    db.add(new_member)
-    await db.commit()
-    await db.refresh(new_member)
-    
-    # Загружаем связанного пользователя для ответа
-    await db.refresh(new_member, ["user"])
+    new_user_id = new_user.id
+
+    async def insert_member(session: AsyncSession) -> CompanyMember:
+        new_member = CompanyMember(company_id=company_id, user_id=new_user_id, role="member")
+        session.add(new_member)
+        await session.flush()
+        return new_member
+
+    new_member = await write_batcher.submit(insert_member, db)
+    # пользователь для ответа уже загружен, перечитывать после commit не нужно
+    set_committed_value(new_member, "user", new_user)
+    recipient_directory.invalidate(company_id)
     return new_member
 
 
-@router.get("/{company_id}/members", response_model=list[CompanyMemberOut])
-async def list_members(
+def _parse_member_emails(body: bytes, content_type: str) -> list[str]:
+    """Список email из тела запроса: JSON-массив строк или CSV (email — первая колонка)."""
+    try:
+        text = body.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Тело запроса должно быть в UTF-8")
+    if "csv" in content_type:
+        emails = [row[0] for row in csv.reader(io.StringIO(text)) if row]
+        # необязательная строка заголовка
+        if emails and emails[0].strip().lower() in ("email", "user_email"):
+            emails = emails[1:]
+    else:
+        try:
+            emails = json.loads(text)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Ожидается JSON-массив email или CSV")
+        if not isinstance(emails, list) or not all(isinstance(e, str) for e in emails):
+            raise HTTPException(status_code=400, detail="Ожидается JSON-массив email или CSV")
+    if len(emails) > settings.members_bulk_max:
+        raise HTTPException(status_code=413, detail=f"Не больше {settings.members_bulk_max} email за запрос")
+    return [email.strip() for email in emails]
+
+
+@router.post("/{company_id}/members/bulk")
+async def add_members_bulk(
     company_id: int,
+    request: Request,
     db: AsyncSession = Depends(get_db),
     user: User = Depends(get_current_user)
 ):
-    """Получить список участников компании"""
-    # Проверяем, что пользователь является участником компании
+    """Добавить участников списком (только владелец или админ)
+
+    Тело — JSON-массив email или CSV (text/csv) с email в первой колонке.
+    Пользователи и уже существующие участники ищутся одним запросом каждый,
+    новые участники вставляются одним многострочным INSERT. Ответ — итог и
+    результат по каждому email (`id` участника или `error`).
+    """
+    # Проверяем права
     result = await db.execute(
-        select(CompanyMember).where(
+        select(CompanyMember.role).where(
             CompanyMember.company_id == company_id,
             CompanyMember.user_id == user.id
         )
     )
-    member = result.scalar_one_or_none()
-    if not member:
-        raise HTTPException(status_code=403, detail="Вы не являетесь участником этой компании")
-    
-    result = await db.execute(
-        select(CompanyMember)
-        .where(CompanyMember.company_id == company_id)
-        .order_by(CompanyMember.joined_at)
+    role = result.scalar_one_or_none()
+    if role not in ["owner", "admin"]:
+        raise HTTPException(status_code=403, detail="Только владелец или админ могут добавлять участников")
+
+    emails = _parse_member_emails(await request.body(), request.headers.get("content-type", ""))
+    wanted = {email for email in emails if email}
+    users: dict[str, int] = {}
+    if wanted:
+        result = await db.execute(select(User.email, User.id).where(User.email.in_(wanted)))
+        users = dict(result.all())
+    existing: set[int] = set()
+    if users:
+        result = await db.execute(select(CompanyMember.user_id).where(
+            CompanyMember.company_id == company_id,
+            CompanyMember.user_id.in_(users.values())
+        ))
+        existing = set(result.scalars().all())
+
+    items: list[dict] = []
+    to_add: dict[int, dict] = {}  # user_id -> результат, куда допишется id участника
+    seen: set[str] = set()
+    for index, email in enumerate(emails):
+        item = {"index": index, "email": email}
+        user_id = users.get(email)
+        if not email:
+            item["error"] = "Пустой email"
+        elif email in seen:
+            item["error"] = "Email повторяется в запросе"
+        elif user_id is None:
+            item["error"] = "Пользователь с таким email не найден"
+        elif user_id in existing:
+            item["error"] = "Пользователь уже является участником компании"
+        else:
+            to_add[user_id] = item
+        seen.add(email)
+        items.append(item)
+
+    if to_add:
+        rows = [{"company_id": company_id, "user_id": user_id, "role": "member"} for user_id in to_add]
+
+        async def insert_members(session: AsyncSession) -> list:
+            result = await session.execute(
+                insert(CompanyMember).returning(CompanyMember.id, CompanyMember.user_id), rows,
+            )
+            return result.all()
+
+        for member_id, user_id in await write_batcher.submit(insert_members, db):
+            to_add[user_id]["id"] = member_id
+        recipient_directory.invalidate(company_id)
+
+    return {"added": len(to_add), "failed": len(items) - len(to_add), "items": items}
+
+
+# колонки CompanyMemberOut вместе с пользователем: список строится одним JOIN без ORM-объектов
+_MEMBER_COLUMNS = (
+    CompanyMember.id, CompanyMember.company_id, CompanyMember.user_id, CompanyMember.role, CompanyMember.joined_at,
+    User.name, User.email,
+)
+
+
+def _member_item(row) -> dict:
+    return {
+        "id": row.id,
+        "company_id": row.company_id,
+        "user_id": row.user_id,
+        "role": row.role,
+        "joined_at": row.joined_at,
+        "user": {"id": row.user_id, "name": row.name, "email": row.email},
+    }
+
+
+@router.get("/{company_id}/members", response_model=list[CompanyMemberOut])
+async def list_members(
+    company_id: int,
+    role: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=settings.members_page_max),
+    db: AsyncSession = Depends(get_read_db),
+    user: User = Depends(get_current_user),
+):
+    """Получить список участников компании
+
+    Участники идут по (joined_at, id) страницами по `limit`, курсор следующей
+    страницы — в заголовке X-Next-Cursor; `role` оставляет только участников
+    с этой ролью. Число запросов не зависит от размера компании.
+    """
+    # Членство проверяется в той же выборке по базе, а не по кэшу id компаний:
+    # только что удалённый участник не должен видеть список до истечения TTL
+    viewer = aliased(CompanyMember)
+    is_member = exists().where(viewer.company_id == company_id, viewer.user_id == user.id)
+    query = (
+        select(*_MEMBER_COLUMNS)
+        .join(User, User.id == CompanyMember.user_id)
+        .where(CompanyMember.company_id == company_id, is_member)
     )
-    members = result.scalars().all()
-    
-    # Загружаем связанных пользователей
-    for m in members:
-        await db.refresh(m, ["user"])
-    
-    return members
+    if role is not None:
+        query = query.where(CompanyMember.role == role)
+    if cursor:
+        after_at, after_id = decode_cursor(cursor)
+        query = query.where(or_(
+            CompanyMember.joined_at > after_at,
+            and_(CompanyMember.joined_at == after_at, CompanyMember.id > after_id),
+        ))
+    limit = limit or settings.members_page_size
+    result = await db.execute(query.order_by(CompanyMember.joined_at, CompanyMember.id).limit(limit + 1))
+    rows = result.all()
+    # пустая страница бывает и у участника (фильтр, конец списка) — тогда различаем отдельным запросом
+    if not rows and not (await db.execute(select(is_member))).scalar():
+        raise HTTPException(status_code=403, detail="Вы не являетесь участником этой компании")
+
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = encode_cursor(rows[-1].joined_at, rows[-1].id)
+    return FastJSONResponse([_member_item(row) for row in rows], headers=headers)
 
 
 @router.delete("/{company_id}/members/{member_id}")
@@ -223,8 +369,11 @@ async def remove_member(
     if target_member.role == "owner":
         raise HTTPException(status_code=403, detail="Владелец не может быть удален")
     
-    await db.execute(delete(CompanyMember).where(CompanyMember.id == member_id))
-    await db.commit()
+    async def delete_member(session: AsyncSession) -> None:
+        await session.execute(delete(CompanyMember).where(CompanyMember.id == member_id))
+
+    await write_batcher.submit(delete_member, db)
+    recipient_directory.invalidate(company_id)
     return {"status": "removed"}
 
 
@@ -253,11 +402,13 @@ async def update_member_role(
         raise HTTPException(status_code=403, detail="Только владелец может изменять роли")
     
     # Обновляем роль
-    await db.execute(
-        update(CompanyMember)
-        .where(CompanyMember.id == member_id, CompanyMember.company_id == company_id)
-        .values(role=role)
-    )
-    await db.commit()
+    async def update_role(session: AsyncSession) -> None:
+        await session.execute(
+            update(CompanyMember)
+            .where(CompanyMember.id == member_id, CompanyMember.company_id == company_id)
+            .values(role=role)
+        )
+
+    await write_batcher.submit(update_role, db)
     return {"status": "updated"}
 
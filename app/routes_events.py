@@ -1,11 +1,24 @@
-from datetime import timedelta, timezone
-from fastapi import APIRouter, Depends, HTTPException
+import heapq
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, delete
-from .db import get_db
-from .models import Event, Reminder, User
-from .schemas import EventCreate, EventOut, ReminderOut, UserOut
+from sqlalchemy import select, delete, update, and_, or_
+from sqlalchemy.orm.attributes import set_committed_value
+from .config import settings
+from .db import get_db, get_read_db
+from .models import Event, Reminder, ReminderDelivery, User
+from .schemas import EventCreate, EventOut, EventUpdate, ReminderOut, UserOut
 from .auth import get_current_user
+from .access import event_access_clause, get_accessible_event, current_company_ids
+from .services_scheduler import reminder_timer
+from .services_writer import write_batcher
+from .services_recurrence import (
+    InvalidRecurrence, validate_recurrence, format_offsets, parse_offsets, parse_recurrence,
+)
+from .responses import FastJSONResponse, decode_cursor, encode_cursor, ndjson_response, wants_ndjson
+from .services_import import ImportFormatError, insert_events, iter_ics_events, iter_json_items, iter_lines
 
 
 router = APIRouter(prefix="/events", tags=["events"])
@@ -20,202 +33,415 @@ def _to_naive_utc(dt):
     return dt
 
 
-@router.post("/", response_model=EventOut)
-async def create_event(payload: EventCreate, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)):
+def _check_recurrence(recurrence: Optional[str], start: datetime) -> None:
+    # в Postgres слишком длинное правило уронило бы запись уже после проверок
+    max_length = Event.__table__.c.recurrence.type.length
+    if recurrence and len(recurrence) > max_length:
+        raise HTTPException(status_code=400, detail=f"Правило повторения длиннее {max_length} символов")
+    try:
+        validate_recurrence(recurrence, start)
+    except InvalidRecurrence:
+        raise HTTPException(status_code=400, detail="Неподдерживаемое правило повторения")
+
+
+def _prepare_event(payload: EventCreate, user_id: int, company_ids: tuple[int, ...]) -> tuple[dict, set[int]]:
+    """Проверить событие и собрать значения строки events и минуты напоминаний."""
     # Проверяем, что если указана компания, пользователь является её участником
-    if payload.company_id:
-        from .models import CompanyMember
-        result = await db.execute(
-            select(CompanyMember).where(
-                CompanyMember.company_id == payload.company_id,
-                CompanyMember.user_id == user.id
-            )
-        )
-        member = result.scalar_one_or_none()
-        if not member:
-            raise HTTPException(status_code=403, detail="Вы не являетесь участником этой компании")
-    
+    if payload.company_id and payload.company_id not in company_ids:
+        raise HTTPException(status_code=403, detail="Вы не являетесь участником этой компании")
+
     start = _to_naive_utc(payload.start_time)
-    event = Event(
-        user_id=user.id,
+    _check_recurrence(payload.recurrence, start)
+
+    reminder_offsets = {m for m in payload.reminders_minutes_before or [] if m >= 0}
+    reminder_offsets.add(0)
+    values = dict(
+        user_id=user_id,
         company_id=payload.company_id,
         title=payload.title,
         description=payload.description,
         start_time=start,
         recurrence=payload.recurrence,
+        reminder_offsets=format_offsets(reminder_offsets),
+        # следующие вхождения развернёт services_recurrence
+        expanded_until=start if payload.recurrence else None,
     )
-    db.add(event)
-    await db.flush()
+    return values, reminder_offsets
 
-    # reminders_minutes_before: create Reminder records
-    reminder_offsets = set(payload.reminders_minutes_before or [])
-    reminder_offsets.add(0)
-    for minutes in sorted(reminder_offsets):
-        if minutes < 0:
-            continue
-        remind_at = start - timedelta(minutes=minutes)
-        db.add(Reminder(event_id=event.id, remind_at=remind_at))
-
-    await db.commit()
-    await db.refresh(event)
+
+@router.post("/", response_model=EventOut)
+async def create_event(
+    payload: EventCreate,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+    company_ids: tuple[int, ...] = Depends(current_company_ids),
+):
+    values, reminder_offsets = _prepare_event(payload, user.id, company_ids)
+
+    async def insert_event(session: AsyncSession) -> tuple[Event, list[Reminder]]:
+        event = Event(**values)
+        session.add(event)
+        await session.flush()
+
+        # reminders_minutes_before: create Reminder records
+        reminders = []
+        for minutes in sorted(reminder_offsets):
+            remind_at = event.start_time - timedelta(minutes=minutes)
+            reminders.append(Reminder(event_id=event.id, remind_at=remind_at))
+        session.add_all(reminders)
+        await session.flush()
+        return event, reminders
+
+    event, reminders = await write_batcher.submit(insert_event, db)
+    for reminder in reminders:
+        reminder_timer.schedule(reminder.id, reminder.remind_at)
     return event
 
 
+async def _import_events(items, db: AsyncSession, user: User, company_ids: tuple[int, ...]) -> dict:
+    """Создать события из потока элементов: проверка по одному, вставка пачками по `import_chunk_size`.
+
+    Каждая пачка — отдельная транзакция; ошибки отдельных элементов не мешают
+    остальным и возвращаются по номеру элемента.
+    """
+    results: list[dict] = []
+    chunk: list[tuple[int, dict, set[int]]] = []
+
+    async def flush():
+        rows, offsets = [row for _, row, _ in chunk], [o for _, _, o in chunk]
+        event_ids, reminders = await write_batcher.submit(lambda session: insert_events(session, rows, offsets), db)
+        results.extend({"index": index, "id": event_id} for (index, _, _), event_id in zip(chunk, event_ids))
+        for reminder_id, remind_at in reminders:
+            reminder_timer.schedule(reminder_id, remind_at)
+        chunk.clear()
+
+    index = 0
+    try:
+        async for item in items:
+            try:
+                if isinstance(item, ImportFormatError):
+                    raise item
+                payload = EventCreate.model_validate(item)
+                row, offsets = _prepare_event(payload, user.id, company_ids)
+                # одна слишком длинная строка в Postgres уронила бы всю пачку
+                if len(row["title"]) > Event.__table__.c.title.type.length:
+                    raise ImportFormatError("title: too long")
+            except ValidationError as e:
+                error = e.errors()[0]
+                field = ".".join(str(part) for part in error["loc"])
+                results.append({"index": index, "error": f"{field}: {error['msg']}" if field else error["msg"]})
+            except HTTPException as e:
+                results.append({"index": index, "error": e.detail})
+            except ImportFormatError as e:
+                results.append({"index": index, "error": str(e)})
+            else:
+                chunk.append((index, row, offsets))
+                if len(chunk) >= settings.import_chunk_size:
+                    await flush()
+            index += 1
+    except ImportFormatError as e:
+        # поток оборвался: уже проверенные элементы всё равно сохраняем
+        results.append({"index": index, "error": str(e)})
+    if chunk:
+        await flush()
+
+    results.sort(key=lambda r: r["index"])
+    created = sum(1 for r in results if "id" in r)
+    return {"created": created, "failed": len(results) - created, "items": results}
+
+
+@router.post("/bulk")
+async def create_events_bulk(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+    company_ids: tuple[int, ...] = Depends(current_company_ids),
+):
+    """Массовое создание событий: JSON-массив или NDJSON из объектов EventCreate.
+
+    Тело читается потоком, ответ — итог и результат по каждому элементу
+    (`id` созданного события или `error`).
+    """
+    return await _import_events(iter_json_items(request.stream()), db, user, company_ids)
+
+
+@router.post("/import/ics")
+async def import_ics(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    user: User = Depends(get_current_user),
+    company_ids: tuple[int, ...] = Depends(current_company_ids),
+    company_id: Optional[int] = None,
+):
+    """Импорт календаря iCalendar (.ics), присланного телом запроса (text/calendar).
+
+    VEVENT'ы разбираются по мере чтения; `company_id` делает все события корпоративными.
+    """
+    async def events():
+        async for item in iter_ics_events(iter_lines(request.stream())):
+            if company_id is not None and isinstance(item, dict):
+                item["company_id"] = company_id
+            yield item
+
+    return await _import_events(events(), db, user, company_ids)
+
+
+def _occurrences_in_window(event, window_from: datetime, window_to: datetime, cap: int) -> list[datetime]:
+    """Первые `cap` вхождений повторяющегося события в [window_from, window_to).
+
+    Вхождения считаются лениво от начала окна: стоимость зависит от `cap`,
+    а не от длины окна.
+    """
+    cap = min(cap, settings.recurrence_max_occurrences)
+    rule = parse_recurrence(event.recurrence, event.start_time)
+    found = set(rule.between(window_from - timedelta(microseconds=1), window_to - timedelta(microseconds=1), limit=cap))
+    if window_from <= event.start_time < window_to:
+        found.add(event.start_time)
+    return sorted(found)[:cap]
+
+
+# колонки EventOut: списки строятся из кортежей строк, минуя ORM-объекты и pydantic
+_EVENT_COLUMNS = (Event.id, Event.title, Event.description, Event.start_time, Event.recurrence, Event.company_id)
+
+
 @router.get("/", response_model=list[EventOut])
-async def list_events(db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)):
-    # Получаем события пользователя и корпоративные события компаний, в которых он состоит
-    from .models import CompanyMember
-    # Получаем ID компаний пользователя
-    company_result = await db.execute(
-        select(CompanyMember.company_id).where(CompanyMember.user_id == user.id)
-    )
-    company_ids = [row[0] for row in company_result.all()]
-    
-    # События пользователя или корпоративные события его компаний
-    if company_ids:
-        query = select(Event).where(
-            (Event.user_id == user.id) | (Event.company_id.in_(company_ids))
-        ).order_by(Event.start_time)
-    else:
-        query = select(Event).where(Event.user_id == user.id).order_by(Event.start_time)
-    result = await db.execute(query)
-    return result.scalars().all()
+async def list_events(
+    request: Request,
+    from_: Optional[datetime] = Query(None, alias="from"),
+    to: Optional[datetime] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=settings.events_page_max),
+    db: AsyncSession = Depends(get_read_db),
+    user: User = Depends(get_current_user),
+):
+    """События пользователя и его компаний в окне [from, to), по (start_time, id).
 
+    Событие — момент времени, поэтому «пересекается с окном» значит
+    from <= start_time < to. Повторяющиеся события при заданных from и to
+    разворачиваются во вхождения внутри окна (окно не длиннее
+    events_window_max_days). Страница ограничена `limit` (не больше
+    events_page_max), курсор следующей страницы — в заголовке X-Next-Cursor.
+    С `Accept: application/x-ndjson` та же страница отдаётся по событию на строку.
+    """
+    window_from, window_to = _to_naive_utc(from_), _to_naive_utc(to)
+    if window_from and window_to and window_to - window_from > timedelta(days=settings.events_window_max_days):
+        raise HTTPException(status_code=400, detail=f"Окно больше {settings.events_window_max_days} дней")
+    after = decode_cursor(cursor) if cursor else None
+    limit = limit or settings.events_page_size
 
-@router.get("/{event_id}", response_model=EventOut)
-async def get_event(event_id: int, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)):
-    # Проверяем личные события и корпоративные события компаний пользователя
-    from .models import CompanyMember
-    company_result = await db.execute(
-        select(CompanyMember.company_id).where(CompanyMember.user_id == user.id)
-    )
-    company_ids = [row[0] for row in company_result.all()]
-    
-    if company_ids:
-        result = await db.execute(
-            select(Event).where(
-                Event.id == event_id,
-                ((Event.user_id == user.id) | (Event.company_id.in_(company_ids)))
+    # События пользователя или корпоративные события его компаний; членство
+    # проверяется в том же запросе (EXISTS), поэтому список строится одним запросом
+    owned = event_access_clause(user.id)
+
+    expand = window_from is not None and window_to is not None
+    single = select(*_EVENT_COLUMNS).where(owned)
+    if expand:
+        single = single.where(or_(Event.recurrence.is_(None), Event.recurrence == ""))
+    if window_from is not None:
+        single = single.where(Event.start_time >= window_from)
+    if window_to is not None:
+        single = single.where(Event.start_time < window_to)
+    if after is not None:
+        single = single.where(or_(
+            Event.start_time > after[0],
+            and_(Event.start_time == after[0], Event.id > after[1]),
+        ))
+    result = await db.execute(single.order_by(Event.start_time, Event.id).limit(limit + 1))
+    items = [(row.start_time, row.id, row._asdict()) for row in result.all()]
+
+    if expand:
+        # повторяющиеся события, начавшиеся до конца окна; вхождения считаем только
+        # после курсора и не больше, чем поместится на страницу
+        lower = max(window_from, after[0]) if after is not None else window_from
+        recurring = await db.execute(
+            select(*_EVENT_COLUMNS).where(
+                owned,
+                Event.recurrence.isnot(None),
+                Event.recurrence != "",
+                Event.start_time < window_to,
             )
         )
-    else:
-        result = await db.execute(select(Event).where(Event.id == event_id, Event.user_id == user.id))
-    event = result.scalar_one_or_none()
-    if not event:
-        raise HTTPException(status_code=404, detail="Event not found")
+        occurrences: list[tuple[datetime, int, dict]] = []
+        for event in recurring.all():
+            try:
+                # +1: вхождение ровно на курсоре может отсеяться по id
+                found = _occurrences_in_window(event, lower, window_to, limit + 2)
+            except InvalidRecurrence:
+                found = [event.start_time] if lower <= event.start_time < window_to else []
+            base = event._asdict()
+            for occurrence in found:
+                if after is None or (occurrence, event.id) > after:
+                    occurrences.append((occurrence, event.id, dict(base, start_time=occurrence)))
+        items = heapq.nsmallest(limit + 1, items + occurrences, key=lambda item: (item[0], item[1]))
+
+    headers = {}
+    if len(items) > limit:
+        last_start, last_id, _ = items[limit - 1]
+        headers["X-Next-Cursor"] = encode_cursor(last_start, last_id)
+    page = [item for _, _, item in items[:limit]]
+    if wants_ndjson(request):
+        return ndjson_response(page, headers=headers)
+    return FastJSONResponse(page, headers=headers)
+
+
+@router.get("/{event_id}", response_model=EventOut)
+async def get_event(event: Event = Depends(get_accessible_event)):
+    # Доступ (личное событие или событие компании пользователя) проверяется одним запросом
     return event
 
 
 @router.delete("/{event_id}")
-async def delete_event(event_id: int, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)):
-    # Проверяем личные события и корпоративные события компаний пользователя
-    from .models import CompanyMember
-    company_result = await db.execute(
-        select(CompanyMember.company_id).where(CompanyMember.user_id == user.id)
-    )
-    company_ids = [row[0] for row in company_result.all()]
-    
-    if company_ids:
-        result = await db.execute(
-            select(Event).where(
-                Event.id == event_id,
-                ((Event.user_id == user.id) | (Event.company_id.in_(company_ids)))
-            )
-        )
-    else:
-        result = await db.execute(select(Event).where(Event.id == event_id, Event.user_id == user.id))
-    event = result.scalar_one_or_none()
-    if not event:
-        raise HTTPException(status_code=404, detail="Event not found")
-    await db.execute(delete(Reminder).where(Reminder.event_id == event.id))
-    await db.execute(delete(Event).where(Event.id == event.id))
-    await db.commit()
+async def delete_event(event: Event = Depends(get_accessible_event), db: AsyncSession = Depends(get_db)):
+    event_id = event.id
+
+    async def delete_rows(session: AsyncSession) -> list[int]:
+        await session.execute(delete(ReminderDelivery).where(
+            ReminderDelivery.reminder_id.in_(select(Reminder.id).where(Reminder.event_id == event_id))
+        ))
+        removed = await session.execute(delete(Reminder).where(Reminder.event_id == event_id).returning(Reminder.id))
+        removed_ids = removed.scalars().all()
+        await session.execute(delete(Event).where(Event.id == event_id))
+        return removed_ids
+
+    removed_ids = await write_batcher.submit(delete_rows, db)
+    reminder_timer.cancel(removed_ids)
     return {"status": "deleted"}
 
 
-@router.put("/{event_id}", response_model=EventOut)
-async def update_event(event_id: int, payload: EventCreate, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)):
-    # Проверяем личные события и корпоративные события компаний пользователя
-    from .models import CompanyMember
-    company_result = await db.execute(
-        select(CompanyMember.company_id).where(CompanyMember.user_id == user.id)
-    )
-    company_ids = [row[0] for row in company_result.all()]
-    
-    if company_ids:
-        result = await db.execute(
-            select(Event).where(
-                Event.id == event_id,
-                ((Event.user_id == user.id) | (Event.company_id.in_(company_ids)))
-            )
-        )
-    else:
-        result = await db.execute(select(Event).where(Event.id == event_id, Event.user_id == user.id))
-    event = result.scalar_one_or_none()
-    if not event:
-        raise HTTPException(status_code=404, detail="Event not found")
+async def _reconcile_reminders(db: AsyncSession, event_id: int, old_start: datetime, start: datetime,
+                               offsets: set[int], recurring: bool = False, now: Optional[datetime] = None):
+    """Привести напоминания события к набору `offsets` минимальным числом изменений.
 
-    start = _to_naive_utc(payload.start_time)
+    Напоминание с уже нужным смещением от старого start_time остаётся той же
+    строкой; если начало сдвинулось, у него меняется remind_at и сбрасываются
+    sent и доставки. Лишние удаляются (у повторяющихся событий — в том числе
+    напоминания следующих вхождений, их заново развернёт services_recurrence),
+    недостающие создаются. У повторяющегося события напоминания, которые
+    после переноса оказались бы в прошлом, не создаются и не переносятся
+    (перенесённые удаляются): иначе прошлое начало серии разослало бы их
+    сразу, а ближайшие вхождения развернёт expand_recurring_events.
+    Возвращает id удалённых и (id, remind_at) для таймера.
+    """
+    now = now or datetime.utcnow()
+    rows = await db.execute(select(Reminder.id, Reminder.remind_at).where(Reminder.event_id == event_id))
+    kept: dict[int, int] = {}
+    stale: list[int] = []
+    for reminder_id, remind_at in rows.all():
+        minutes, rest = divmod(old_start - remind_at, timedelta(minutes=1))
+        if not rest and minutes in offsets and minutes not in kept:
+            kept[minutes] = reminder_id
+        else:
+            stale.append(reminder_id)
+
+    moved = []
+    if start != old_start:
+        for minutes, reminder_id in kept.items():
+            remind_at = start - timedelta(minutes=minutes)
+            if recurring and remind_at < now:
+                stale.append(reminder_id)
+            else:
+                moved.append({"id": reminder_id, "remind_at": remind_at, "sent": False})
+    if stale or moved:
+        await db.execute(delete(ReminderDelivery).where(
+            ReminderDelivery.reminder_id.in_(stale + [m["id"] for m in moved])
+        ))
+    if stale:
+        await db.execute(delete(Reminder).where(Reminder.id.in_(stale)))
+    if moved:
+        await db.execute(update(Reminder), moved)
+
+    added = [
+        Reminder(event_id=event_id, remind_at=start - timedelta(minutes=minutes))
+        for minutes in sorted(offsets - kept.keys())
+        if not recurring or start - timedelta(minutes=minutes) >= now
+    ]
+    if added:
+        db.add_all(added)
+        await db.flush()
+    return stale, [(m["id"], m["remind_at"]) for m in moved] + [(r.id, r.remind_at) for r in added]
 
+
+async def _apply_event_changes(db: AsyncSession, event: Event, changes: dict, company_ids: tuple[int, ...]) -> Event:
+    """Изменить поля события из `changes` (только переданные) и согласовать напоминания."""
+    for field in ("title", "start_time"):
+        if field in changes and changes[field] is None:
+            raise HTTPException(status_code=400, detail=f"Поле {field} не может быть пустым")
     # Проверяем права на изменение корпоративного события
-    if payload.company_id:
-        from .models import CompanyMember
-        result = await db.execute(
-            select(CompanyMember).where(
-                CompanyMember.company_id == payload.company_id,
-                CompanyMember.user_id == user.id
-            )
-        )
-        member = result.scalar_one_or_none()
-        if not member:
-            raise HTTPException(status_code=403, detail="Вы не являетесь участником этой компании")
-    
-    # Обновляем поля события
-    event.title = payload.title
-    event.description = payload.description
-    event.start_time = start
-    event.recurrence = payload.recurrence
-    event.company_id = payload.company_id
-    
-    # Удаляем старые напоминания
-    await db.execute(delete(Reminder).where(Reminder.event_id == event.id))
-    
-    # Создаем новые напоминания
-    reminder_offsets = set(payload.reminders_minutes_before or [])
-    reminder_offsets.add(0)
-    for minutes in sorted(reminder_offsets):
-        if minutes < 0:
-            continue
-        remind_at = start - timedelta(minutes=minutes)
-        db.add(Reminder(event_id=event.id, remind_at=remind_at))
-    
-    await db.commit()
-    await db.refresh(event)
+    if changes.get("company_id") and changes["company_id"] not in company_ids:
+        raise HTTPException(status_code=403, detail="Вы не являетесь участником этой компании")
+
+    old_start, old_recurrence = event.start_time, event.recurrence or None
+    old_offsets = set(parse_offsets(event.reminder_offsets))
+    start = _to_naive_utc(changes["start_time"]) if "start_time" in changes else old_start
+    recurrence = (changes["recurrence"] if "recurrence" in changes else event.recurrence) or None
+    if "start_time" in changes or "recurrence" in changes:
+        _check_recurrence(recurrence, start)
+    offsets = old_offsets
+    if "reminders_minutes_before" in changes:
+        offsets = {m for m in changes["reminders_minutes_before"] or [] if m >= 0}
+        offsets.add(0)
+
+    values = {field: changes[field] for field in ("title", "description", "company_id") if field in changes}
+    values.update(start_time=start, recurrence=recurrence, reminder_offsets=format_offsets(offsets))
+    # название, описание или компания на напоминания не влияют — их строки не трогаем
+    reconcile = start != old_start or recurrence != old_recurrence or offsets != old_offsets
+    if reconcile:
+        # повторения развернутся заново от нового начала
+        values["expanded_until"] = start if recurrence else None
+    event_id = event.id
+
+    async def write_changes(session: AsyncSession) -> tuple[list[int], list[tuple[int, datetime]]]:
+        await session.execute(update(Event).where(Event.id == event_id).values(**values))
+        if not reconcile:
+            return [], []
+        return await _reconcile_reminders(session, event_id, old_start, start, offsets, recurring=bool(recurrence))
+
+    removed_ids, scheduled = await write_batcher.submit(write_changes, db)
+    reminder_timer.cancel(removed_ids)
+    for reminder_id, remind_at in scheduled:
+        reminder_timer.schedule(reminder_id, remind_at)
+    # строка уже записана писателем; объект сессии запроса обновляем только для ответа, не помечая изменённым
+    for field, value in values.items():
+        set_committed_value(event, field, value)
     return event
 
 
-@router.get("/{event_id}/reminders", response_model=list[ReminderOut])
-async def list_reminders(event_id: int, db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)):
-    # Проверяем личные события и корпоративные события компаний пользователя
-    from .models import CompanyMember
-    company_result = await db.execute(
-        select(CompanyMember.company_id).where(CompanyMember.user_id == user.id)
-    )
-    company_ids = [row[0] for row in company_result.all()]
-    
-    if company_ids:
-        result = await db.execute(
-            select(Event).where(
-                Event.id == event_id,
-                ((Event.user_id == user.id) | (Event.company_id.in_(company_ids)))
-            )
-        )
-    else:
-        result = await db.execute(select(Event).where(Event.id == event_id, Event.user_id == user.id))
-    event = result.scalar_one_or_none()
-    if not event:
-        raise HTTPException(status_code=404, detail="Event not found")
-    result_r = await db.execute(select(Reminder).where(Reminder.event_id == event.id).order_by(Reminder.remind_at))
-    return result_r.scalars().all()
+@router.put("/{event_id}", response_model=EventOut)
+async def update_event(
+    payload: EventCreate,
+    event: Event = Depends(get_accessible_event),
+    db: AsyncSession = Depends(get_db),
+    company_ids: tuple[int, ...] = Depends(current_company_ids),
+):
+    # полная замена: не переданные необязательные поля сбрасываются
+    return await _apply_event_changes(db, event, payload.model_dump(), company_ids)
 
 
+@router.patch("/{event_id}", response_model=EventOut)
+async def patch_event(
+    payload: EventUpdate,
+    event: Event = Depends(get_accessible_event),
+    db: AsyncSession = Depends(get_db),
+    company_ids: tuple[int, ...] = Depends(current_company_ids),
+):
+    return await _apply_event_changes(db, event, payload.model_dump(exclude_unset=True), company_ids)
+
+
+@router.get("/{event_id}/reminders", response_model=list[ReminderOut])
+async def list_reminders(
+    request: Request,
+    event: Event = Depends(get_accessible_event),
+    db: AsyncSession = Depends(get_read_db),
+):
+    query = (
+        select(Reminder.id, Reminder.remind_at, Reminder.sent)
+        .where(Reminder.event_id == event.id)
+        .order_by(Reminder.remind_at)
+    )
+    if wants_ndjson(request):
+        # тело читается из сессии зависимости после выхода из обработчика: FastAPI >= 0.118
+        # закрывает yield-зависимости только после отправки ответа
+        rows = await db.stream(query.execution_options(yield_per=settings.events_page_size))
+        return ndjson_response(row._asdict() async for row in rows)
+    result_r = await db.execute(query)
+    return FastJSONResponse([row._asdict() for row in result_r.all()])
@@ -0,0 +1,88 @@
+import hmac
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from .config import settings
+from .db import engine, pool_stats, read_engine
+from .metrics import Family, registry
+from .auth import principal_cache_stats
+from .services_delivery import delivery_engine
+from .services_directory import recipient_directory
+from .services_writer import write_batcher
+
+
+router = APIRouter(tags=["metrics"])
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# счётчики в снимках растут монотонно — отдаются как counter, остальное как gauge
+_POOL_COUNTERS = {"checkout_count", "wait_count", "wait_seconds_total"}
+_CACHE_COUNTERS = {"hits", "misses", "evictions"}
+_DELIVERY_COUNTERS = {"sent", "failed", "retried", "rate_limited"}
+
+
+@registry.collector
+def _db_pools() -> list[Family]:
+    pools = {"primary": engine}
+    if read_engine is not engine:
+        pools["replica"] = read_engine
+    families: dict[str, Family] = {}
+    for pool_name, pool_engine in pools.items():
+        for key, value in pool_stats(pool_engine).items():
+            kind = "counter" if key in _POOL_COUNTERS else "gauge"
+            name = f"db_pool_{key}"
+            family = families.setdefault(name, (name, kind, f"Connection pool {key.replace('_', ' ')}", []))
+            family[3].append(({"pool": pool_name}, value))
+    return list(families.values())
+
+
+@registry.collector
+def _caches() -> list[Family]:
+    caches = {
+        "principal": principal_cache_stats(),
+        "recipient_directory": recipient_directory.stats(),
+    }
+    families: dict[str, Family] = {}
+    for cache_name, stats in caches.items():
+        for key, value in stats.items():
+            kind = "counter" if key in _CACHE_COUNTERS else "gauge"
+            name = f"cache_{key}_total" if kind == "counter" else f"cache_{key}"
+            family = families.setdefault(name, (name, kind, f"In-process cache {key.replace('_', ' ')}", []))
+            family[3].append(({"cache": cache_name}, value))
+    return list(families.values())
+
+
+@registry.collector
+def _delivery_engine() -> list[Family]:
+    families = []
+    for key, value in delivery_engine.snapshot().items():
+        if key in _DELIVERY_COUNTERS:
+            families.append((f"delivery_{key}_total", "counter", f"Delivery engine messages {key.replace('_', ' ')}",
+                             [({}, value)]))
+        else:
+            families.append((f"delivery_{key}", "gauge", f"Delivery engine {key.replace('_', ' ')}", [({}, value)]))
+    return families
+
+
+@registry.collector
+def _write_batcher() -> list[Family]:
+    return [
+        ("write_batches_total", "counter", "SQLite write batches committed", [({}, write_batcher.batches)]),
+        ("write_batch_jobs_total", "counter", "Write jobs committed through the batcher", [({}, write_batcher.jobs)]),
+    ]
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics(authorization: Optional[str] = Header(None)):
+    """Метрики в текстовом формате Prometheus.
+
+    Только снимки счётчиков в памяти процесса, в БД опрос не ходит: очередь
+    наступивших напоминаний обновляет диспетчер на каждом тике. С заданным
+    `metrics_token` без верного Bearer-токена отвечает 401.
+    """
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if settings.metrics_token and not hmac.compare_digest(
+        (authorization or "").encode(), f"Bearer {settings.metrics_token}".encode()
+    ):
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
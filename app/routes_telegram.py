@@ -1,11 +1,17 @@
+import hmac
 import secrets
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update
+from .config import settings
 from .db import get_db
-from .models import TelegramLink, User
+from .models import TelegramLink, User, CompanyMember
 from .auth import get_current_user
-from .auth import create_access_token
+from .auth import create_access_token, invalidate_user
+from .services_directory import recipient_directory
+from .services_writer import write_batcher
 
 
 router = APIRouter(prefix="/telegram", tags=["telegram"])
@@ -14,9 +20,11 @@ router = APIRouter(prefix="/telegram", tags=["telegram"])
 @router.post("/link/start")
 async def start_link(db: AsyncSession = Depends(get_db), user: User = Depends(get_current_user)):
     code = secrets.token_hex(4)
-    link = TelegramLink(user_id=user.id, code=code, confirmed=False)
-    db.add(link)
-    await db.commit()
+
+    async def insert_link(session: AsyncSession):
+        session.add(TelegramLink(user_id=user.id, code=code, confirmed=False))
+
+    await write_batcher.submit(insert_link, db)
     return {"code": code, "message": "Отправьте этот код боту командой /link <code>"}
 
 
@@ -27,11 +35,20 @@ async def confirm_link(telegram_id: str, code: str, db: AsyncSession = Depends(g
     if not row:
         raise HTTPException(status_code=404, detail="Код не найден")
     link, user = row
-    await db.execute(update(User).where(User.id == user.id).values(telegram_id=telegram_id))
-    await db.execute(update(TelegramLink).where(TelegramLink.id == link.id).values(confirmed=True))
-    await db.commit()
+    user_id, link_id = user.id, link.id
+
+    async def link_user(session: AsyncSession) -> list[int]:
+        await session.execute(update(User).where(User.id == user_id).values(telegram_id=telegram_id))
+        await session.execute(update(TelegramLink).where(TelegramLink.id == link_id).values(confirmed=True))
+        companies = await session.execute(select(CompanyMember.company_id).where(CompanyMember.user_id == user_id))
+        return list(companies.scalars().all())
+
+    company_ids = await write_batcher.submit(link_user, db)
+    # chat id пользователя поменялся — сбрасываем кэш получателей его компаний и его токенов
+    recipient_directory.invalidate(*company_ids)
+    invalidate_user(user.id)
     # сразу выдаем JWT для удобства бота
-    token = create_access_token(subject=user.email)
+    token = create_access_token(subject=user.email, user_id=user.id)
     return {"status": "linked", "access_token": token, "token_type": "bearer"}
 
 @router.post("/token")
@@ -41,10 +58,36 @@ async def get_token_by_telegram(telegram_id: str, db: AsyncSession = Depends(get
     user = result.scalar_one_or_none()
     if user is None:
         raise HTTPException(status_code=404, detail="Пользователь с таким telegram_id не найден или не связан")
-    token = create_access_token(subject=user.email)
+    token = create_access_token(subject=user.email, user_id=user.id)
     return {"access_token": token, "token_type": "bearer"}
 
 
 @router.get("/link/status")
 async def link_status(user: User = Depends(get_current_user)):
     return {"linked": bool(user.telegram_id), "telegram_id": user.telegram_id}
+
+
+@router.post("/webhook")
+async def telegram_webhook(
+    request: Request,
+    x_telegram_bot_api_secret_token: Optional[str] = Header(None),
+):
+    """Апдейты Telegram в режиме webhook: проверяем секрет и отдаём апдейт диспетчеру бота.
+
+    Ответ не ждёт обработки — Telegram получает 200 сразу, команды
+    обрабатываются параллельно.
+    """
+    if not settings.telegram_webhook_secret:
+        raise HTTPException(status_code=404, detail="Webhook не настроен")
+    if not x_telegram_bot_api_secret_token or not hmac.compare_digest(
+        x_telegram_bot_api_secret_token, settings.telegram_webhook_secret
+    ):
+        raise HTTPException(status_code=403, detail="Неверный секрет webhook")
+    # aiogram импортируется долго — только в режиме webhook
+    from src import bot as telegram_bot
+
+    try:
+        telegram_bot.feed_update(await request.json())
+    except (ValueError, ValidationError):
+        raise HTTPException(status_code=400, detail="Некорректный апдейт")
+    return {"ok": True}
@@ -0,0 +1,90 @@
+import logging
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+from alembic import command
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+from .config import settings
+
+
+logger = logging.getLogger(__name__)
+
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+# базы, созданные до Alembic (create_all + DDL при старте): по признаку — ревизия, которой они соответствуют.
+# Более старые базы не штампуются: 0001 досоздаёт в них недостающие таблицы и колонки
+_LEGACY_MARKERS = (("reminder_deliveries", "0002"),)
+
+
+def alembic_config() -> Config:
+    config = Config(str(ALEMBIC_INI))
+    # логирование настраивает приложение, а не alembic.ini
+    config.attributes["configure_logger"] = False
+    return config
+
+
+@lru_cache(maxsize=1)
+def head_revision() -> str:
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+def _inspect_schema(sync_conn) -> tuple[Optional[str], Optional[str]]:
+    """(текущая ревизия, ревизия для штампа legacy-базы)."""
+    inspector = inspect(sync_conn)
+    if inspector.has_table("alembic_version"):
+        return sync_conn.execute(text("SELECT version_num FROM alembic_version")).scalar(), None
+    for table, revision in _LEGACY_MARKERS:
+        if inspector.has_table(table):
+            return None, revision
+    return None, None
+
+
+def _set_sqlite_foreign_keys(sync_conn, enabled: bool) -> bool:
+    """Включить/выключить внешние ключи SQLite; возвращает прежнее значение."""
+    # PRAGMA foreign_keys внутри транзакции игнорируется, поэтому в обход BEGIN SQLAlchemy
+    cursor = sync_conn.connection.dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys")
+    previous = bool(cursor.fetchone()[0])
+    cursor.execute(f"PRAGMA foreign_keys={'ON' if enabled else 'OFF'}")
+    cursor.close()
+    return previous
+
+
+def _upgrade(sync_conn, stamp: Optional[str]) -> None:
+    config = alembic_config()
+    config.attributes["connection"] = sync_conn
+    if stamp:
+        command.stamp(config, stamp)
+    command.upgrade(config, "head")
+
+
+async def ensure_schema(engine: AsyncEngine) -> None:
+    """Проверить ревизию схемы при старте; DDL выполняется, только если она отстаёт.
+
+    Обычный старт — один запрос к alembic_version. База без alembic_version
+    с ledger доставок помечается ревизией 0002, остальные проходят все
+    миграции с начала (baseline пропускает уже существующие таблицы). При database_auto_migrate=False отставшая схема —
+    ошибка старта.
+    """
+    head = head_revision()
+    async with engine.connect() as conn:
+        current, legacy = await conn.run_sync(_inspect_schema)
+    if current == head:
+        return
+    if not settings.database_auto_migrate:
+        raise RuntimeError(f"Схема БД на ревизии {current or legacy}, нужна {head}: выполните alembic upgrade head")
+    logger.info("Migrating database schema from %s to %s", current or legacy or "empty", head)
+    async with engine.connect() as conn:
+        sqlite = conn.dialect.name == "sqlite"
+        if sqlite:
+            # batch-миграции пересоздают таблицы; с включёнными внешними ключами
+            # DROP старой таблицы каскадно удалил бы дочерние строки
+            foreign_keys = await conn.run_sync(_set_sqlite_foreign_keys, False)
+        try:
+            async with conn.begin():
+                await conn.run_sync(_upgrade, None if current else legacy)
+        finally:
+            if sqlite:
+                await conn.run_sync(_set_sqlite_foreign_keys, foreign_keys)
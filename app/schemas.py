@@ -32,6 +32,16 @@ class EventCreate(BaseModel):
     company_id: Optional[int] = None  # Если указано, событие корпоративное
 
 
+class EventUpdate(BaseModel):
+    """PATCH /events/{id}: меняются только переданные поля."""
+    title: Optional[str] = None
+    description: Optional[str] = None
+    start_time: Optional[datetime] = None
+    recurrence: Optional[str] = None
+    reminders_minutes_before: Optional[List[int]] = None
+    company_id: Optional[int] = None
+
+
 class EventOut(BaseModel):
     id: int
     title: str
@@ -0,0 +1,120 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import delete, insert, literal, select, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from .config import settings
+from .db import AsyncSessionLocal
+from .models import Reminder, ReminderArchive, ReminderDelivery
+
+
+logger = logging.getLogger(__name__)
+
+# таблицы, размер которых показывает отчёт компакции
+COMPACTED_TABLES = ("reminders", "reminder_deliveries", "reminders_archive")
+
+
+async def _postgres_sizes(db: AsyncSession) -> dict:
+    rows = await db.execute(text(
+        "SELECT c.relname, pg_relation_size(c.oid), pg_indexes_size(c.oid), pg_total_relation_size(c.oid) "
+        "FROM pg_class c WHERE c.relname = ANY(:tables)"
+    ), {"tables": list(COMPACTED_TABLES)})
+    tables = {name: {"table_bytes": table, "index_bytes": indexes, "total_bytes": total}
+              for name, table, indexes, total in rows}
+    rows = await db.execute(text(
+        "SELECT indexrelname, pg_relation_size(indexrelid) FROM pg_stat_user_indexes WHERE relname = ANY(:tables)"
+    ), {"tables": list(COMPACTED_TABLES)})
+    return {"tables": tables, "indexes": dict(rows.all())}
+
+
+async def _sqlite_sizes(db: AsyncSession) -> dict:
+    page_size = (await db.execute(text("PRAGMA page_size"))).scalar()
+    page_count = (await db.execute(text("PRAGMA page_count"))).scalar()
+    freelist = (await db.execute(text("PRAGMA freelist_count"))).scalar()
+    sizes = {"database_bytes": page_size * page_count, "free_bytes": page_size * freelist}
+    try:
+        # dbstat есть не в каждой сборке SQLite; без неё — только размер файла
+        rows = (await db.execute(text("SELECT name, sum(pgsize) FROM dbstat GROUP BY name"))).all()
+    except OperationalError:
+        return sizes
+    by_name = dict(rows)
+    index_rows = [
+        (name, table) for name, table in await db.execute(
+            text("SELECT name, tbl_name FROM sqlite_master WHERE type = 'index'")
+        ) if table in COMPACTED_TABLES
+    ]
+    indexes = {name: by_name.get(name, 0) for name, _ in index_rows}
+    tables = {}
+    for table in COMPACTED_TABLES:
+        index_bytes = sum(by_name.get(name, 0) for name, owner in index_rows if owner == table)
+        tables[table] = {
+            "table_bytes": by_name.get(table, 0),
+            "index_bytes": index_bytes,
+            "total_bytes": by_name.get(table, 0) + index_bytes,
+        }
+    sizes.update(tables=tables, indexes=indexes)
+    return sizes
+
+
+async def storage_sizes(db: AsyncSession) -> dict:
+    """Размеры таблиц напоминаний и их индексов в байтах (Postgres — функции pg_*, SQLite — dbstat)."""
+    if db.get_bind().dialect.name == "postgresql":
+        return await _postgres_sizes(db)
+    return await _sqlite_sizes(db)
+
+
+async def compact_reminders(
+    session_factory: async_sessionmaker = AsyncSessionLocal,
+    now: Optional[datetime] = None,
+    retention_days: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    archive: Optional[bool] = None,
+) -> dict:
+    """Перенести в reminders_archive (или удалить) отправленные напоминания старше срока хранения.
+
+    Работает пачками по `batch_size` с коммитом после каждой, чтобы не держать
+    долгую транзакцию и блокировку записи SQLite. Неотправленные напоминания
+    не трогаются. Возвращает число обработанных строк и размеры до и после.
+    """
+    now = now or datetime.utcnow()
+    retention_days = settings.reminder_retention_days if retention_days is None else retention_days
+    batch_size = batch_size or settings.reminder_compaction_batch_size
+    archive = settings.reminder_compaction_archive if archive is None else archive
+    cutoff = now - timedelta(days=retention_days)
+
+    async with session_factory() as db:
+        before = await storage_sizes(db)
+        compacted = 0
+        while True:
+            ids = list((await db.execute(
+                select(Reminder.id)
+                .where(Reminder.sent == True, Reminder.remind_at < cutoff)  # noqa: E712
+                .order_by(Reminder.id)
+                .limit(batch_size)
+            )).scalars())
+            if not ids:
+                break
+            if archive:
+                await db.execute(insert(ReminderArchive).from_select(
+                    ["reminder_id", "event_id", "remind_at", "archived_at"],
+                    select(Reminder.id, Reminder.event_id, Reminder.remind_at, literal(now))
+                    .where(Reminder.id.in_(ids)),
+                ))
+            # ledger доставок удаляется явно: на SQLite каскад работает только с PRAGMA foreign_keys
+            await db.execute(delete(ReminderDelivery).where(ReminderDelivery.reminder_id.in_(ids)))
+            await db.execute(delete(Reminder).where(Reminder.id.in_(ids)))
+            await db.commit()
+            compacted += len(ids)
+            if len(ids) < batch_size:
+                break
+        after = await storage_sizes(db)
+        await db.commit()
+
+    logger.info(
+        "Reminder compaction: %s %d reminders sent before %s",
+        "archived" if archive else "deleted", compacted, cutoff.isoformat(),
+    )
+    logger.info("Reminder storage before compaction: %s", before)
+    logger.info("Reminder storage after compaction: %s", after)
+    return {"compacted": compacted, "archived": archive, "before": before, "after": after}
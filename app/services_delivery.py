@@ -0,0 +1,223 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+from .config import settings
+from .services_notifications import SendResult, deliver_telegram_message
+
+
+logger = logging.getLogger(__name__)
+
+SendFunc = Callable[[str, str], Awaitable[SendResult]]
+
+
+class TokenBucket:
+    """Ограничитель скорости: `rate` токенов в секунду, запас до `capacity`.
+
+    `reserve()` сразу списывает токен (баланс может уйти в минус) и возвращает,
+    сколько секунд нужно подождать до отправки — так очередь ожидающих
+    выстраивается сама, без повторных проверок.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self) -> float:
+        self._refill(time.monotonic())
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def idle(self) -> bool:
+        self._refill(time.monotonic())
+        return self.tokens >= self.capacity
+
+
+@dataclass
+class _Job:
+    chat_id: str
+    text: str
+    future: asyncio.Future
+    max_retries: int
+    attempt: int = 0
+    # токены лимитов уже списаны, задание ждало своей очереди вне воркера
+    reserved: bool = False
+
+
+@dataclass
+class DeliveryStats:
+    sent: int = 0
+    failed: int = 0
+    retried: int = 0
+    rate_limited: int = 0
+    in_flight: int = 0
+    started_at: Optional[float] = None
+
+
+class DeliveryEngine:
+    """Параллельная отправка сообщений пулом воркеров с учётом лимитов Telegram.
+
+    Общий лимит (~30 сообщений/с на бота) и лимит на один чат реализованы
+    token bucket'ами; сообщение, которому лимит велит подождать, и повторы
+    ждут таймером, не занимая воркер. На 429 сообщение откладывается на
+    `retry_after`, на сетевые ошибки и 5xx — на экспоненциальную паузу, не
+    больше `max_retries` раз.
+    """
+
+    def __init__(
+        self,
+        send: SendFunc,
+        workers: int = 16,
+        global_rate: float = 30.0,
+        chat_rate: float = 1.0,
+        max_retries: int = 3,
+        queue_size: int = 1000,
+        max_chat_buckets: int = 10000,
+    ):
+        self.send = send
+        self.workers = workers
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.max_retries = max_retries
+        self.queue_size = queue_size
+        self.max_chat_buckets = max_chat_buckets
+        self.stats = DeliveryStats()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: list[asyncio.Task] = []
+        self._global_bucket = TokenBucket(global_rate)
+        self._chat_buckets: dict[str, TokenBucket] = {}
+
+    def _ensure_workers(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._tasks:
+            return
+        # воркеры привязаны к event loop'у, в котором их запустили
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def submit(self, chat_id: str, text: str, max_retries: Optional[int] = None) -> asyncio.Future:
+        """Поставить сообщение в очередь; future завершится итоговым SendResult.
+
+        Если очередь заполнена, вызов ждёт — это ограничивает память при
+        потоковой выдаче получателей. `max_retries=0` отдаёт первый же
+        неуспех вызывающему (повторы тогда планирует он сам).
+        """
+        self._ensure_workers()
+        future = self._loop.create_future()
+        retries = self.max_retries if max_retries is None else max_retries
+        await self._queue.put(_Job(chat_id, text, future, retries))
+        return future
+
+    async def deliver(self, chat_id: str, text: str) -> SendResult:
+        return await (await self.submit(chat_id, text))
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def snapshot(self) -> dict:
+        stats = self.stats
+        elapsed = time.monotonic() - stats.started_at if stats.started_at else 0.0
+        return {
+            "sent": stats.sent,
+            "failed": stats.failed,
+            "retried": stats.retried,
+            "rate_limited": stats.rate_limited,
+            "in_flight": stats.in_flight,
+            "queue_depth": self.queue_depth,
+            "throughput_per_second": stats.sent / elapsed if elapsed > 0 else 0.0,
+        }
+
+    def _chat_bucket(self, chat_id: str) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= self.max_chat_buckets:
+                # полные (давно не использованные) ведра ничего не ограничивают
+                self._chat_buckets = {k: b for k, b in self._chat_buckets.items() if not b.idle()}
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.chat_rate, capacity=1.0)
+        return bucket
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._process(job)
+            except Exception:
+                logger.exception("Delivery to %s crashed", job.chat_id)
+                if not job.future.done():
+                    job.future.set_result(SendResult(ok=False))
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, job: _Job) -> None:
+        if not job.reserved:
+            delay = max(self._chat_bucket(job.chat_id).reserve(), self._global_bucket.reserve())
+            if delay:
+                # сообщение в «занятый» чат ждёт вне воркера — остальные чаты не стоят за ним
+                job.reserved = True
+                self._loop.call_later(delay, self._requeue, job)
+                return
+        job.reserved = False
+
+        if self.stats.started_at is None:
+            self.stats.started_at = time.monotonic()
+        self.stats.in_flight += 1
+        try:
+            result = await self.send(job.chat_id, job.text)
+            transient = result.status >= 500
+        except Exception as e:
+            logger.warning("Telegram send to %s failed: %s", job.chat_id, e)
+            result, transient = SendResult(ok=False), True
+        finally:
+            self.stats.in_flight -= 1
+
+        if result.ok:
+            self.stats.sent += 1
+            job.future.set_result(result)
+            return
+
+        retryable = transient or result.retry_after is not None
+        if not retryable or job.attempt >= job.max_retries:
+            self.stats.failed += 1
+            job.future.set_result(result)
+            return
+
+        if result.retry_after is not None:
+            self.stats.rate_limited += 1
+            backoff = result.retry_after
+        else:
+            backoff = 2 ** job.attempt
+        self.stats.retried += 1
+        job.attempt += 1
+        # повтор ставим в очередь позже, не занимая воркер на время паузы
+        self._loop.call_later(backoff, self._requeue, job)
+
+    def _requeue(self, job: _Job) -> None:
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self._loop.create_task(self._queue.put(job))
+
+
+delivery_engine = DeliveryEngine(
+    deliver_telegram_message,
+    workers=settings.delivery_workers,
+    global_rate=settings.telegram_global_rate,
+    chat_rate=settings.telegram_chat_rate,
+    max_retries=settings.delivery_max_retries,
+)
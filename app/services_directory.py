@@ -0,0 +1,68 @@
+from typing import Iterable
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, and_
+from .cache import LRUCache
+from .config import settings
+from .models import CompanyMember, User
+
+
+class RecipientDirectory:
+    """Кэш company_id -> кортеж chat id участников с привязанным Telegram.
+
+    Маршруты, меняющие состав компании или привязку Telegram, сбрасывают
+    записи через `invalidate`. Кэш живёт в памяти процесса, поэтому TTL
+    ограничивает устаревание, если изменения пришли через другой процесс.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = LRUCache(maxsize, ttl=ttl)
+        # растёт при каждом сбросе: результат запроса, начатого до сброса, не кэшируем
+        self._generation = 0
+
+    async def get_many(self, db: AsyncSession, company_ids: Iterable[int]) -> dict[int, tuple[str, ...]]:
+        found: dict[int, tuple[str, ...]] = {}
+        missing = []
+        for company_id in set(company_ids):
+            chat_ids = self._cache.get(company_id)
+            if chat_ids is None:
+                missing.append(company_id)
+            else:
+                found[company_id] = chat_ids
+        if not missing:
+            return found
+
+        generation = self._generation
+        result = await db.execute(
+            select(CompanyMember.company_id, User.telegram_id)
+            .join(User, CompanyMember.user_id == User.id)
+            .where(
+                CompanyMember.company_id.in_(missing),
+                and_(User.telegram_id.isnot(None), User.telegram_id != ""),
+            )
+        )
+        loaded: dict[int, list[str]] = {company_id: [] for company_id in missing}
+        for company_id, chat_id in result.all():
+            loaded[company_id].append(chat_id)
+        for company_id, chat_ids in loaded.items():
+            found[company_id] = tuple(dict.fromkeys(chat_ids))
+            if generation == self._generation:
+                self._cache.set(company_id, found[company_id])
+        return found
+
+    def invalidate(self, *company_ids: int) -> None:
+        self._generation += 1
+        for company_id in company_ids:
+            self._cache.pop(company_id)
+
+    def clear(self) -> None:
+        self._generation += 1
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        return self._cache.stats()
+
+
+recipient_directory = RecipientDirectory(
+    maxsize=settings.recipient_directory_size,
+    ttl=settings.recipient_directory_ttl_seconds,
+)
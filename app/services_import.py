@@ -0,0 +1,226 @@
+import codecs
+import json
+import re
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Iterable, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import insert
+from .models import Event, Reminder
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+async def _iter_text(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    async for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Строки потока байтов без символов конца строки; весь текст в памяти не держится."""
+    pending = ""
+    async for text in _iter_text(chunks):
+        pending += text
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def iter_json_items(chunks: AsyncIterator[bytes]) -> AsyncIterator[object]:
+    """Элементы JSON-массива или NDJSON (по объекту на строку) по мере чтения тела запроса.
+
+    Ошибка разбора конкретного элемента отдаётся как ImportFormatError, чтобы
+    вызывающий код мог сообщить о ней по номеру элемента; сломанная структура
+    массива прерывает поток.
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos, mode = "", 0, None
+    async for text in _iter_text(chunks):
+        buffer = buffer[pos:] + text
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n":
+                pos += 1
+            if pos == len(buffer):
+                break
+            if mode is None:
+                mode = "array" if buffer[pos] == "[" else "lines"
+                if mode == "array":
+                    pos += 1
+                continue
+            if mode == "array":
+                if buffer[pos] == ",":
+                    pos += 1
+                    continue
+                if buffer[pos] == "]":
+                    return
+            else:
+                end = buffer.find("\n", pos)
+                if end == -1:
+                    break
+                line = buffer[pos:end]
+                pos = end + 1
+                try:
+                    yield json.loads(line)
+                except ValueError as e:
+                    yield ImportFormatError(f"Invalid JSON: {e.msg}")
+                continue
+            try:
+                item, pos = decoder.raw_decode(buffer, pos)
+            except ValueError:
+                # объект ещё не дочитан целиком — ждём следующий кусок
+                break
+            yield item
+    rest = buffer[pos:].strip()
+    if mode == "lines" and rest:
+        try:
+            yield json.loads(rest)
+        except ValueError as e:
+            yield ImportFormatError(f"Invalid JSON: {e.msg}")
+    elif mode == "array":
+        raise ImportFormatError("Unterminated JSON array")
+
+
+_DURATION = re.compile(r"^([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$")
+
+
+def _unescape(value: str) -> str:
+    return re.sub(r"\\([\\;,nN])", lambda m: "\n" if m.group(1) in "nN" else m.group(1), value)
+
+
+def _parse_property(line: str) -> tuple[str, dict[str, str], str]:
+    head, _, value = line.partition(":")
+    name, *params = head.split(";")
+    parsed = {}
+    for param in params:
+        key, _, param_value = param.partition("=")
+        parsed[key.upper()] = param_value.strip('"')
+    return name.upper(), parsed, value
+
+
+def _parse_ics_datetime(value: str, params: dict[str, str]) -> datetime:
+    if params.get("VALUE") == "DATE" or len(value) == 8:
+        return datetime.strptime(value, "%Y%m%d")
+    if value.endswith("Z"):
+        return datetime.strptime(value[:-1], "%Y%m%dT%H%M%S")
+    moment = datetime.strptime(value, "%Y%m%dT%H%M%S")
+    if "TZID" in params:
+        try:
+            zone = ZoneInfo(params["TZID"])
+        except (ZoneInfoNotFoundError, ValueError):
+            raise ValueError(f"Unknown TZID {params['TZID']!r}")
+        return moment.replace(tzinfo=zone).astimezone(timezone.utc).replace(tzinfo=None)
+    # «плавающее» время без зоны считаем UTC, как и остальное API
+    return moment
+
+
+def _minutes_before(trigger: str) -> Optional[int]:
+    match = _DURATION.match(trigger.strip())
+    if not match:
+        return None
+    sign, weeks, days, hours, minutes, seconds = match.groups()
+    delta = timedelta(
+        weeks=int(weeks or 0), days=int(days or 0), hours=int(hours or 0),
+        minutes=int(minutes or 0), seconds=int(seconds or 0),
+    )
+    before = delta if sign == "-" else -delta
+    return int(before.total_seconds() // 60)
+
+
+async def iter_ics_events(lines: AsyncIterator[str]) -> AsyncIterator[object]:
+    """VEVENT'ы календаря в виде словарей в формате EventCreate, по мере чтения файла.
+
+    Берутся SUMMARY, DESCRIPTION, DTSTART (с TZID или в UTC), RRULE и
+    относительные TRIGGER из VALARM (минуты до начала). Событие, которое не
+    удалось разобрать, отдаётся как ImportFormatError.
+    """
+    async def logical_lines():
+        # строки, перенесённые по RFC 5545 (продолжение начинается с пробела или табуляции)
+        current: Optional[str] = None
+        async for raw in lines:
+            if raw[:1] in (" ", "\t") and current is not None:
+                current += raw[1:]
+                continue
+            if current is not None:
+                yield current
+            current = raw
+        if current is not None:
+            yield current
+
+    event: Optional[dict] = None
+    error: Optional[str] = None
+    in_alarm = False
+    async for line in logical_lines():
+        if not line:
+            continue
+        name, params, value = _parse_property(line)
+        if name == "BEGIN" and value.upper() == "VEVENT":
+            event, error, in_alarm = {"reminders_minutes_before": []}, None, False
+        elif event is None:
+            continue
+        elif name == "BEGIN" and value.upper() == "VALARM":
+            in_alarm = True
+        elif name == "END" and value.upper() == "VALARM":
+            in_alarm = False
+        elif name == "END" and value.upper() == "VEVENT":
+            if error is None and "start_time" not in event:
+                error = "VEVENT without DTSTART"
+            yield ImportFormatError(error) if error else event
+            event = None
+        elif in_alarm:
+            if name == "TRIGGER" and params.get("VALUE", "DURATION") == "DURATION" and params.get("RELATED", "START") == "START":
+                minutes = _minutes_before(value)
+                if minutes is not None and minutes >= 0:
+                    event["reminders_minutes_before"].append(minutes)
+        elif name == "SUMMARY":
+            event["title"] = _unescape(value)
+        elif name == "DESCRIPTION":
+            event["description"] = _unescape(value)
+        elif name == "DTSTART":
+            try:
+                event["start_time"] = _parse_ics_datetime(value, params)
+            except ValueError as e:
+                error = f"Invalid DTSTART: {e}"
+        elif name == "RRULE":
+            event["recurrence"] = value
+    if event is not None:
+        raise ImportFormatError("Unterminated VEVENT")
+
+
+async def insert_events(
+    db: AsyncSession,
+    rows: list[dict],
+    offsets: list[Iterable[int]],
+) -> tuple[list[int], list[tuple[int, datetime]]]:
+    """Вставить события и их напоминания двумя многострочными INSERT ... RETURNING.
+
+    `offsets[i]` — минуты до начала для `rows[i]`. Возвращает id событий в
+    порядке `rows` и (id, remind_at) созданных напоминаний — для таймера.
+    """
+    if not rows:
+        return [], []
+    if db.get_bind().dialect.name == "sqlite":
+        # SQLite не умеет sort_by_parameter_order и вставлял бы по строке; rowid там
+        # выдаются по порядку строк VALUES, поэтому достаточно отсортировать id
+        result = await db.execute(insert(Event).returning(Event.id), rows)
+        event_ids = sorted(result.scalars().all())
+    else:
+        result = await db.execute(insert(Event).returning(Event.id, sort_by_parameter_order=True), rows)
+        event_ids = result.scalars().all()
+    reminder_rows = [
+        {"event_id": event_id, "remind_at": row["start_time"] - timedelta(minutes=m)}
+        for event_id, row, minutes in zip(event_ids, rows, offsets)
+        for m in sorted(minutes)
+    ]
+    result = await db.execute(insert(Reminder).returning(Reminder.id, Reminder.remind_at), reminder_rows)
+    return event_ids, [tuple(r) for r in result.all()]
@@ -1,14 +1,199 @@
+import abc
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional
 import httpx
 from .config import settings
+from . import metrics
 
 
-async def send_telegram_message(chat_id: str, text: str) -> bool:
-    bot_token = settings.bot_token
-    if not bot_token:
-        return False
-    url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-    async with httpx.AsyncClient(timeout=10) as client:
-        resp = await client.post(url, json={"chat_id": chat_id, "text": text})
-        return resp.status_code == 200 and resp.json().get("ok", False)
+logger = logging.getLogger(__name__)
 
 
+@dataclass
+class SendResult:
+    ok: bool
+    status: int = 0
+    # сколько секунд Telegram просит подождать (ответ 429)
+    retry_after: Optional[float] = None
+
+
+@dataclass
+class SendStats:
+    """Задержка отправки по бэкенду: количество, сумма, максимум и ответы по статусам."""
+    count: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    statuses: dict[int, int] = field(default_factory=dict)
+
+    def observe(self, seconds: float, status: int) -> None:
+        self.count += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    @property
+    def avg_seconds(self) -> float:
+        return self.total_seconds / self.count if self.count else 0.0
+
+
+class NotificationBackend(abc.ABC):
+    """Транспорт уведомлений. Наследники реализуют `_send`, замер задержки — здесь."""
+
+    name = "base"
+
+    def __init__(self):
+        self.stats = SendStats()
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def send(self, chat_id: str, text: str) -> SendResult:
+        started = time.perf_counter()
+        status = 0
+        try:
+            result = await self._send(chat_id, text)
+            status = result.status
+            return result
+        finally:
+            elapsed = time.perf_counter() - started
+            self.stats.observe(elapsed, status)
+            metrics.send_seconds.observe(elapsed, backend=self.name)
+            metrics.sends_total.inc(backend=self.name, status=status)
+
+    @abc.abstractmethod
+    async def _send(self, chat_id: str, text: str) -> SendResult:
+        """Отправить сообщение; замер и метрики делает `send()`."""
+
+
+class TelegramBackend(NotificationBackend):
+    """Bot API через один долгоживущий httpx-клиент (keep-alive, HTTP/2 при наличии h2)."""
+
+    name = "telegram"
+
+    def __init__(
+        self,
+        bot_token: str,
+        api_url: str = "https://api.telegram.org",
+        http2: bool = True,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        super().__init__()
+        self.bot_token = bot_token
+        self.api_url = api_url
+        self.http2 = http2
+        # свой транспорт (httpx.MockTransport в тестах) вместо сетевого
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def start(self) -> None:
+        if self._client is not None:
+            return
+        http2 = self.http2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("h2 is not installed, Telegram transport falls back to HTTP/1.1")
+                http2 = False
+        self._client = httpx.AsyncClient(
+            base_url=f"{self.api_url}/bot{self.bot_token}",
+            http2=http2,
+            transport=self.transport,
+            limits=httpx.Limits(
+                max_connections=settings.telegram_max_connections,
+                max_keepalive_connections=settings.telegram_max_keepalive,
+                keepalive_expiry=settings.telegram_keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(
+                settings.telegram_read_timeout,
+                connect=settings.telegram_connect_timeout,
+                pool=settings.telegram_pool_timeout,
+            ),
+        )
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _send(self, chat_id: str, text: str) -> SendResult:
+        if not self.bot_token:
+            return SendResult(ok=False)
+        if self._client is None:
+            # вне приложения (скрипты, тесты) клиент поднимается при первой отправке
+            await self.start()
+        resp = await self._client.post("/sendMessage", json={"chat_id": chat_id, "text": text})
+        if resp.status_code == 200:
+            return SendResult(ok=resp.json().get("ok", False), status=200)
+        if resp.status_code == 429:
+            # тело разбираем только здесь — ради retry_after
+            retry_after = resp.headers.get("Retry-After")
+            try:
+                retry_after = resp.json().get("parameters", {}).get("retry_after", retry_after)
+            except ValueError:
+                pass
+            return SendResult(ok=False, status=429, retry_after=float(retry_after or 1))
+        return SendResult(ok=False, status=resp.status_code)
+
+
+class FakeBackend(NotificationBackend):
+    """Бэкенд в памяти для тестов и бенчмарков: запоминает сообщения, ответ задаёт `responder`."""
+
+    name = "fake"
+
+    def __init__(self, responder: Optional[Callable[[str, str], SendResult]] = None, latency: float = 0.0):
+        super().__init__()
+        self.responder = responder
+        self.latency = latency
+        self.messages: list[tuple[str, str]] = []
+
+    async def _send(self, chat_id: str, text: str) -> SendResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.messages.append((chat_id, text))
+        if self.responder is not None:
+            return self.responder(chat_id, text)
+        return SendResult(ok=True, status=200)
+
+
+def build_backend(name: str) -> NotificationBackend:
+    if name == "fake":
+        return FakeBackend()
+    if name == "telegram":
+        return TelegramBackend(settings.bot_token, api_url=settings.telegram_api_url, http2=settings.telegram_http2)
+    raise ValueError(f"Unknown notification backend: {name}")
+
+
+_backend: Optional[NotificationBackend] = None
+
+
+def get_backend() -> NotificationBackend:
+    global _backend
+    if _backend is None:
+        _backend = build_backend(settings.notification_backend)
+    return _backend
+
+
+def set_backend(backend: Optional[NotificationBackend]) -> None:
+    global _backend
+    _backend = backend
+
+
+async def init_notifications() -> None:
+    """Вызывается при старте приложения: один клиент на весь процесс."""
+    await get_backend().start()
+
+
+async def close_notifications() -> None:
+    if _backend is not None:
+        await _backend.close()
+
+
+async def deliver_telegram_message(chat_id: str, text: str) -> SendResult:
+    return await get_backend().send(chat_id, text)
@@ -0,0 +1,233 @@
+import re
+from datetime import datetime, timedelta
+from itertools import islice, takewhile
+from typing import Iterable, Optional, Protocol
+from dateutil.rrule import rrulestr
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, or_
+from .config import settings
+from .models import Event, Reminder
+
+
+# правило исчерпано — событие больше не нужно разворачивать
+EXPANDED_FOREVER = datetime(9999, 12, 31)
+# сколько первых вхождений сравнивается с минимальным интервалом повторения
+_INTERVAL_PROBE = 4
+
+# значения, которые присылает фронтенд (select «Повтор»)
+_FREQ_KEYWORDS = {"HOURLY", "DAILY", "WEEKLY", "MONTHLY", "YEARLY"}
+_UTC_UNTIL = re.compile(r"(UNTIL=\d{8}T\d{6})Z", re.IGNORECASE)
+_CRON_MACROS = {
+    "@hourly": "0 * * * *",
+    "@daily": "0 0 * * *",
+    "@weekly": "0 0 * * 0",
+    "@monthly": "0 0 1 * *",
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+}
+
+
+class RecurrenceRule(Protocol):
+    def between(self, after: datetime, before: datetime, limit: Optional[int] = None) -> list[datetime]:
+        """Первые `limit` вхождений в полуинтервале (after, before]; считаются лениво, по порядку."""
+
+    def after(self, moment: datetime) -> Optional[datetime]:
+        """Первое вхождение позже `moment` или None, если правило исчерпано."""
+
+
+class InvalidRecurrence(ValueError):
+    pass
+
+
+class _RRule:
+    def __init__(self, rule: str, start: datetime):
+        # время в приложении — naive UTC, поэтому UNTIL=...Z (как в .ics) приводим к тому же виду
+        rule = _UTC_UNTIL.sub(r"\1", rule)
+        # без cache=True: кэш dateutil хранил бы все вхождения от dtstart до последнего запроса
+        self._rule = rrulestr(rule, dtstart=start)
+
+    def between(self, after: datetime, before: datetime, limit: Optional[int] = None) -> list[datetime]:
+        return list(islice(takewhile(lambda dt: dt <= before, self._rule.xafter(after, inc=False)), limit))
+
+    def after(self, moment: datetime) -> Optional[datetime]:
+        return self._rule.after(moment)
+
+
+def _parse_cron_field(field: str, low: int, high: int) -> frozenset[int]:
+    values = set()
+    for part in field.split(","):
+        step = 1
+        if "/" in part:
+            part, step_str = part.split("/", 1)
+            step = int(step_str)
+            if step < 1:
+                raise ValueError(field)
+        if part == "*":
+            first, last = low, high
+        elif "-" in part:
+            first, last = (int(x) for x in part.split("-", 1))
+        else:
+            first = int(part)
+            last = high if step > 1 else first
+        if first < low or last > high or first > last:
+            raise ValueError(field)
+        values.update(range(first, last + 1, step))
+    return frozenset(values)
+
+
+class _CronRule:
+    """Пятипольное cron-выражение (минута, час, день месяца, месяц, день недели), время в UTC."""
+
+    def __init__(self, expr: str, start: datetime):
+        fields = expr.split()
+        if len(fields) != 5:
+            raise ValueError(expr)
+        self.start = start
+        self.minutes = sorted(_parse_cron_field(fields[0], 0, 59))
+        self.hours = sorted(_parse_cron_field(fields[1], 0, 23))
+        self.days = _parse_cron_field(fields[2], 1, 31)
+        self.months = _parse_cron_field(fields[3], 1, 12)
+        # 0 и 7 — воскресенье; в Python воскресенье — 6
+        self.weekdays = frozenset((d - 1) % 7 for d in _parse_cron_field(fields[4], 0, 7))
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+
+    def _day_matches(self, day: datetime) -> bool:
+        if day.month not in self.months:
+            return False
+        in_days = day.day in self.days
+        in_weekdays = day.weekday() in self.weekdays
+        # как в cron: если заданы оба поля, достаточно совпадения любого
+        if not self.any_day and not self.any_weekday:
+            return in_days or in_weekdays
+        return in_days and in_weekdays
+
+    def between(self, after: datetime, before: datetime, limit: Optional[int] = None) -> list[datetime]:
+        lower = max(after, self.start - timedelta(microseconds=1))
+        day = lower.replace(hour=0, minute=0, second=0, microsecond=0)
+        result = []
+        while day <= before:
+            if self._day_matches(day):
+                for hour in self.hours:
+                    for minute in self.minutes:
+                        moment = day.replace(hour=hour, minute=minute)
+                        if lower < moment <= before:
+                            result.append(moment)
+                            if len(result) == limit:
+                                return result
+            day += timedelta(days=1)
+        return result
+
+    def after(self, moment: datetime) -> Optional[datetime]:
+        # cron не заканчивается, но может не совпасть ни разу (например, 31 февраля):
+        # ищем в пределах четырёх лет, чтобы захватить 29 февраля
+        day = max(moment, self.start).replace(hour=0, minute=0, second=0, microsecond=0)
+        for _ in range(4 * 366):
+            if self._day_matches(day):
+                for hour in self.hours:
+                    for minute in self.minutes:
+                        candidate = day.replace(hour=hour, minute=minute)
+                        if candidate > moment and candidate >= self.start:
+                            return candidate
+            day += timedelta(days=1)
+        return None
+
+
+def _parse(text: str, start: datetime) -> RecurrenceRule:
+    if text.upper() in _FREQ_KEYWORDS:
+        return _RRule(f"FREQ={text.upper()}", start)
+    if text.lower() in _CRON_MACROS:
+        return _CronRule(_CRON_MACROS[text.lower()], start)
+    if "FREQ=" in text.upper():
+        return _RRule(text, start)
+    return _CronRule(text, start)
+
+
+def parse_recurrence(rule: str, start: datetime) -> RecurrenceRule:
+    """Разобрать правило повторения: RRULE, cron или ключевое слово частоты (DAILY и т.п.).
+
+    Правила чаще `recurrence_min_interval_minutes` (MINUTELY, SECONDLY,
+    «* * * * *» и т.п.) отклоняются: dateutil перебирает вхождения от
+    dtstart, и у старого поминутного события это сотни тысяч шагов на вызов.
+    """
+    try:
+        parsed = _parse(rule.strip(), start)
+        # четыре года, как в _CronRule.after: cron, который не совпадает никогда, не перебирается до 9999 года
+        first = parsed.between(start - timedelta(microseconds=1), start + timedelta(days=4 * 366), limit=_INTERVAL_PROBE)
+    except (ValueError, TypeError) as e:
+        raise InvalidRecurrence(f"Unsupported recurrence rule: {rule!r}") from e
+    min_interval = timedelta(minutes=settings.recurrence_min_interval_minutes)
+    if any(later - earlier < min_interval for earlier, later in zip(first, first[1:])):
+        raise InvalidRecurrence(f"Recurrence rule is more frequent than {min_interval}: {rule!r}")
+    return parsed
+
+
+def validate_recurrence(rule: Optional[str], start: datetime) -> None:
+    if rule:
+        parse_recurrence(rule, start)
+
+
+def format_offsets(offsets: Iterable[int]) -> str:
+    return ",".join(str(m) for m in sorted(set(offsets)))
+
+
+def parse_offsets(value: Optional[str]) -> list[int]:
+    if not value:
+        return [0]
+    return [int(m) for m in value.split(",") if m != ""]
+
+
+async def expand_recurring_events(db: AsyncSession, now: Optional[datetime] = None) -> list[Reminder]:
+    """Материализовать напоминания повторяющихся событий в скользящем окне.
+
+    За цикл обрабатывается не больше `recurrence_batch_size` событий, у
+    которых развёрнутый участок заканчивается раньше, чем через половину окна;
+    каждое продлевается до now + окно. Напоминания в прошлом не создаются.
+    Возвращает новые напоминания (с id) — их можно сразу поставить в таймер.
+    """
+    now = now or datetime.utcnow()
+    horizon = timedelta(hours=settings.recurrence_horizon_hours)
+    horizon_end = now + horizon
+    result = await db.execute(
+        select(Event.id, Event.start_time, Event.recurrence, Event.reminder_offsets, Event.expanded_until)
+        .where(
+            Event.recurrence.isnot(None),
+            Event.recurrence != "",
+            or_(Event.expanded_until.is_(None), Event.expanded_until < now + horizon / 2),
+        )
+        .order_by(Event.expanded_until)
+        .limit(settings.recurrence_batch_size)
+    )
+
+    reminders: list[Reminder] = []
+    watermarks: list[dict] = []
+    for event_id, start, recurrence, offsets, expanded_until in result.all():
+        try:
+            rule = parse_recurrence(recurrence, start)
+        except InvalidRecurrence:
+            watermarks.append({"id": event_id, "expanded_until": EXPANDED_FOREVER})
+            continue
+        # первое вхождение (start_time) уже получило напоминания при создании события,
+        # а у прошедших вхождений все напоминания уже в прошлом
+        lower = max(expanded_until or start, now)
+        occurrences = rule.between(lower, horizon_end, limit=settings.recurrence_max_occurrences)
+        minutes = [m for m in parse_offsets(offsets) if m >= 0]
+        for occurrence in occurrences:
+            for m in minutes:
+                remind_at = occurrence - timedelta(minutes=m)
+                if remind_at >= now:
+                    reminders.append(Reminder(event_id=event_id, remind_at=remind_at))
+        if len(occurrences) == settings.recurrence_max_occurrences:
+            watermark = occurrences[-1]
+        elif rule.after(horizon_end) is None:
+            watermark = EXPANDED_FOREVER
+        else:
+            watermark = horizon_end
+        watermarks.append({"id": event_id, "expanded_until": watermark})
+
+    if reminders:
+        db.add_all(reminders)
+        await db.flush()
+    if watermarks:
+        await db.execute(update(Event), watermarks)
+    return reminders
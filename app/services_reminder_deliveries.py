@@ -0,0 +1,123 @@
+from datetime import datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, insert, or_, exists
+from .config import settings
+from .models import Reminder, ReminderDelivery, Event, User
+from .services_directory import recipient_directory
+from .services_notifications import SendResult
+
+
+DELIVERY_PENDING = "pending"
+DELIVERY_SENT = "sent"
+DELIVERY_FAILED = "failed"
+DELIVERY_RETRY = "retry"
+
+# sent и failed — конечные статусы, остальные ещё ждут отправки
+OPEN_STATUSES = (DELIVERY_PENDING, DELIVERY_RETRY)
+
+
+def reminder_targets_query(reminder_ids: list[int]):
+    """Для каждого напоминания: компания события и chat id создателя."""
+    return (
+        select(Reminder.id.label("reminder_id"), Event.company_id, User.telegram_id.label("creator_chat_id"))
+        .join(Event, Reminder.event_id == Event.id)
+        .join(User, Event.user_id == User.id)
+        .where(Reminder.id.in_(reminder_ids))
+    )
+
+
+async def plan_deliveries(db: AsyncSession, reminder_ids: list[int]) -> int:
+    """Создать строки доставки (pending) для напоминаний, у которых их ещё нет.
+
+    Получатели фиксируются один раз, при первой обработке напоминания:
+    повторы и перезапуск после падения работают по уже записанному списку.
+    """
+    planned = await db.execute(
+        select(ReminderDelivery.reminder_id).where(ReminderDelivery.reminder_id.in_(reminder_ids)).distinct()
+    )
+    unplanned = set(reminder_ids) - set(planned.scalars().all())
+    if not unplanned:
+        return 0
+    targets = (await db.execute(reminder_targets_query(sorted(unplanned)))).all()
+    # личные события уходят создателю, корпоративные — всем участникам с привязанным Telegram
+    directory = await recipient_directory.get_many(db, (t.company_id for t in targets if t.company_id))
+    now = datetime.utcnow()
+    rows = []
+    for target in targets:
+        if target.company_id:
+            chat_ids = directory.get(target.company_id, ())
+        else:
+            chat_ids = (target.creator_chat_id,) if target.creator_chat_id else ()
+        rows.extend(
+            {"reminder_id": target.reminder_id, "chat_id": chat_id, "status": DELIVERY_PENDING,
+             "attempts": 0, "updated_at": now}
+            for chat_id in chat_ids
+        )
+    if rows:
+        await db.execute(insert(ReminderDelivery), rows)
+    return len(rows)
+
+
+def due_deliveries_query(reminder_ids: list[int], now: datetime):
+    """Незавершённые доставки пачки, время повтора которых наступило, вместе с текстом события."""
+    return (
+        select(
+            ReminderDelivery.id,
+            ReminderDelivery.reminder_id,
+            ReminderDelivery.chat_id,
+            ReminderDelivery.attempts,
+            Event.id.label("event_id"),
+            Event.title,
+            Event.description,
+            Event.company_id,
+        )
+        .join(Reminder, ReminderDelivery.reminder_id == Reminder.id)
+        .join(Event, Reminder.event_id == Event.id)
+        .where(
+            ReminderDelivery.reminder_id.in_(reminder_ids),
+            ReminderDelivery.status.in_(OPEN_STATUSES),
+            or_(ReminderDelivery.next_attempt_at.is_(None), ReminderDelivery.next_attempt_at <= now),
+        )
+    )
+
+
+def delivery_outcome(delivery_id: int, attempts: int, result: SendResult, now: datetime) -> dict:
+    """Новое состояние строки доставки после попытки отправки."""
+    attempts += 1
+    if result.ok:
+        return {"id": delivery_id, "status": DELIVERY_SENT, "attempts": attempts,
+                "next_attempt_at": None, "updated_at": now}
+    # 4xx (кроме 429) — чат недоступен или запрос неверен, повторять бессмысленно
+    permanent = 400 <= result.status < 500 and result.status != 429
+    if permanent or attempts >= settings.delivery_max_attempts:
+        return {"id": delivery_id, "status": DELIVERY_FAILED, "attempts": attempts,
+                "next_attempt_at": None, "updated_at": now}
+    delay = max(result.retry_after or 0, settings.delivery_retry_seconds * 2 ** (attempts - 1))
+    return {"id": delivery_id, "status": DELIVERY_RETRY, "attempts": attempts,
+            "next_attempt_at": now + timedelta(seconds=delay), "updated_at": now}
+
+
+async def record_outcomes(db: AsyncSession, outcomes: list[dict]) -> None:
+    if outcomes:
+        # bulk UPDATE по первичному ключу — один executemany на пачку
+        await db.execute(update(ReminderDelivery), outcomes)
+
+
+async def finalize_reminders(db: AsyncSession, reminder_ids: list[int]) -> int:
+    """Пометить отправленными напоминания, у которых все доставки в конечном статусе.
+
+    Вызывается после plan_deliveries для тех же id, поэтому напоминание без
+    строк доставки — это напоминание без получателей (нет привязанного
+    Telegram): оно тоже завершается, иначе его забирал бы каждый тик.
+    """
+    has_open = exists().where(
+        ReminderDelivery.reminder_id == Reminder.id,
+        ReminderDelivery.status.in_(OPEN_STATUSES),
+    )
+    result = await db.execute(
+        update(Reminder)
+        .where(Reminder.id.in_(reminder_ids), ~has_open)
+        .values(sent=True)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
@@ -1,81 +1,124 @@
+import asyncio
+from functools import partial
 from datetime import datetime, timezone
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
-from .models import Reminder, Event, User, CompanyMember
-from .services_notifications import send_telegram_message
+from sqlalchemy import func, select, and_, or_
+from .config import settings
+from . import metrics
+from .models import Reminder
+from .services_delivery import delivery_engine
+from .services_writer import write_batcher
+from .services_reminder_deliveries import (
+    plan_deliveries, due_deliveries_query, delivery_outcome, record_outcomes, finalize_reminders,
+)
+
+
+async def claim_due_reminders(db: AsyncSession, now: datetime, after: tuple[datetime, int] | None = None,
+                              limit: int | None = None) -> list[Reminder]:
+    """Забрать очередную пачку наступивших неотправленных напоминаний.
+
+    Фильтр по времени выполняется в SQL по частичному индексу неотправленных, поэтому
+    стоимость зависит от числа наступивших напоминаний, а не от всей очереди.
+    На Postgres строки блокируются FOR UPDATE SKIP LOCKED до commit, так что
+    параллельные диспетчеры не берут одни и те же напоминания. SQLite не
+    поддерживает блокировку строк, там диспетчеры сериализует блокировка записи БД.
+    `after` — ключ (remind_at, id) последнего обработанного напоминания.
+    """
+    query = select(Reminder).where(Reminder.sent == False, Reminder.remind_at <= now)  # noqa: E712
+    if after is not None:
+        last_at, last_id = after
+        query = query.where(or_(
+            Reminder.remind_at > last_at,
+            and_(Reminder.remind_at == last_at, Reminder.id > last_id),
+        ))
+    query = (
+        query.order_by(Reminder.remind_at, Reminder.id)
+        .limit(limit or settings.reminder_batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.execute(query)
+    return list(result.scalars().all())
 
-async def process_due_reminders(db: AsyncSession) -> int:
-    # берём "сейчас" в UTC
-    now_utc = datetime.now(timezone.utc)
 
-    # забираем все неотправленные
+def render_reminder_text(title: str, description: str | None, company_id: int | None) -> str:
+    description_text = f"\n{description}" if description else ""
+    if company_id:
+        return f"🔔 Корпоративное напоминание: {title}{description_text}"
+    return f"🔔 Напоминание: {title}{description_text}"
+
+
+async def refresh_due_backlog(db: AsyncSession, now: datetime | None = None) -> None:
+    """Обновить метрики очереди наступивших неотправленных напоминаний (раз за тик диспетчера, не на /metrics)."""
+    now = now or datetime.now(timezone.utc).replace(tzinfo=None)
     result = await db.execute(
-        select(Reminder).where(Reminder.sent == False)  # noqa: E712
+        select(func.count(), func.min(Reminder.remind_at))
+        .where(Reminder.sent == False, Reminder.remind_at <= now)  # noqa: E712
     )
-    reminders = result.scalars().all()
+    backlog, oldest = result.one()
+    metrics.due_backlog.set(backlog)
+    metrics.due_oldest_seconds.set((now - oldest).total_seconds() if oldest else 0.0)
+
+
+async def process_due_reminders(db: AsyncSession) -> int:
+    # в БД timestamp without time zone, мы туда кладём UTC — сравниваем с naive UTC
+    now_utc = datetime.now(timezone.utc).replace(tzinfo=None)
+    batch_size = settings.reminder_batch_size
 
     sent_count = 0
-    for rem in reminders:
-        # приводим remind_at к UTC-aware
-        ra = rem.remind_at
-        if ra.tzinfo is None:
-            # в БД timestamp without time zone, мы туда кладём UTC — помечаем это явно
-            ra_utc = ra.replace(tzinfo=timezone.utc)
-        else:
-            ra_utc = ra.astimezone(timezone.utc)
-
-        # триггерим только если наступило время
-        if ra_utc <= now_utc:
-            event_result = await db.execute(
-                select(Event, User)
-                .join(User, Event.user_id == User.id)
-                .where(Event.id == rem.event_id)
-            )
-            row = event_result.first()
-            if not row:
-                continue
-            event, creator_user = row
-            
-            # Если это корпоративное событие, отправляем всем участникам компании
-            if event.company_id:
-                # Получаем всех участников компании
-                members_result = await db.execute(
-                    select(CompanyMember, User)
-                    .join(User, CompanyMember.user_id == User.id)
-                    .where(CompanyMember.company_id == event.company_id)
-                )
-                members = members_result.all()
-                
-                # Отправляем уведомление всем участникам с привязанным Telegram
-                success_count = 0
-                for member, user in members:
-                    if user.telegram_id:
-                        description_text = f"\n{event.description}" if event.description else ""
-                        message = f"🔔 Корпоративное напоминание: {event.title}{description_text}"
-                        ok = await send_telegram_message(user.telegram_id, message)
-                        if ok:
-                            success_count += 1
-                
-                # Помечаем напоминание как отправленное, если хотя бы одно сообщение отправлено
-                if success_count > 0:
-                    await db.execute(
-                        update(Reminder).where(Reminder.id == rem.id).values(sent=True)
-                    )
-                    sent_count += 1
-            else:
-                # Личное событие - отправляем только создателю
-                if not creator_user.telegram_id:
-                    continue
-
-                description_text = f"\n{event.description}" if event.description else ""
-                ok = await send_telegram_message(creator_user.telegram_id, f"🔔 Напоминание: {event.title}{description_text}")
-                if ok:
-                    await db.execute(
-                        update(Reminder).where(Reminder.id == rem.id).values(sent=True)
-                    )
-                    sent_count += 1
-
-    if sent_count:
-        await db.commit()
-    return sent_count
+    after = None
+    while True:
+        reminders = await claim_due_reminders(db, now_utc, after=after, limit=batch_size)
+        if not reminders:
+            break
+        # идём дальше по ключу, чтобы неудачные напоминания не выбирались повторно в этом же тике
+        after = (reminders[-1].remind_at, reminders[-1].id)
+
+        reminder_ids = [rem.id for rem in reminders]
+        remind_at = {rem.id: rem.remind_at for rem in reminders}
+        await plan_deliveries(db, reminder_ids)
+        if write_batcher.enabled:
+            # SQLite: писатель один — план коммитим сразу, чтобы не держать блокировку записи всю отправку
+            await db.commit()
+
+        # Получатели пачки одним потоковым запросом; повторно идут только неотправленные
+        stream = await db.stream(
+            due_deliveries_query(reminder_ids, now_utc).execution_options(yield_per=batch_size)
+        )
+        texts: dict[int, str] = {}
+        outcomes: list[dict] = []
+        pending: set[asyncio.Future] = set()
+
+        def on_done(delivery_id: int, attempts: int, reminder_id: int, future: asyncio.Future) -> None:
+            pending.discard(future)
+            result = future.result()
+            if result.ok:
+                lag = datetime.now(timezone.utc).replace(tzinfo=None) - remind_at[reminder_id]
+                metrics.dispatch_lag_seconds.observe(max(lag.total_seconds(), 0.0))
+            outcomes.append(delivery_outcome(delivery_id, attempts, result, now_utc))
 
+        async for row in stream:
+            text = texts.get(row.event_id)
+            if text is None:
+                text = texts[row.event_id] = render_reminder_text(row.title, row.description, row.company_id)
+            # отправка идёт параллельно в движке доставки, submit ждёт только при заполненной очереди;
+            # без повторов в памяти: 429 и 5xx уходят в ledger с next_attempt_at, тик не ждёт паузы
+            future = await delivery_engine.submit(row.chat_id, text, max_retries=0)
+            pending.add(future)
+            future.add_done_callback(partial(on_done, row.id, row.attempts, row.reminder_id))
+        if pending:
+            await asyncio.wait(pending)
+
+        async def write_results(session: AsyncSession) -> int:
+            await record_outcomes(session, outcomes)
+            # напоминание завершено, только когда все его доставки в конечном статусе
+            return await finalize_reminders(session, reminder_ids)
+
+        if write_batcher.enabled:
+            # закрываем читающую транзакцию: результаты пишет общий писатель
+            await db.commit()
+        # commit снимает блокировки пачки
+        sent_count += await write_batcher.submit(write_results, db)
+        if len(reminders) < batch_size:
+            break
+
+    return sent_count
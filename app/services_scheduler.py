@@ -1,33 +1,76 @@
-from datetime import datetime
-from typing import Callable, Any
+import asyncio
+import logging
+import time
+from datetime import timedelta
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
+from .config import settings
+from . import metrics
 from .db import AsyncSessionLocal
-from .services_reminders import process_due_reminders
+from .services_reminders import process_due_reminders, refresh_due_backlog
+from .services_recurrence import expand_recurring_events
+from .services_compaction import compact_reminders
+from .services_timer import ReminderTimer
 
 
+logger = logging.getLogger(__name__)
+
 scheduler = AsyncIOScheduler()
+reminder_timer = ReminderTimer(horizon=timedelta(minutes=settings.reminder_timer_horizon_minutes))
+# таймер и страховочный опрос не должны отправлять одну и ту же пачку одновременно
+_dispatch_lock = asyncio.Lock()
 
 
 def start_scheduler():
     if not scheduler.running:
         scheduler.start()
-        # Добавляем периодическую задачу для обработки напоминаний каждую минуту
+        # Страховочный опрос БД: ловит напоминания, которые таймер не увидел
+        # (например, созданные другим процессом)
         scheduler.add_job(
             check_reminders,
-            trigger=IntervalTrigger(minutes=1),
+            trigger=IntervalTrigger(seconds=settings.reminder_sweep_seconds),
             id='check_reminders',
             replace_existing=True
         )
+        # Раз в сутки убираем из reminders старые отправленные напоминания
+        scheduler.add_job(
+            compact_reminders,
+            trigger=CronTrigger(hour=settings.reminder_compaction_hour, timezone="UTC"),
+            id='compact_reminders',
+            replace_existing=True
+        )
+    # Таймер будит диспетчер точно к remind_at
+    reminder_timer.start(check_reminders)
 
 
-async def check_reminders():
-    """Периодическая задача для проверки и отправки напоминаний"""
-    async with AsyncSessionLocal() as db:
-        await process_due_reminders(db)
-
-
-def schedule_job(func: Callable[..., Any], run_at: datetime, args: list[Any] | None = None):
-    scheduler.add_job(func, 'date', run_date=run_at, args=args or [])
+async def stop_scheduler():
+    await reminder_timer.stop()
+    if scheduler.running:
+        scheduler.shutdown(wait=False)
 
 
+async def check_reminders():
+    """Периодическая задача для проверки и отправки напоминаний"""
+    async with _dispatch_lock:
+        started = time.perf_counter()
+        try:
+            async with AsyncSessionLocal() as db:
+                # сначала продлеваем окно повторяющихся событий, затем отправляем наступившее
+                created = await expand_recurring_events(db)
+                await db.commit()
+                for reminder in created:
+                    reminder_timer.schedule(reminder.id, reminder.remind_at)
+                sent = await process_due_reminders(db)
+                # что осталось после тика — для /metrics, чтобы опрос не ходил в БД
+                await refresh_due_backlog(db)
+                await db.commit()
+        except Exception:
+            # следующий тик (таймер или страховочный опрос) повторит попытку
+            logger.exception("Reminder dispatch tick failed")
+            metrics.dispatch_ticks_total.inc(outcome="error")
+        else:
+            metrics.dispatch_ticks_total.inc(outcome="ok")
+            metrics.reminders_sent_total.inc(sent)
+        finally:
+            metrics.dispatch_tick_seconds.observe(time.perf_counter() - started)
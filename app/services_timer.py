@@ -0,0 +1,111 @@
+import asyncio
+import heapq
+import logging
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Iterable, Optional
+from sqlalchemy import select
+from .db import AsyncSessionLocal
+from .models import Reminder
+
+
+logger = logging.getLogger(__name__)
+
+
+class ReminderTimer:
+    """Куча (min-heap) напоминаний, наступающих в ближайшем окне `horizon`.
+
+    Таймер спит до ближайшего remind_at и будит диспетчер точно к сроку; саму
+    выборку и отправку по-прежнему делает диспетчер по БД, так что запись в
+    куче — только повод проснуться. Окно подгружается из БД инкрементально:
+    берутся лишь напоминания позже уже загруженной границы. Маршруты событий
+    добавляют и отменяют записи напрямую через `schedule`/`cancel`.
+    """
+
+    def __init__(self, horizon: timedelta = timedelta(minutes=15), session_factory=AsyncSessionLocal):
+        self.horizon = horizon
+        self.session_factory = session_factory
+        self.loaded_until: Optional[datetime] = None
+        self._heap: list[tuple[datetime, int]] = []
+        self._cancelled: set[int] = set()
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._dispatch: Optional[Callable[[], Awaitable[object]]] = None
+
+    def start(self, dispatch: Callable[[], Awaitable[object]]) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        self._dispatch = dispatch
+        self._wake = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def schedule(self, reminder_id: int, remind_at: datetime) -> None:
+        # напоминания за границей окна подтянет очередная подгрузка
+        if self.loaded_until is None or remind_at > self.loaded_until:
+            return
+        self._cancelled.discard(reminder_id)
+        heapq.heappush(self._heap, (remind_at, reminder_id))
+        self._wake.set()
+
+    def cancel(self, reminder_ids: Iterable[int]) -> None:
+        # удаление ленивое: запись выбрасывается, когда доходит до вершины кучи
+        self._cancelled.update(reminder_ids)
+        self._wake.set()
+
+    async def refill(self, now: datetime) -> int:
+        until = now + self.horizon
+        query = select(Reminder.id, Reminder.remind_at).where(
+            Reminder.sent == False, Reminder.remind_at <= until  # noqa: E712
+        )
+        if self.loaded_until is not None:
+            query = query.where(Reminder.remind_at > self.loaded_until)
+        async with self.session_factory() as db:
+            rows = (await db.execute(query)).all()
+        for reminder_id, remind_at in rows:
+            heapq.heappush(self._heap, (remind_at, reminder_id))
+        self.loaded_until = until
+        # отмены для записей, которых нет в куче, больше не нужны
+        self._cancelled &= {reminder_id for _, reminder_id in self._heap}
+        return len(rows)
+
+    def _pop_due(self, now: datetime) -> bool:
+        fired = False
+        while self._heap and self._heap[0][0] <= now:
+            _, reminder_id = heapq.heappop(self._heap)
+            if reminder_id in self._cancelled:
+                self._cancelled.discard(reminder_id)
+                continue
+            fired = True
+        return fired
+
+    async def _run(self) -> None:
+        while True:
+            now = datetime.utcnow()
+            try:
+                # подгружаем окно, когда до его конца осталось меньше половины
+                if self.loaded_until is None or self.loaded_until - now < self.horizon / 2:
+                    await self.refill(now)
+                if self._pop_due(now):
+                    await self._dispatch()
+                    continue
+            except Exception:
+                logger.exception("Reminder timer iteration failed")
+                await asyncio.sleep(5)
+                continue
+
+            refill_at = self.loaded_until - self.horizon / 2
+            wake_at = min(self._heap[0][0], refill_at) if self._heap else refill_at
+            timeout = max((wake_at - datetime.utcnow()).total_seconds(), 0.0)
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,146 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional, TypeVar
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from .config import settings
+from .db import AsyncSessionLocal, is_sqlite
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+WriteJob = Callable[[AsyncSession], Awaitable[T]]
+# метка в очереди: писатель дописывает задания перед ней и завершается
+_STOP = object()
+
+
+class WriteBatcher:
+    """Один писатель для SQLite: мелкие записи коммитятся пачкой в одной транзакции.
+
+    SQLite допускает одного писателя за раз, поэтому параллельные коммиты
+    маршрутов только ждут блокировку друг друга. Здесь задания выполняются
+    по очереди на одной сессии, каждое в своём SAVEPOINT (ошибка одного не
+    откатывает остальные), а COMMIT — один на пачку. Вызывающий получает
+    результат задания после коммита.
+
+    Выключенный батчер выполняет задание сразу на переданной сессии.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = AsyncSessionLocal,
+        enabled: Optional[bool] = None,
+        max_batch: Optional[int] = None,
+        max_delay: Optional[float] = None,
+    ):
+        self.session_factory = session_factory
+        self.enabled = (
+            settings.sqlite_write_batching and is_sqlite(settings.database_url) if enabled is None else enabled
+        )
+        self.max_batch = max_batch or settings.sqlite_write_batch_size
+        self.max_delay = settings.sqlite_write_batch_delay_ms / 1000 if max_delay is None else max_delay
+        self.batches = 0
+        self.jobs = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def submit(self, job: WriteJob, db: Optional[AsyncSession] = None) -> T:
+        if not self.enabled:
+            if db is None:
+                async with self.session_factory() as session:
+                    return await self._run_now(job, session)
+            return await self._run_now(job, db)
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run())
+        future = loop.create_future()
+        await self._queue.put((job, future))
+        return await future
+
+    @staticmethod
+    async def _run_now(job: WriteJob, session: AsyncSession):
+        result = await job(session)
+        await session.commit()
+        return result
+
+    async def _collect(self) -> tuple[list, bool]:
+        """Пачка заданий и признак остановки (в очереди встретился _STOP)."""
+        first = await self._queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        deadline = self._loop.time() + self.max_delay
+        while len(batch) < self.max_batch:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch, stopping = await self._collect()
+            if batch:
+                await self._commit_batch(batch)
+
+    async def _commit_batch(self, batch: list) -> None:
+        outcomes = []
+        try:
+            async with self.session_factory() as session:
+                for job, future in batch:
+                    try:
+                        async with session.begin_nested():
+                            result = await job(session)
+                            # ошибки ограничений должны всплыть внутри SAVEPOINT задания
+                            await session.flush()
+                        outcomes.append((future, result, None))
+                    except Exception as e:
+                        outcomes.append((future, None, e))
+                await session.commit()
+        except Exception as e:
+            logger.exception("Write batch of %d jobs failed", len(batch))
+            outcomes = [(future, None, e) for _, future in batch]
+        self.batches += 1
+        self.jobs += len(batch)
+        for future, result, error in outcomes:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    async def close(self) -> None:
+        """Дописать всё поставленное в очередь (включая пачку в работе) и остановить писатель."""
+        if self._task is None:
+            return
+        if self._loop is not asyncio.get_running_loop():
+            # писатель остался от другого (уже закрытого) event loop'а
+            self._task = None
+            return
+        if not self._task.done():
+            # метка остановки встаёт в очередь после уже поставленных заданий
+            await self._queue.put(_STOP)
+            await self._task
+        self._task = None
+        # задания, пришедшие после метки, писатель уже не выполнит
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not _STOP and not item[1].done():
+                item[1].set_exception(RuntimeError("WriteBatcher is closed"))
+
+
+write_batcher = WriteBatcher()
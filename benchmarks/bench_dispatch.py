@@ -0,0 +1,71 @@
+"""Один тик диспетчера напоминаний на временной SQLite базе.
+
+    python benchmarks/bench_dispatch.py --reminders 5000 --members 200
+
+Печатает число SQL-запросов и время тика; отправка идёт в FakeBackend.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from sqlalchemy import event as sa_event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from app.db import Base
+from app.models import User, Company, CompanyMember, Event, Reminder
+from app import services_reminders
+from app.services_delivery import DeliveryEngine
+from app.services_notifications import FakeBackend
+
+
+async def main(reminders: int, members: int):
+    # лимиты Telegram здесь не нужны: меряем только работу с БД и очередью
+    backend = FakeBackend()
+    services_reminders.delivery_engine = DeliveryEngine(backend.send, global_rate=1e9, chat_rate=1e9)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp}/bench.db")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+
+        async with session_factory() as db:
+            now = datetime.utcnow()
+            users = [User(email=f"u{i}@example.com", password_hash="x", telegram_id=str(i)) for i in range(members)]
+            db.add_all(users)
+            await db.flush()
+            company = Company(name="Bench", created_by=users[0].id)
+            db.add(company)
+            await db.flush()
+            db.add_all(CompanyMember(company_id=company.id, user_id=u.id) for u in users)
+            corporate = Event(user_id=users[0].id, company_id=company.id, title="Sync", start_time=now)
+            personal = Event(user_id=users[0].id, title="Gym", start_time=now)
+            db.add_all([corporate, personal])
+            await db.flush()
+            for i in range(reminders):
+                event = corporate if i % 10 == 0 else personal
+                db.add(Reminder(event_id=event.id, remind_at=now - timedelta(seconds=i)))
+            await db.commit()
+
+        statements = []
+        sa_event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        async with session_factory() as db:
+            started = time.perf_counter()
+            sent = await services_reminders.process_due_reminders(db)
+            elapsed = time.perf_counter() - started
+        await engine.dispose()
+
+    print(f"reminders={reminders} members={members} sent={sent} "
+          f"queries={len(statements)} tick={elapsed * 1000:.1f}ms "
+          f"messages={backend.stats.count} send_avg={backend.stats.avg_seconds * 1e6:.0f}us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reminders", type=int, default=5000)
+    parser.add_argument("--members", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main(args.reminders, args.members))
@@ -0,0 +1,69 @@
+"""Массовый импорт событий через POST /events/bulk на временной SQLite базе.
+
+    python benchmarks/bench_import.py --events 50000
+
+Тело — NDJSON, отправляется потоком; печатает время импорта и число SQL-запросов.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+import httpx
+from sqlalchemy import event as sa_event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from app.db import Base, get_db
+from app.main import app
+
+
+async def body(events: int):
+    start = datetime(2030, 1, 1, 9, 0)
+    for i in range(events):
+        item = {
+            "title": f"Event {i}",
+            "start_time": (start + timedelta(minutes=i)).isoformat(),
+            "reminders_minutes_before": [10, 60],
+        }
+        yield (json.dumps(item) + "\n").encode()
+
+
+async def main(events: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp}/bench.db")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+
+        async def override_get_db():
+            async with session_factory() as session:
+                yield session
+
+        app.dependency_overrides[get_db] = override_get_db
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            await client.post("/auth/register", json={"name": "bench", "email": "bench@example.com", "password": "secret"})
+            resp = await client.post("/auth/login", data={"username": "bench@example.com", "password": "secret"})
+            headers = {"Authorization": f"Bearer {resp.json()['access_token']}", "Content-Type": "application/x-ndjson"}
+
+            statements = []
+            sa_event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+            started = time.perf_counter()
+            resp = await client.post("/events/bulk", headers=headers, content=body(events))
+            elapsed = time.perf_counter() - started
+        await engine.dispose()
+
+    report = resp.json()
+    print(f"events={events} created={report['created']} failed={report['failed']} "
+          f"queries={len(statements)} import={elapsed:.2f}s ({events / elapsed:.0f} events/s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=50000)
+    args = parser.parse_args()
+    asyncio.run(main(args.events))
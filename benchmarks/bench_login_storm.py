@@ -0,0 +1,83 @@
+"""Задержка /health во время шквала входов на временной SQLite базе.
+
+    python benchmarks/bench_login_storm.py --logins 200 --workers 4
+    python benchmarks/bench_login_storm.py --logins 200 --workers 0   # хэширование в event loop
+
+Печатает p50/p99 запроса /health в покое и во время одновременных /auth/login.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+import httpx
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from app.config import settings
+from app.db import Base, get_db
+from app.main import app
+
+
+def percentiles(samples: list[float]) -> str:
+    cuts = statistics.quantiles(samples, n=100)
+    return f"p50={cuts[49] * 1000:.1f}ms p99={cuts[98] * 1000:.1f}ms"
+
+
+async def probe(client: httpx.AsyncClient, samples: list[float], stop: asyncio.Event, interval: float = 0.005):
+    # задержка считается от запланированного момента запроса: если event loop занят,
+    # опоздание запуска тоже попадает в выборку
+    scheduled = time.perf_counter()
+    while not stop.is_set():
+        await client.get("/health")
+        samples.append(time.perf_counter() - scheduled)
+        scheduled = max(scheduled + interval, time.perf_counter())
+        await asyncio.sleep(scheduled - time.perf_counter())
+
+
+async def main(logins: int, workers: int):
+    settings.password_hash_workers = workers
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp}/bench.db")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+
+        async def override_get_db():
+            async with session_factory() as session:
+                yield session
+
+        app.dependency_overrides[get_db] = override_get_db
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await client.post("/auth/register", json={"name": "bench", "email": "bench@example.com", "password": "secret"})
+            form = {"username": "bench@example.com", "password": "secret"}
+
+            idle, stop = [], asyncio.Event()
+            prober = asyncio.create_task(probe(client, idle, stop))
+            await asyncio.sleep(1)
+            stop.set()
+            await prober
+
+            storm, stop = [], asyncio.Event()
+            prober = asyncio.create_task(probe(client, storm, stop))
+            started = time.perf_counter()
+            await asyncio.gather(*(client.post("/auth/login", data=form) for _ in range(logins)))
+            elapsed = time.perf_counter() - started
+            stop.set()
+            await prober
+        await engine.dispose()
+
+    print(f"workers={workers} logins={logins} storm={elapsed:.2f}s ({logins / elapsed:.0f} logins/s)")
+    print(f"/health idle:  {percentiles(idle)}")
+    print(f"/health storm: {percentiles(storm)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=settings.password_hash_workers)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.workers))
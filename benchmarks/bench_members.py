@@ -0,0 +1,76 @@
+"""GET /companies/{id}/members на компаниях разного размера на временной SQLite базе.
+
+    python benchmarks/bench_members.py --sizes 10 100 1000 5000
+
+Печатает число SQL-запросов и время одной страницы (limit = размер компании
+до members_page_max) — число запросов не должно зависеть от размера.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+import httpx
+from sqlalchemy import event as sa_event, insert
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from app.config import settings
+from app.db import Base, get_db, get_read_db
+from app.main import app
+from app.models import CompanyMember, User
+
+
+async def main(sizes: list[int], repeats: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp}/bench.db")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+
+        async def override_get_db():
+            async with session_factory() as session:
+                yield session
+
+        app.dependency_overrides[get_db] = override_get_db
+        app.dependency_overrides[get_read_db] = override_get_db
+        statements = []
+        sa_event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await client.post("/auth/register", json={"name": "bench", "email": "bench@example.com", "password": "secret"})
+            resp = await client.post("/auth/login", data={"username": "bench@example.com", "password": "secret"})
+            headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+            for size in sizes:
+                company_id = (await client.post("/companies/", headers=headers, json={"name": f"size {size}"})).json()["id"]
+                async with session_factory() as db:
+                    result = await db.execute(insert(User).returning(User.id), [
+                        {"email": f"c{company_id}-{i}@example.com", "password_hash": "x"} for i in range(size - 1)
+                    ])
+                    await db.execute(insert(CompanyMember), [
+                        {"company_id": company_id, "user_id": user_id, "role": "member"} for user_id in result.scalars()
+                    ])
+                    await db.commit()
+
+                url = f"/companies/{company_id}/members"
+                params = {"limit": min(size, settings.members_page_max)}
+                await client.get(url, headers=headers, params=params)
+                statements.clear()
+                started = time.perf_counter()
+                for _ in range(repeats):
+                    resp = await client.get(url, headers=headers, params=params)
+                elapsed = (time.perf_counter() - started) / repeats
+                print(f"members={size:6} page={len(resp.json()):5} queries/request={len(statements) / repeats:.0f} "
+                      f"latency={elapsed * 1000:.1f}ms")
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.repeats))
@@ -0,0 +1,66 @@
+"""Одновременные мелкие записи в SQLite: настройки по умолчанию против WAL-режима с пакетными коммитами.
+
+    python benchmarks/bench_sqlite.py --writes 2000 --concurrency 50
+
+Каждая запись — вставка одной строки telegram_links отдельной транзакцией
+(как /telegram/link/start). Печатает пропускную способность и число COMMIT.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from sqlalchemy import event as sa_event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from app.db import Base, configure_sqlite
+from app.models import TelegramLink, User
+from app.services_writer import WriteBatcher
+
+
+async def run(path: str, tuned: bool, writes: int, concurrency: int) -> None:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    if tuned:
+        configure_sqlite(engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+    async with session_factory() as session:
+        user = User(email="bench@example.com", password_hash="x")
+        session.add(user)
+        await session.commit()
+    commits = []
+    sa_event.listen(engine.sync_engine, "commit", lambda conn: commits.append(1))
+    batcher = WriteBatcher(session_factory, enabled=tuned)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def write(i: int):
+        async def insert_link(session):
+            session.add(TelegramLink(user_id=user.id, code=f"code-{i}"))
+
+        async with semaphore:
+            await batcher.submit(insert_link)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(write(i) for i in range(writes)))
+    elapsed = time.perf_counter() - started
+    await batcher.close()
+    await engine.dispose()
+    label = "tuned+batched" if tuned else "default"
+    print(f"{label:14} {writes} writes in {elapsed:.2f}s ({writes / elapsed:.0f} writes/s), commits={len(commits)}")
+
+
+async def main(writes: int, concurrency: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        await run(os.path.join(tmp, "default.db"), False, writes, concurrency)
+        await run(os.path.join(tmp, "tuned.db"), True, writes, concurrency)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.writes, args.concurrency))
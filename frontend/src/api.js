@@ -50,9 +50,16 @@ api.interceptors.response.use(
 );
 
 // ==== EVENTS ====
+// сервер отдаёт окно страницами, продолжение — в заголовке X-Next-Cursor
 export async function listEvents({ from, to }) {
-  const res = await api.get("/events", { params: { from, to } });
-  return res.data;
+  const events = [];
+  let cursor;
+  do {
+    const res = await api.get("/events", { params: { from, to, cursor } });
+    events.push(...res.data);
+    cursor = res.headers["x-next-cursor"];
+  } while (cursor);
+  return events;
 }
 
 export async function createEvent(body) {
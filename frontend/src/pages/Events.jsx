@@ -292,7 +292,7 @@ export default function Events() {
 
         <ul className="list">
           {events.map(ev => (
-            <li key={ev.id} className="item">
+            <li key={`${ev.id}-${ev.start_time}`} className="item">
               <div className="item-main">
                 <div className="item-title">
                   {ev.title}
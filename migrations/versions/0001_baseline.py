@@ -0,0 +1,122 @@
+"""baseline: схема, которую раньше создавали create_all и DO-блоки при старте
+
+Как и они, досоздаёт только недостающее: базы до Alembic бывают разного
+возраста (например, без таблиц компаний и events.company_id).
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-01-01 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name: str) -> bool:
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def _has_column(table: str, column: str) -> bool:
+    return column in {c["name"] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade() -> None:
+    if not _has_table("users"):
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("name", sa.String(120), nullable=True),
+            sa.Column("email", sa.String(255), nullable=False),
+            sa.Column("password_hash", sa.String(255), nullable=False),
+            sa.Column("telegram_id", sa.String(64), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+        )
+        op.create_index("ix_users_id", "users", ["id"])
+        op.create_index("ix_users_email", "users", ["email"], unique=True)
+        op.create_index("ix_users_telegram_id", "users", ["telegram_id"])
+
+    if not _has_table("companies"):
+        op.create_table(
+            "companies",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("name", sa.String(200), nullable=False),
+            sa.Column("description", sa.Text(), nullable=True),
+            sa.Column("created_by", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+        )
+        op.create_index("ix_companies_id", "companies", ["id"])
+        op.create_index("ix_companies_created_by", "companies", ["created_by"])
+
+    if not _has_table("events"):
+        op.create_table(
+            "events",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("company_id", sa.Integer(), sa.ForeignKey("companies.id", ondelete="CASCADE"), nullable=True),
+            sa.Column("title", sa.String(200), nullable=False),
+            sa.Column("description", sa.Text(), nullable=True),
+            sa.Column("start_time", sa.DateTime(), nullable=False),
+            sa.Column("recurrence", sa.String(50), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+        )
+        op.create_index("ix_events_user_id", "events", ["user_id"])
+        op.create_index("ix_events_company_id", "events", ["company_id"])
+        op.create_index("ix_events_start_time", "events", ["start_time"])
+    elif not _has_column("events", "company_id"):
+        # события из баз до появления компаний: колонку раньше добавлял DO-блок при старте
+        with op.batch_alter_table("events") as batch:
+            batch.add_column(sa.Column("company_id", sa.Integer(), nullable=True))
+            batch.create_foreign_key(
+                "fk_events_company_id_companies_id", "companies", ["company_id"], ["id"], ondelete="CASCADE",
+            )
+        op.create_index("ix_events_company_id", "events", ["company_id"])
+
+    if not _has_table("reminders"):
+        op.create_table(
+            "reminders",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("event_id", sa.Integer(), sa.ForeignKey("events.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("remind_at", sa.DateTime(), nullable=False),
+            sa.Column("sent", sa.Boolean(), nullable=False),
+        )
+        op.create_index("ix_reminders_event_id", "reminders", ["event_id"])
+        op.create_index("ix_reminders_remind_at", "reminders", ["remind_at"])
+
+    if not _has_table("telegram_links"):
+        op.create_table(
+            "telegram_links",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("code", sa.String(32), nullable=False),
+            sa.Column("confirmed", sa.Boolean(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+        )
+        op.create_index("ix_telegram_links_user_id", "telegram_links", ["user_id"])
+        op.create_index("ix_telegram_links_code", "telegram_links", ["code"], unique=True)
+
+    if not _has_table("company_members"):
+        op.create_table(
+            "company_members",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("company_id", sa.Integer(), sa.ForeignKey("companies.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+            sa.Column("role", sa.String(50), nullable=False),
+            sa.Column("joined_at", sa.DateTime(), nullable=False),
+        )
+        op.create_index("ix_company_members_id", "company_members", ["id"])
+        op.create_index("ix_company_members_company_id", "company_members", ["company_id"])
+        op.create_index("ix_company_members_user_id", "company_members", ["user_id"])
+
+
+def downgrade() -> None:
+    op.drop_table("company_members")
+    op.drop_table("telegram_links")
+    op.drop_table("reminders")
+    op.drop_table("events")
+    op.drop_table("companies")
+    op.drop_table("users")
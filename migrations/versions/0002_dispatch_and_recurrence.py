@@ -0,0 +1,48 @@
+"""ledger доставок, поля повторений и индексы диспетчера и проверок доступа
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2025-01-02 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_reminders_sent_remind_at", "reminders", ["sent", "remind_at"])
+
+    with op.batch_alter_table("events") as batch:
+        batch.add_column(sa.Column("reminder_offsets", sa.String(255), nullable=True))
+        batch.add_column(sa.Column("expanded_until", sa.DateTime(), nullable=True))
+    op.create_index("ix_events_expanded_until", "events", ["expanded_until"])
+
+    op.create_index("ix_company_members_user_company", "company_members", ["user_id", "company_id"])
+
+    op.create_table(
+        "reminder_deliveries",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("reminder_id", sa.Integer(), sa.ForeignKey("reminders.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("chat_id", sa.String(64), nullable=False),
+        sa.Column("status", sa.String(16), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("next_attempt_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.UniqueConstraint("reminder_id", "chat_id", name="uq_reminder_deliveries_reminder_chat"),
+    )
+    op.create_index("ix_reminder_deliveries_reminder_id", "reminder_deliveries", ["reminder_id"])
+
+
+def downgrade() -> None:
+    op.drop_table("reminder_deliveries")
+    op.drop_index("ix_company_members_user_company", table_name="company_members")
+    op.drop_index("ix_events_expanded_until", table_name="events")
+    with op.batch_alter_table("events") as batch:
+        batch.drop_column("expanded_until")
+        batch.drop_column("reminder_offsets")
+    op.drop_index("ix_reminders_sent_remind_at", table_name="reminders")
@@ -0,0 +1,39 @@
+"""архив отправленных напоминаний и частичный индекс неотправленных
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2025-01-03 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "reminders_archive",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("reminder_id", sa.Integer(), nullable=False),
+        sa.Column("event_id", sa.Integer(), nullable=False),
+        sa.Column("remind_at", sa.DateTime(), nullable=False),
+        sa.Column("archived_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_reminders_archive_reminder_id", "reminders_archive", ["reminder_id"])
+    op.create_index("ix_reminders_archive_event_id", "reminders_archive", ["event_id"])
+
+    op.drop_index("ix_reminders_sent_remind_at", table_name="reminders")
+    op.create_index(
+        "ix_reminders_pending_remind_at", "reminders", ["remind_at", "id"],
+        sqlite_where=sa.text("sent = 0"), postgresql_where=sa.text("sent = false"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_reminders_pending_remind_at", table_name="reminders")
+    op.create_index("ix_reminders_sent_remind_at", "reminders", ["sent", "remind_at"])
+    op.drop_table("reminders_archive")
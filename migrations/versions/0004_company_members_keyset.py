@@ -0,0 +1,21 @@
+"""индекс для постраничного списка участников компании
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2025-01-04 00:00:00
+"""
+from alembic import op
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_company_members_company_joined", "company_members", ["company_id", "joined_at", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_company_members_company_joined", table_name="company_members")
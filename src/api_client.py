@@ -0,0 +1,78 @@
+from typing import Optional
+import httpx
+
+try:
+    from .token_store import TokenStore
+except ImportError:  # запуск скриптом: python src/bot.py
+    from token_store import TokenStore
+
+
+class NotLinked(Exception):
+    """У пользователя Telegram нет привязанного аккаунта — токен не выдаётся."""
+
+
+class ApiClient:
+    """Один долгоживущий HTTP-клиент бота к API с пулом keep-alive соединений.
+
+    Токены берутся из TokenStore; одновременные обновления токена одного
+    пользователя схлопываются в один запрос /telegram/token.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        token_store: TokenStore,
+        timeout: float = 10.0,
+        connect_timeout: float = 5.0,
+        retries: int = 2,
+        max_connections: int = 20,
+        max_keepalive: int = 10,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.token_store = token_store
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive),
+            # повтор только при ошибке установки соединения — запрос до API не дошёл, повторять безопасно
+            transport=transport or httpx.AsyncHTTPTransport(retries=retries),
+        )
+
+    async def token(self, user_id: str, rejected: Optional[str] = None) -> Optional[str]:
+        """Актуальный JWT пользователя.
+
+        `rejected` — токен, на который API ответил 401. Если пока ждали замок,
+        его уже заменили, возвращаем новый без запроса: так пачка одновременных
+        команд делает одно обновление вместо десятка.
+        """
+        async with self.token_store.lock(user_id):
+            token = self.token_store.get(user_id)
+            if token and token != rejected and self.token_store.is_fresh(token):
+                return token
+            resp = await self.client.post("/telegram/token", params={"telegram_id": user_id})
+            if resp.status_code == 200:
+                new_token = resp.json().get("access_token")
+                if new_token:
+                    self.token_store.set(user_id, new_token)
+                    return new_token
+            if token and token != rejected:
+                # обновить не удалось: старый токен ещё может сработать
+                return token
+            if rejected is not None:
+                self.token_store.discard(user_id)
+            return None
+
+    async def authorized(self, method: str, url: str, user_id: str, **kwargs) -> httpx.Response:
+        """Запрос от имени пользователя; на 401 токен обновляется и запрос повторяется один раз."""
+        token = await self.token(user_id)
+        if not token:
+            raise NotLinked(user_id)
+        resp = await self.client.request(method, url, headers={"Authorization": f"Bearer {token}"}, **kwargs)
+        if resp.status_code == 401:
+            token = await self.token(user_id, rejected=token)
+            if token:
+                resp = await self.client.request(method, url, headers={"Authorization": f"Bearer {token}"}, **kwargs)
+        return resp
+
+    async def close(self) -> None:
+        await self.client.aclose()
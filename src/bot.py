@@ -8,6 +8,12 @@ import os
 import httpx
 from dotenv import load_dotenv
 from pathlib import Path
+try:
+    from .token_store import TokenStore
+    from .api_client import ApiClient, NotLinked
+except ImportError:  # запуск скриптом: python src/bot.py
+    from token_store import TokenStore
+    from api_client import ApiClient, NotLinked
 
 # Загружаем переменные окружения из .env файла
 load_dotenv()
@@ -17,13 +23,24 @@ BASE_DIR = Path(__file__).resolve().parent
 DATA_FILE = BASE_DIR / "storage.json"
 TOKENS_FILE = BASE_DIR / "tokens.json"
 
-if not TOKEN:
-    print("❌ BOT_TOKEN not found in environment variables!")
-    exit(1)
-
-bot = Bot(token=TOKEN)
 dp = Dispatcher()
 scheduler = AsyncIOScheduler()
+token_store = TokenStore(TOKENS_FILE)
+# общий клиент к API создаётся в main() или start_webhook()
+api: ApiClient = None
+_bot: Bot = None
+# апдейты из webhook, которые ещё обрабатываются
+_updates: set = set()
+
+
+def get_bot() -> Bot:
+    """Бот создаётся при первом обращении, поэтому модуль можно импортировать без BOT_TOKEN."""
+    global _bot
+    if _bot is None:
+        if not TOKEN:
+            raise RuntimeError("BOT_TOKEN not found in environment variables")
+        _bot = Bot(token=TOKEN)
+    return _bot
 
 def load_events():
     return json.loads(DATA_FILE.read_text(encoding="utf-8")) if DATA_FILE.exists() else {}
@@ -32,13 +49,6 @@ def save_events(events):
     DATA_FILE.parent.mkdir(parents=True, exist_ok=True)
     DATA_FILE.write_text(json.dumps(events, indent=4, ensure_ascii=False), encoding="utf-8")
 
-def load_tokens():
-    return json.loads(TOKENS_FILE.read_text(encoding="utf-8")) if TOKENS_FILE.exists() else {}
-
-def save_tokens(tokens):
-    TOKENS_FILE.parent.mkdir(parents=True, exist_ok=True)
-    TOKENS_FILE.write_text(json.dumps(tokens, indent=4, ensure_ascii=False), encoding="utf-8")
-
 
 @dp.message(Command("start"))
 async def start_command(message: types.Message):
@@ -57,99 +67,52 @@ async def add_event(message: types.Message):
         await message.answer("❗ Wrong date format! Use YYYY-MM-DD HH:MM")
         return
 
-    # Получаем/обновляем JWT для пользователя
     user_id = str(message.from_user.id)
-    tokens = load_tokens()
-    token = tokens.get(user_id)
+    # Создаем событие через API; токен берётся из кэша и обновляется по telegram_id
+    event_data = {
+        "title": text,
+        "description": f"Создано через Telegram бота",
+        "start_time": event_time.isoformat(),
+        "reminders_minutes_before": [5, 30]
+    }
     try:
-        api_url = os.getenv("API_URL", "http://localhost:8000")
-        async with httpx.AsyncClient(timeout=10) as client:
-            if not token:
-                # Пытаемся получить токен по telegram_id
-                token_resp = await client.post(f"{api_url}/telegram/token", params={"telegram_id": user_id})
-                if token_resp.status_code == 200:
-                    token = token_resp.json().get("access_token")
-                    if token:
-                        tokens[user_id] = token
-                        save_tokens(tokens)
-                else:
-                    await message.answer("❗ Сначала привяжите аккаунт командой /link <code> на сайте")
-                    return
-
-            # Создаем событие через API с корректным JWT
-            event_data = {
-                "title": text,
-                "description": f"Создано через Telegram бота",
-                "start_time": event_time.isoformat(),
-                "reminders_minutes_before": [5, 30]
-            }
-            create_resp = await client.post(
-                f"{api_url}/events/",
-                json=event_data,
-                headers={"Authorization": f"Bearer {token}"}
-            )
-            if create_resp.status_code == 200:
-                await message.answer(f"✅ Event added for {event_time.strftime('%Y-%m-%d %H:%M')}")
-            elif create_resp.status_code == 401:
-                # Токен устарел — пробуем обновить по telegram_id
-                token_resp = await client.post(f"{api_url}/telegram/token", params={"telegram_id": user_id})
-                if token_resp.status_code == 200:
-                    token = token_resp.json().get("access_token")
-                    if token:
-                        tokens[user_id] = token
-                        save_tokens(tokens)
-                        retry_resp = await client.post(
-                            f"{api_url}/events/",
-                            json=event_data,
-                            headers={"Authorization": f"Bearer {token}"}
-                        )
-                        if retry_resp.status_code == 200:
-                            await message.answer(f"✅ Event added for {event_time.strftime('%Y-%m-%d %H:%M')}")
-                            return
-                await message.answer("❗ Не удалось создать событие. Повторите привязку /link")
-            else:
-                await message.answer("❗ Не удалось создать событие. Попробуйте позже.")
+        create_resp = await api.authorized("POST", "/events/", user_id, json=event_data)
+        if create_resp.status_code == 200:
+            await message.answer(f"✅ Event added for {event_time.strftime('%Y-%m-%d %H:%M')}")
+        elif create_resp.status_code == 401:
+            await message.answer("❗ Не удалось создать событие. Повторите привязку /link")
+        else:
+            await message.answer("❗ Не удалось создать событие. Попробуйте позже.")
+    except NotLinked:
+        await message.answer("❗ Сначала привяжите аккаунт командой /link <code> на сайте")
     except Exception as e:
         print(f"Error creating event: {e}")
         await message.answer("❗ Service unavailable. Try later.")
 
 async def send_reminder(user_id, text):
     try:
-        await bot.send_message(user_id, f"🔔 Reminder: {text}")
+        await get_bot().send_message(user_id, f"🔔 Reminder: {text}")
     except Exception as e:
         print("Error sending reminder:", e)
 
 @dp.message(Command("myevents"))
 async def list_events(message: types.Message):
     user_id = str(message.from_user.id)
-    tokens = load_tokens()
-    token = tokens.get(user_id)
     try:
-        api_url = os.getenv("API_URL", "http://localhost:8000")
-        async with httpx.AsyncClient(timeout=10) as client:
-            if not token:
-                token_resp = await client.post(f"{api_url}/telegram/token", params={"telegram_id": user_id})
-                if token_resp.status_code == 200:
-                    token = token_resp.json().get("access_token")
-                    if token:
-                        tokens[user_id] = token
-                        save_tokens(tokens)
-                else:
-                    await message.answer("❗ Сначала привяжите аккаунт командой /link <code>")
-                    return
-
-            resp = await client.get(f"{api_url}/events/", headers={"Authorization": f"Bearer {token}"})
-            if resp.status_code == 200:
-                events = resp.json()
-                if not events:
-                    await message.answer("📭 No events yet.")
-                    return
-                reply = "\n".join([f"- {e['start_time']} → {e['title']}" for e in events])
-                await message.answer(f"🗓️ Your events:\n{reply}")
-            elif resp.status_code == 401:
-                await message.answer("❗ Сессия истекла. Повторите привязку /link")
-            else:
-                await message.answer("❗ Please link your account first with /link")
+        resp = await api.authorized("GET", "/events/", user_id)
+        if resp.status_code == 200:
+            events = resp.json()
+            if not events:
+                await message.answer("📭 No events yet.")
+                return
+            reply = "\n".join([f"- {e['start_time']} → {e['title']}" for e in events])
+            await message.answer(f"🗓️ Your events:\n{reply}")
+        elif resp.status_code == 401:
+            await message.answer("❗ Сессия истекла. Повторите привязку /link")
+        else:
+            await message.answer("❗ Please link your account first with /link")
+    except NotLinked:
+        await message.answer("❗ Сначала привяжите аккаунт командой /link <code>")
     except Exception as e:
         print(f"Error getting events: {e}")
         await message.answer("❗ Service unavailable. Try later.")
@@ -163,29 +126,67 @@ async def link_account(message: types.Message):
         return
     code = parts[1].strip()
     try:
-        api_url = os.getenv("API_URL", "http://localhost:8000")
-        async with httpx.AsyncClient(timeout=10) as client:
-            resp = await client.post(
-                f"{api_url}/telegram/link/confirm",
-                params={"telegram_id": str(message.from_user.id), "code": code}
-            )
-            if resp.status_code == 200:
-                data = resp.json()
-                access_token = data.get("access_token")
-                if access_token:
-                    tokens = load_tokens()
-                    tokens[str(message.from_user.id)] = access_token
-                    save_tokens(tokens)
-                await message.answer("✅ Account linked!")
-            else:
-                await message.answer("❗ Link failed. Check code on website.")
+        resp = await api.client.post(
+            "/telegram/link/confirm",
+            params={"telegram_id": str(message.from_user.id), "code": code}
+        )
+        if resp.status_code == 200:
+            data = resp.json()
+            access_token = data.get("access_token")
+            if access_token:
+                token_store.set(str(message.from_user.id), access_token)
+            await message.answer("✅ Account linked!")
+        else:
+            await message.answer("❗ Link failed. Check code on website.")
     except Exception as e:
         print(f"Error linking account: {e}")
         await message.answer("❗ Service unavailable. Try later.")
 
+async def start_webhook(app, token: str = "", webhook_url: str = "", secret: str = ""):
+    """Режим webhook: апдейты приходят в FastAPI-приложение `app`.
+
+    Запросы бота к API идут в тот же процесс через ASGI, без сети. Если задан
+    `webhook_url`, адрес регистрируется в Telegram вместе с секретом.
+    """
+    global api, TOKEN
+    TOKEN = token or TOKEN
+    api = ApiClient("http://api", token_store, transport=httpx.ASGITransport(app=app))
+    if webhook_url:
+        await get_bot().set_webhook(webhook_url, secret_token=secret or None)
+
+
+def feed_update(data: dict) -> asyncio.Task:
+    """Передать апдейт из webhook диспетчеру; обработка идёт в фоне, параллельно с другими."""
+    bot = get_bot()
+    update = types.Update.model_validate(data, context={"bot": bot})
+    task = asyncio.create_task(dp.feed_update(bot, update))
+    _updates.add(task)
+    task.add_done_callback(_updates.discard)
+    return task
+
+
+async def stop_webhook():
+    if _updates:
+        await asyncio.gather(*_updates, return_exceptions=True)
+    if api is not None:
+        await api.close()
+    await token_store.close()
+    if _bot is not None:
+        await _bot.session.close()
+
+
 async def main():
+    global api
+    if not TOKEN:
+        print("❌ BOT_TOKEN not found in environment variables!")
+        exit(1)
+    api = ApiClient(os.getenv("API_URL", "http://localhost:8000"), token_store)
     scheduler.start()
-    await dp.start_polling(bot)
+    try:
+        await dp.start_polling(get_bot())
+    finally:
+        await api.close()
+        await token_store.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,112 @@
+import asyncio
+import base64
+import json
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+
+def token_expires_at(token: str) -> Optional[float]:
+    """Время истечения JWT (exp) без проверки подписи: секрета у бота нет, нужно только знать, когда обновлять."""
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return float(claims["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+class TokenStore:
+    """JWT пользователей бота: в памяти, с отложенной атомарной записью в JSON-файл.
+
+    Файл читается один раз; изменения копятся и пишутся не чаще раза в
+    `flush_delay` секунд через временный файл и os.replace, поэтому файл
+    никогда не остаётся записанным наполовину. Формат файла прежний:
+    {"<telegram id>": "<jwt>"}.
+    """
+
+    def __init__(self, path: Path, flush_delay: float = 1.0, refresh_margin: float = 300.0):
+        self.path = Path(path)
+        self.flush_delay = flush_delay
+        # за сколько секунд до exp токен считается устаревшим
+        self.refresh_margin = refresh_margin
+        self._tokens: Optional[dict[str, str]] = None
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_now = asyncio.Event()
+        self._write_lock = asyncio.Lock()
+        self._dirty = False
+
+    def _data(self) -> dict[str, str]:
+        if self._tokens is None:
+            try:
+                self._tokens = json.loads(self.path.read_text(encoding="utf-8"))
+            except FileNotFoundError:
+                self._tokens = {}
+        return self._tokens
+
+    def get(self, user_id: str) -> Optional[str]:
+        return self._data().get(user_id)
+
+    def set(self, user_id: str, token: str) -> None:
+        self._data()[user_id] = token
+        self._schedule_flush()
+
+    def discard(self, user_id: str) -> None:
+        if self._data().pop(user_id, None) is not None:
+            self._schedule_flush()
+
+    def lock(self, user_id: str) -> asyncio.Lock:
+        """Замок пользователя: одновременные команды одного чата не обновляют токен дважды."""
+        lock = self._locks.get(user_id)
+        if lock is None:
+            lock = self._locks[user_id] = asyncio.Lock()
+        return lock
+
+    def is_fresh(self, token: Optional[str], now: Optional[float] = None) -> bool:
+        if not token:
+            return False
+        expires_at = token_expires_at(token)
+        # токен без exp не обновляем заранее — это сделает ответ 401
+        return expires_at is None or expires_at - self.refresh_margin > (now or time.time())
+
+    def _schedule_flush(self) -> None:
+        self._dirty = True
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(self._delayed_flush())
+
+    async def _delayed_flush(self) -> None:
+        # изменения, пришедшие во время записи, сохраняются следующим проходом
+        while self._dirty:
+            try:
+                await asyncio.wait_for(self._flush_now.wait(), self.flush_delay)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    async def flush(self) -> None:
+        async with self._write_lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            snapshot = json.dumps(self._data(), ensure_ascii=False)
+            try:
+                await asyncio.to_thread(self._write, snapshot)
+            except OSError as e:
+                print(f"Error saving tokens: {e}")
+
+    def _write(self, snapshot: str) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(snapshot, encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    async def close(self) -> None:
+        """Дописать несохранённые изменения (при остановке бота)."""
+        if self._flush_task is not None and not self._flush_task.done():
+            # не отменяем задачу посреди записи, а будим её
+            self._flush_now.set()
+            await self._flush_task
+            self._flush_now.clear()
+        await self.flush()
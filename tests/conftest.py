@@ -0,0 +1,71 @@
+import asyncio
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+import httpx
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+
+class ApiHarness:
+    """FastAPI-приложение на временной SQLite базе; startup-хуки (DDL, планировщик) не запускаются."""
+
+    def __init__(self, app, engine, session_factory):
+        self.app = app
+        self.engine = engine
+        self.session_factory = session_factory
+
+    def count_statements(self):
+        """Список, в который попадает каждый SQL-запрос к тестовой базе."""
+        from sqlalchemy import event as sa_event
+        statements = []
+        sa_event.listen(self.engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        return statements
+
+    def run(self, scenario):
+        async def runner():
+            transport = httpx.ASGITransport(app=self.app)
+            try:
+                async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                    return await scenario(client)
+            finally:
+                # соединения aiosqlite привязаны к event loop'у этого запуска
+                await self.engine.dispose()
+        return asyncio.run(runner())
+
+    @staticmethod
+    async def login(client, email: str, password: str = "secret") -> dict:
+        await client.post("/auth/register", json={"name": email.split("@")[0], "email": email, "password": password})
+        resp = await client.post("/auth/login", data={"username": email, "password": password})
+        return {"Authorization": f"Bearer {resp.json()['access_token']}"}
+
+
+@pytest.fixture
+def api(tmp_path):
+    from app.db import Base, get_db, get_read_db
+    from app.main import app
+    from app.services_directory import recipient_directory
+    from app.auth import clear_principal_cache
+
+    url = f"sqlite+aiosqlite:///{tmp_path / 'api.db'}"
+
+    async def create_schema():
+        engine = create_async_engine(url)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        await engine.dispose()
+
+    asyncio.run(create_schema())
+    engine = create_async_engine(url)
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+
+    async def override_get_db():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    recipient_directory.clear()
+    clear_principal_cache()
+    yield ApiHarness(app, engine, session_factory)
+    app.dependency_overrides.clear()
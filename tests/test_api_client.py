@@ -0,0 +1,43 @@
+import asyncio
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+import httpx
+from src.api_client import ApiClient, NotLinked
+from src.token_store import TokenStore
+
+
+def test_concurrent_commands_refresh_token_once(tmp_path):
+    issued = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/telegram/token":
+            if request.url.params["telegram_id"] == "7":
+                issued.append(f"token-{len(issued)}")
+                return httpx.Response(200, json={"access_token": issued[-1]})
+            return httpx.Response(404, json={"detail": "not linked"})
+        # API принимает только последний выданный токен
+        if issued and request.headers["Authorization"] == f"Bearer {issued[-1]}":
+            return httpx.Response(200, json=[])
+        return httpx.Response(401)
+
+    async def scenario():
+        store = TokenStore(tmp_path / "tokens.json", flush_delay=0)
+        store.set("7", "revoked")
+        api = ApiClient("http://api", store, transport=httpx.MockTransport(handler))
+        try:
+            responses = await asyncio.gather(*(api.authorized("GET", "/events/", "7") for _ in range(20)))
+            try:
+                await api.authorized("GET", "/events/", "8")
+                linked = True
+            except NotLinked:
+                linked = False
+            return [r.status_code for r in responses], linked
+        finally:
+            await api.close()
+            await store.close()
+
+    statuses, linked = asyncio.run(scenario())
+    assert statuses == [200] * 20
+    assert issued == ["token-0"]
+    assert not linked
@@ -0,0 +1,156 @@
+import asyncio
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from sqlalchemy import event as sa_event, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from app.db import Base, InstrumentedQueuePool, configure_sqlite, engine_options, pool_stats
+from app.models import User
+from app.services_writer import WriteBatcher
+
+
+def test_engine_options_tune_pool_only_for_server_databases():
+    pg = engine_options("postgresql+asyncpg://u:p@db/calendar")
+    assert pg["poolclass"] is InstrumentedQueuePool
+    assert "statement_cache_size" in pg["connect_args"]
+    assert "pool_size" not in engine_options("sqlite+aiosqlite:///./app.db")
+
+
+def test_pool_records_checkout_wait(tmp_path):
+    async def scenario():
+        engine = create_async_engine(
+            f"sqlite+aiosqlite:///{tmp_path / 'pool.db'}",
+            poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=0,
+        )
+
+        async def hold(seconds):
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+                busy = pool_stats(engine)
+                await asyncio.sleep(seconds)
+                return busy
+
+        try:
+            busy, _ = await asyncio.gather(hold(0.2), hold(0))
+            return busy, pool_stats(engine)
+        finally:
+            await engine.dispose()
+
+    busy, stats = asyncio.run(scenario())
+    assert busy["checked_out"] == 1
+    assert stats["checked_out"] == 0 and stats["checkout_count"] == 2
+    # ждала только вторая выдача — первая открыла соединение в пустом пуле
+    assert stats["wait_count"] == 1
+    assert stats["wait_seconds_max"] >= 0.15
+
+
+def test_sqlite_mode_batches_small_writes(tmp_path):
+    async def scenario():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'writer.db'}")
+        configure_sqlite(engine)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        commits = []
+        sa_event.listen(engine.sync_engine, "commit", lambda conn: commits.append(1))
+        batcher = WriteBatcher(async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession),
+                               enabled=True, max_batch=100, max_delay=0.01)
+
+        def add_user(email):
+            async def job(session):
+                session.add(User(email=email, password_hash="x"))
+            return job
+
+        try:
+            emails = [f"u{i}@example.com" for i in range(50)] + ["u0@example.com"]
+            results = await asyncio.gather(*(batcher.submit(add_user(e)) for e in emails), return_exceptions=True)
+            async with engine.connect() as conn:
+                users = (await conn.execute(text("SELECT count(*) FROM users"))).scalar()
+                journal = (await conn.execute(text("PRAGMA journal_mode"))).scalar()
+                foreign_keys = (await conn.execute(text("PRAGMA foreign_keys"))).scalar()
+            return results, users, len(commits), journal, foreign_keys
+        finally:
+            await batcher.close()
+            await engine.dispose()
+
+    results, users, commits, journal, foreign_keys = asyncio.run(scenario())
+    assert isinstance(results[-1], IntegrityError)
+    assert results[:-1] == [None] * 50
+    assert users == 50
+    assert commits <= 3
+    assert (journal, foreign_keys) == ("wal", 1)
+
+
+def test_write_batcher_close_commits_the_batch_in_flight(tmp_path):
+    async def scenario():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'close.db'}")
+        configure_sqlite(engine)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        batcher = WriteBatcher(async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession),
+                               enabled=True, max_batch=5, max_delay=0.01)
+
+        def add_user(email):
+            async def job(session):
+                # медленное задание: close() приходит, пока пачка ещё не закоммичена
+                await asyncio.sleep(0.01)
+                session.add(User(email=email, password_hash="x"))
+            return job
+
+        try:
+            pending = [asyncio.ensure_future(batcher.submit(add_user(f"u{i}@example.com"))) for i in range(12)]
+            await asyncio.sleep(0.02)
+            await batcher.close()
+            results = await asyncio.gather(*pending, return_exceptions=True)
+            async with engine.connect() as conn:
+                users = (await conn.execute(text("SELECT count(*) FROM users"))).scalar()
+            return results, users
+        finally:
+            await engine.dispose()
+
+    results, users = asyncio.run(scenario())
+    assert results == [None] * 12
+    assert users == 12
+
+
+def test_route_writes_go_through_the_enabled_write_batcher(api, monkeypatch):
+    from app.services_writer import write_batcher
+    monkeypatch.setattr(write_batcher, "enabled", True)
+    monkeypatch.setattr(write_batcher, "session_factory", api.session_factory)
+    monkeypatch.setattr(write_batcher, "max_delay", 0.001)
+
+    async def scenario(client):
+        try:
+            owner = await api.login(client, "owner@example.com")
+            await api.login(client, "member@example.com")
+            jobs_before = write_batcher.jobs
+            created = (await client.post("/events/", headers=owner, json={
+                "title": "Standup", "start_time": "2030-05-01T09:00:00", "reminders_minutes_before": [10],
+            })).json()
+            patched = (await client.patch(f"/events/{created['id']}", headers=owner, json={
+                "title": "Daily standup", "start_time": "2030-05-01T10:00:00",
+            })).json()
+            reminders = (await client.get(f"/events/{created['id']}/reminders", headers=owner)).json()
+            imported = (await client.post("/events/bulk", headers=owner, json=[
+                {"title": "Imported", "start_time": "2030-06-01T09:00:00"},
+            ])).json()
+            company = (await client.post("/companies/", headers=owner, json={"name": "Acme"})).json()
+            member = (await client.post(f"/companies/{company['id']}/members", headers=owner,
+                                        json={"user_email": "member@example.com"})).json()
+            role = await client.put(f"/companies/{company['id']}/members/{member['id']}/role",
+                                    headers=owner, params={"role": "admin"})
+            removed = await client.delete(f"/companies/{company['id']}/members/{member['id']}", headers=owner)
+            deleted = await client.delete(f"/companies/{company['id']}", headers=owner)
+            return (created, patched, reminders, imported, member, role.status_code, removed.status_code,
+                    deleted.status_code, write_batcher.jobs - jobs_before)
+        finally:
+            await write_batcher.close()
+
+    created, patched, reminders, imported, member, role, removed, deleted, jobs = api.run(scenario)
+    assert patched["title"] == "Daily standup" and patched["start_time"] == "2030-05-01T10:00:00"
+    assert sorted(r["remind_at"] for r in reminders) == ["2030-05-01T09:50:00", "2030-05-01T10:00:00"]
+    assert imported["created"] == 1
+    assert member["user"]["email"] == "member@example.com"
+    assert (role, removed, deleted) == (200, 200, 200)
+    # событие, правка, импорт, компания, участник, роль, удаление участника и компании
+    assert jobs == 8
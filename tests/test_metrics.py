@@ -0,0 +1,82 @@
+import asyncio
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from app import metrics, services_scheduler
+from app.config import settings
+from app.services_reminders import refresh_due_backlog
+
+
+def _samples(text: str) -> dict[str, float]:
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+
+def test_metrics_endpoint_reports_routes_backlog_and_pools(api):
+    async def scenario(client):
+        headers = await api.login(client, "owner@example.com")
+        created = await client.post("/events/", headers=headers, json={
+            "title": "Overdue", "start_time": "2000-01-01T09:00:00",
+        })
+        await client.get(f"/events/{created.json()['id']}", headers=headers)
+        # очередь считает тик диспетчера, а не сам опрос
+        async with api.session_factory() as db:
+            await refresh_due_backlog(db)
+        statements = api.count_statements()
+        resp = await client.get("/metrics")
+        assert statements == []
+        return resp.status_code, resp.headers["content-type"], resp.text
+
+    status, content_type, text = api.run(scenario)
+    samples = _samples(text)
+    assert status == 200 and content_type.startswith("text/plain; version=0.0.4")
+    # шаблон маршрута, а не путь с id
+    assert samples['http_request_duration_seconds_count{method="GET",route="/events/{event_id}",status="200"}'] >= 1
+    assert samples['http_request_duration_seconds_bucket{method="GET",route="/events/{event_id}",status="200",le="+Inf"}'] >= 1
+    assert samples["reminders_due_backlog"] == 1
+    assert samples["reminders_due_oldest_seconds"] > 0
+    assert 'db_pool_checked_out{pool="primary"}' in samples
+    assert 'cache_hits_total{cache="principal"}' in samples
+    assert "delivery_queue_depth" in samples
+
+
+def test_metrics_token_is_required_when_configured(api, monkeypatch):
+    monkeypatch.setattr(settings, "metrics_token", "scrape-secret")
+
+    async def scenario(client):
+        anonymous = await client.get("/metrics")
+        wrong = await client.get("/metrics", headers={"Authorization": "Bearer nope"})
+        scraper = await client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+        return anonymous.status_code, wrong.status_code, scraper.status_code
+
+    assert api.run(scenario) == (401, 401, 200)
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = metrics.Registry()
+    histogram = metrics.Histogram("demo_seconds", "Demo", ("kind",), buckets=(0.1, 1.0), registry=registry)
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, kind='a"b')
+    samples = _samples(registry.render())
+    assert samples['demo_seconds_bucket{kind="a\\"b",le="0.1"}'] == 2
+    assert samples['demo_seconds_bucket{kind="a\\"b",le="1.0"}'] == 3
+    assert samples['demo_seconds_bucket{kind="a\\"b",le="+Inf"}'] == 4
+    assert samples['demo_seconds_sum{kind="a\\"b"}'] == 3.65
+    assert samples['demo_seconds_count{kind="a\\"b"}'] == 4
+
+
+def test_failed_dispatch_tick_is_logged_and_counted(monkeypatch, caplog):
+    async def broken(db):
+        raise RuntimeError("database is gone")
+
+    monkeypatch.setattr(services_scheduler, "expand_recurring_events", broken)
+    errors = metrics.dispatch_ticks_total.value(outcome="error")
+    ticks = metrics.dispatch_tick_seconds.count()
+    asyncio.run(services_scheduler.check_reminders())
+    assert metrics.dispatch_ticks_total.value(outcome="error") == errors + 1
+    assert metrics.dispatch_tick_seconds.count() == ticks + 1
+    assert "Reminder dispatch tick failed" in caplog.text
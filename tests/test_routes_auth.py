@@ -0,0 +1,58 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from passlib.context import CryptContext
+from sqlalchemy import select
+from app import auth
+from app.models import User
+
+
+def test_login_rehashes_password_when_rounds_change(api, monkeypatch):
+    async def register(client):
+        await api.login(client, "old@example.com")
+
+    async def login_and_read_hash(client):
+        resp = await client.post("/auth/login", data={"username": "old@example.com", "password": "secret"})
+        async with api.session_factory() as db:
+            stored = (await db.execute(select(User.password_hash))).scalar_one()
+        return resp.status_code, stored
+
+    monkeypatch.setattr(auth, "pwd_context", CryptContext(schemes=["pbkdf2_sha256"], pbkdf2_sha256__default_rounds=1000))
+    api.run(register)
+    rounds = 2000
+    monkeypatch.setattr(auth, "pwd_context", CryptContext(
+        schemes=["pbkdf2_sha256"],
+        pbkdf2_sha256__default_rounds=rounds,
+        pbkdf2_sha256__min_rounds=rounds,
+        pbkdf2_sha256__max_rounds=rounds,
+    ))
+    status, stored = api.run(login_and_read_hash)
+    assert status == 200
+    assert stored.startswith(f"$pbkdf2-sha256${rounds}$")
+
+
+def test_invalidated_users_are_tracked_in_a_bounded_cache(api, monkeypatch):
+    from app.cache import LRUCache
+    monkeypatch.setattr(auth, "_invalidated_at", LRUCache(maxsize=2, ttl=60))
+    statements = api.count_statements()
+
+    async def scenario(client):
+        headers = await api.login(client, "owner@example.com")
+        await client.get("/auth/me", headers=headers)
+        statements.clear()
+        await client.get("/auth/me", headers=headers)
+        cached = len(statements)
+        me = (await client.get("/auth/me", headers=headers)).json()
+        auth.invalidate_user(me["id"])
+        statements.clear()
+        await client.get("/auth/me", headers=headers)
+        reloaded = len(statements)
+        for user_id in (1001, 1002):
+            auth.invalidate_user(user_id)
+        return cached, reloaded, len(auth._invalidated_at), len(auth._principal_cache)
+
+    cached, reloaded, marks, principals = api.run(scenario)
+    assert cached == 0
+    assert reloaded == 1
+    # отметка вытеснена — закэшированные токены сброшены, а не приняты с устаревшими данными
+    assert (marks, principals) == (2, 0)
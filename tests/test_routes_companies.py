@@ -0,0 +1,128 @@
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from sqlalchemy import delete, insert
+from app.models import CompanyMember, User
+
+
+def test_add_member_returns_member_without_reloading(api):
+    statements = api.count_statements()
+
+    async def scenario(client):
+        owner = await api.login(client, "owner@example.com")
+        await api.login(client, "new@example.com")
+        company = (await client.post("/companies/", headers=owner, json={"name": "Acme"})).json()
+        statements.clear()
+        resp = await client.post(f"/companies/{company['id']}/members", headers=owner,
+                                 json={"user_email": "new@example.com"})
+        return resp.status_code, resp.json(), list(statements)
+
+    status, member, queries = api.run(scenario)
+    assert status == 200
+    assert member["role"] == "member" and member["user"]["email"] == "new@example.com"
+    # права, пользователь, существующее членство, INSERT — и никаких перечитываний после commit
+    assert len(queries) == 4
+
+
+def test_list_members_is_one_query_with_keyset_pages_and_role_filter(api):
+    statements = api.count_statements()
+
+    async def scenario(client):
+        owner = await api.login(client, "owner@example.com")
+        company_id = (await client.post("/companies/", headers=owner, json={"name": "Acme"})).json()["id"]
+        await client.get(f"/companies/{company_id}/members", headers=owner)
+
+        counts = []
+        for size in (5, 50):
+            async with api.session_factory() as db:
+                result = await db.execute(insert(User).returning(User.id), [
+                    {"email": f"u{size}-{i}@example.com", "password_hash": "x"} for i in range(size)
+                ])
+                await db.execute(insert(CompanyMember), [
+                    {"company_id": company_id, "user_id": user_id, "role": "admin" if i % 10 == 0 else "member"}
+                    for i, user_id in enumerate(result.scalars())
+                ])
+                await db.commit()
+            statements.clear()
+            resp = await client.get(f"/companies/{company_id}/members", headers=owner, params={"limit": 1000})
+            counts.append((len(resp.json()), len(statements)))
+
+        pages, cursor = [], None
+        while True:
+            params = {"limit": 20, **({"cursor": cursor} if cursor else {})}
+            resp = await client.get(f"/companies/{company_id}/members", headers=owner, params=params)
+            pages.append(resp.json())
+            cursor = resp.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+        admins = (await client.get(f"/companies/{company_id}/members", headers=owner, params={"role": "admin"})).json()
+        return counts, pages, admins
+
+    counts, pages, admins = api.run(scenario)
+    assert counts == [(6, 1), (56, 1)]
+    assert [len(page) for page in pages] == [20, 20, 16]
+    ids = [m["id"] for page in pages for m in page]
+    assert len(set(ids)) == 56
+    assert pages[0][0]["role"] == "owner" and pages[0][0]["user"]["email"] == "owner@example.com"
+    assert len(admins) == 6 and {m["role"] for m in admins} == {"admin"}
+
+
+
+def test_list_members_checks_membership_in_the_database(api):
+    async def scenario(client):
+        owner = await api.login(client, "owner@example.com")
+        member = await api.login(client, "member@example.com")
+        stranger = await api.login(client, "stranger@example.com")
+        company_id = (await client.post("/companies/", headers=owner, json={"name": "Acme"})).json()["id"]
+        await client.post(f"/companies/{company_id}/members", headers=owner, json={"user_email": "member@example.com"})
+        url = f"/companies/{company_id}/members"
+        before = await client.get(url, headers=member)
+        no_admins = await client.get(url, headers=member, params={"role": "admin"})
+        # участника удаляют мимо этого процесса: кэш id его компаний ещё не сброшен
+        async with api.session_factory() as db:
+            await db.execute(delete(CompanyMember).where(CompanyMember.company_id == company_id,
+                                                         CompanyMember.role == "member"))
+            await db.commit()
+        after = await client.get(url, headers=member)
+        foreign = await client.get(url, headers=stranger, params={"role": "admin"})
+        return before.status_code, no_admins.status_code, no_admins.json(), after.status_code, foreign.status_code
+
+    before, no_admins, admins, after, foreign = api.run(scenario)
+    assert (before, no_admins, admins) == (200, 200, [])
+    assert (after, foreign) == (403, 403)
+
+def test_bulk_member_onboarding_reports_each_email(api):
+    statements = api.count_statements()
+
+    async def scenario(client):
+        owner = await api.login(client, "owner@example.com")
+        company_id = (await client.post("/companies/", headers=owner, json={"name": "Acme"})).json()["id"]
+        async with api.session_factory() as db:
+            await db.execute(insert(User), [{"email": f"u{i}@example.com", "password_hash": "x"} for i in range(6)])
+            await db.commit()
+
+        statements.clear()
+        json_resp = await client.post(f"/companies/{company_id}/members/bulk", headers=owner, json=[
+            "u0@example.com", "u1@example.com", "ghost@example.com", "u0@example.com", "owner@example.com",
+        ])
+        json_queries = len(statements)
+        csv_body = "email\nu1@example.com\nu2@example.com\n\nu3@example.com\n"
+        csv_resp = await client.post(f"/companies/{company_id}/members/bulk", content=csv_body,
+                                     headers={**owner, "Content-Type": "text/csv"})
+        members = (await client.get(f"/companies/{company_id}/members", headers=owner)).json()
+        return json_resp.json(), json_queries, csv_resp.json(), members
+
+    from_json, json_queries, from_csv, members = api.run(scenario)
+    assert (from_json["added"], from_json["failed"]) == (2, 3)
+    assert [("id" in item, item.get("error")) for item in from_json["items"]] == [
+        (True, None),
+        (True, None),
+        (False, "Пользователь с таким email не найден"),
+        (False, "Email повторяется в запросе"),
+        (False, "Пользователь уже является участником компании"),
+    ]
+    # права, пользователи (IN), существующие участники (IN), один INSERT
+    assert json_queries == 4
+    assert [item["email"] for item in from_csv["items"]] == ["u1@example.com", "u2@example.com", "u3@example.com"]
+    assert (from_csv["added"], from_csv["failed"]) == (2, 1)
+    assert len(members) == 5
@@ -0,0 +1,290 @@
+import json
+from datetime import datetime, timedelta
+from sqlalchemy import delete
+from app.models import CompanyMember
+
+
+def test_list_events_window_pagination_and_recurrence(api):
+    async def scenario(client):
+        headers = await api.login(client, "owner@example.com")
+        base = datetime(2030, 5, 1, 9, 0)
+        for day in range(5):
+            resp = await client.post("/events/", headers=headers, json={
+                "title": f"one-off {day}", "start_time": (base + timedelta(days=day)).isoformat(),
+            })
+            assert resp.status_code == 200
+        await client.post("/events/", headers=headers, json={
+            "title": "daily", "start_time": (base - timedelta(days=30, hours=1)).isoformat(), "recurrence": "DAILY",
+        })
+
+        window = {"from": (base + timedelta(days=1)).isoformat(), "to": (base + timedelta(days=4)).isoformat()}
+        pages, cursor = [], None
+        while True:
+            params = dict(window, limit=2, **({"cursor": cursor} if cursor else {}))
+            resp = await client.get("/events/", headers=headers, params=params)
+            assert resp.status_code == 200
+            pages.append(resp.json())
+            cursor = resp.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+        everything = (await client.get("/events/", headers=headers)).json()
+        return pages, everything
+
+    pages, everything = api.run(scenario)
+    flat = [(e["title"], e["start_time"]) for page in pages for e in page]
+    assert [len(page) for page in pages] == [2, 2, 2]
+    assert flat == [
+        ("one-off 1", "2030-05-02T09:00:00"), ("daily", "2030-05-03T08:00:00"),
+        ("one-off 2", "2030-05-03T09:00:00"), ("daily", "2030-05-04T08:00:00"),
+        ("one-off 3", "2030-05-04T09:00:00"), ("daily", "2030-05-05T08:00:00"),
+    ]
+    assert len(everything) == 6
+
+
+def test_event_access_is_checked_in_one_query(api):
+    statements = api.count_statements()
+
+    async def scenario(client):
+        owner = await api.login(client, "owner@example.com")
+        stranger = await api.login(client, "stranger@example.com")
+        created = await client.post("/events/", headers=owner, json={
+            "title": "Standup", "start_time": "2030-05-01T09:00:00",
+        })
+        event_id = created.json()["id"]
+        denied = await client.get(f"/events/{event_id}", headers=stranger)
+        statements.clear()
+        allowed = await client.get(f"/events/{event_id}", headers=owner)
+        return denied.status_code, allowed.status_code, list(statements)
+
+    denied, allowed, queries = api.run(scenario)
+    assert (denied, allowed) == (404, 200)
+    # пользователь берётся из кэша токенов, остаётся только событие с проверкой доступа
+    assert len(queries) == 1
+    assert "EXISTS" in queries[-1]
+
+
+def test_removed_member_loses_company_events_immediately(api):
+    async def scenario(client):
+        owner = await api.login(client, "owner@example.com")
+        member = await api.login(client, "member@example.com")
+        company_id = (await client.post("/companies/", headers=owner, json={"name": "Acme"})).json()["id"]
+        await client.post(f"/companies/{company_id}/members", headers=owner, json={"user_email": "member@example.com"})
+        event = {"title": "Planning", "start_time": "2030-05-01T09:00:00", "company_id": company_id}
+        created = await client.post("/events/", headers=owner, json=event)
+        before = await client.get("/events/", headers=member)
+        assert (await client.post("/events/", headers=member, json=event)).status_code == 200
+
+        # исключение мимо маршрутов — как если бы его сделал другой процесс
+        async with api.session_factory() as db:
+            await db.execute(delete(CompanyMember).where(CompanyMember.company_id == company_id,
+                                                         CompanyMember.role == "member"))
+            await db.commit()
+        after = await client.get("/events/", headers=member)
+        denied_get = await client.get(f"/events/{created.json()['id']}", headers=member)
+        denied_create = await client.post("/events/", headers=member, json=event)
+        return len(before.json()), after.json(), denied_get.status_code, denied_create.status_code
+
+    before, after, denied_get, denied_create = api.run(scenario)
+    assert before == 1
+    assert [e["title"] for e in after] == ["Planning"]  # только собственное событие участника
+    assert (denied_get, denied_create) == (404, 403)
+
+
+def test_bulk_import_reports_each_item(api):
+    items = [
+        {"title": "ok", "start_time": "2030-01-01T10:00:00", "reminders_minutes_before": [15]},
+        {"title": "no start"},
+        {"title": "bad rule", "start_time": "2030-01-01T10:00:00", "recurrence": "sometimes"},
+        {"title": "foreign", "start_time": "2030-01-01T10:00:00", "company_id": 999},
+    ]
+    body = "\n".join(json.dumps(item) for item in items) + "\n{broken\n"
+
+    async def scenario(client):
+        headers = await api.login(client, "bulk@example.com")
+        resp = await client.post("/events/bulk", headers=headers, content=body)
+        as_array = await client.post("/events/bulk", headers=headers, json=[items[0], items[0]])
+        reminders = (await client.get(f"/events/{resp.json()['items'][0]['id']}/reminders", headers=headers)).json()
+        return resp.json(), as_array.json(), reminders
+
+    report, as_array, reminders = api.run(scenario)
+    assert (report["created"], report["failed"]) == (1, 4)
+    assert [sorted(item) for item in report["items"]] == [["id", "index"]] + [["error", "index"]] * 4
+    assert report["items"][1]["error"].startswith("start_time")
+    assert as_array["created"] == 2
+    assert [r["remind_at"] for r in reminders] == ["2030-01-01T09:45:00", "2030-01-01T10:00:00"]
+
+
+def test_ics_import_streams_vevents(api):
+    calendar = (
+        "BEGIN:VCALENDAR\r\nVERSION:2.0\r\n"
+        "BEGIN:VEVENT\r\nSUMMARY:Stand\r\n up\r\nDTSTART;TZID=Europe/Moscow:20300301T100000\r\n"
+        "RRULE:FREQ=WEEKLY;BYDAY=MO\r\n"
+        "BEGIN:VALARM\r\nTRIGGER:-PT30M\r\nACTION:DISPLAY\r\nEND:VALARM\r\nEND:VEVENT\r\n"
+        "BEGIN:VEVENT\r\nSUMMARY:Lunch\\, team\r\nDTSTART:20300302T120000Z\r\nEND:VEVENT\r\n"
+        "BEGIN:VEVENT\r\nSUMMARY:Broken\r\nEND:VEVENT\r\n"
+        "END:VCALENDAR\r\n"
+    )
+
+    async def scenario(client):
+        headers = dict(await api.login(client, "ics@example.com"), **{"Content-Type": "text/calendar"})
+        report = (await client.post("/events/import/ics", headers=headers, content=calendar.encode())).json()
+        events = (await client.get("/events/", headers=headers)).json()
+        return report, events
+
+    report, events = api.run(scenario)
+    assert (report["created"], report["failed"]) == (2, 1)
+    assert [(e["title"], e["start_time"], e["recurrence"]) for e in events] == [
+        ("Standup", "2030-03-01T07:00:00", "FREQ=WEEKLY;BYDAY=MO"),
+        ("Lunch, team", "2030-03-02T12:00:00", None),
+    ]
+
+
+def test_ndjson_listing_matches_json_shape(api):
+    async def scenario(client):
+        headers = await api.login(client, "stream@example.com")
+        for day in range(3):
+            resp = await client.post("/events/", headers=headers, json={
+                "title": f"e{day}", "start_time": f"2030-06-0{day + 1}T08:00:00.250000", "reminders_minutes_before": [5],
+            })
+        as_json = (await client.get("/events/", headers=headers)).json()
+        streamed = await client.get("/events/", headers=dict(headers, Accept="application/x-ndjson"))
+        reminders = await client.get(f"/events/{resp.json()['id']}/reminders",
+                                     headers=dict(headers, Accept="application/x-ndjson"))
+        return as_json, streamed, reminders
+
+    as_json, streamed, reminders = api.run(scenario)
+    assert streamed.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in streamed.text.splitlines()] == as_json
+    assert as_json[0] == {"id": 1, "title": "e0", "description": None, "start_time": "2030-06-01T08:00:00.250000",
+                          "recurrence": None, "company_id": None}
+    assert [json.loads(line)["remind_at"] for line in reminders.text.splitlines()] == [
+        "2030-06-03T07:55:00.250000", "2030-06-03T08:00:00.250000",
+    ]
+
+
+def test_patch_event_reconciles_reminders_minimally(api):
+    statements = api.count_statements()
+
+    async def scenario(client):
+        headers = await api.login(client, "owner@example.com")
+        created = await client.post("/events/", headers=headers, json={
+            "title": "Standup", "start_time": "2030-05-01T09:00:00", "reminders_minutes_before": [10, 30],
+        })
+        event_id = created.json()["id"]
+        url = f"/events/{event_id}"
+        before = (await client.get(f"{url}/reminders", headers=headers)).json()
+
+        statements.clear()
+        renamed = await client.patch(url, headers=headers, json={"title": "Daily standup"})
+        reminder_queries = [s for s in statements if " reminders" in s or "reminder_deliveries" in s]
+        moved = await client.patch(url, headers=headers, json={"start_time": "2030-05-01T10:00:00"})
+        after_move = (await client.get(f"{url}/reminders", headers=headers)).json()
+        await client.patch(url, headers=headers, json={"reminders_minutes_before": [30, 60]})
+        after_offsets = (await client.get(f"{url}/reminders", headers=headers)).json()
+        bad = await client.patch(url, headers=headers, json={"title": None})
+        return before, renamed.json(), reminder_queries, moved.json(), after_move, after_offsets, bad.status_code
+
+    before, renamed, reminder_queries, moved, after_move, after_offsets, bad = api.run(scenario)
+    assert renamed["title"] == "Daily standup" and renamed["start_time"] == "2030-05-01T09:00:00"
+    assert reminder_queries == []
+    assert moved["title"] == "Daily standup"
+    # те же строки, сдвинутые на час
+    assert [r["id"] for r in after_move] == [r["id"] for r in before]
+    assert [r["remind_at"] for r in after_move] == ["2030-05-01T09:30:00", "2030-05-01T09:50:00", "2030-05-01T10:00:00"]
+    ids = {r["remind_at"]: r["id"] for r in after_move}
+    # 30 и 0 минут сохранились, 10 удалено, 60 добавлено
+    assert [r["remind_at"] for r in after_offsets] == ["2030-05-01T09:00:00", "2030-05-01T09:30:00", "2030-05-01T10:00:00"]
+    assert after_offsets[1]["id"] == ids["2030-05-01T09:30:00"]
+    assert after_offsets[2]["id"] == ids["2030-05-01T10:00:00"]
+    assert after_offsets[0]["id"] not in ids.values()
+    assert bad == 400
+
+
+
+def test_moving_a_recurring_event_into_the_past_skips_past_reminders(api):
+    async def scenario(client):
+        headers = await api.login(client, "owner@example.com")
+        created = await client.post("/events/", headers=headers, json={
+            "title": "Standup", "start_time": "2030-05-01T09:00:00", "recurrence": "DAILY",
+            "reminders_minutes_before": [10],
+        })
+        url = f"/events/{created.json()['id']}"
+        await client.patch(url, headers=headers, json={"start_time": "2020-05-01T09:00:00"})
+        moved = (await client.get(f"{url}/reminders", headers=headers)).json()
+        await client.patch(url, headers=headers, json={"reminders_minutes_before": [10, 30]})
+        added = (await client.get(f"{url}/reminders", headers=headers)).json()
+        return moved, added
+
+    moved, added = api.run(scenario)
+    # прошедшие напоминания не рассылаются разом — ближайшие вхождения развернёт планировщик
+    assert moved == []
+    assert added == []
+
+
+def test_overlong_recurrence_is_rejected(api):
+    rule = "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR;INTERVAL=1;WKST=MO"
+
+    async def scenario(client):
+        headers = await api.login(client, "owner@example.com")
+        created = await client.post("/events/", headers=headers, json={
+            "title": "Standup", "start_time": "2030-05-01T09:00:00", "recurrence": rule,
+        })
+        event = await client.post("/events/", headers=headers, json={
+            "title": "Standup", "start_time": "2030-05-01T09:00:00",
+        })
+        url = f"/events/{event.json()['id']}"
+        patched = await client.patch(url, headers=headers, json={"recurrence": rule})
+        replaced = await client.put(url, headers=headers, json={
+            "title": "Standup", "start_time": "2030-05-01T09:00:00", "recurrence": rule,
+        })
+        return created.status_code, patched.status_code, replaced.status_code
+
+    assert len(rule) > 50
+    assert api.run(scenario) == (400, 400, 400)
+
+def test_recurring_expansion_is_capped_per_page(api, monkeypatch):
+    from app.config import settings
+    monkeypatch.setattr(settings, "events_page_size", 5)
+
+    async def scenario(client):
+        headers = await api.login(client, "owner@example.com")
+        await client.post("/events/", headers=headers, json={
+            "title": "hourly", "start_time": "2030-01-01T00:00:00", "recurrence": "HOURLY",
+        })
+        window = {"from": "2030-01-01T00:00:00", "to": "2030-03-01T00:00:00"}
+        first = await client.get("/events/", headers=headers, params=dict(window, limit=3))
+        second = await client.get("/events/", headers=headers,
+                                  params=dict(window, limit=3, cursor=first.headers["X-Next-Cursor"]))
+        streamed = await client.get("/events/", headers=dict(headers, Accept="application/x-ndjson"), params=window)
+        return first, second, streamed
+
+    first, second, streamed = api.run(scenario)
+    assert [e["start_time"] for e in first.json()] == [
+        "2030-01-01T00:00:00", "2030-01-01T01:00:00", "2030-01-01T02:00:00",
+    ]
+    assert [e["start_time"] for e in second.json()] == [
+        "2030-01-01T03:00:00", "2030-01-01T04:00:00", "2030-01-01T05:00:00",
+    ]
+    # NDJSON без limit — та же страница по умолчанию, а не вся выборка
+    assert len(streamed.text.splitlines()) == 5
+    assert "X-Next-Cursor" in streamed.headers
+
+
+def test_event_window_is_capped_and_expanded_lazily(api):
+    async def scenario(client):
+        headers = await api.login(client, "owner@example.com")
+        await client.post("/events/", headers=headers, json={
+            "title": "hourly", "start_time": "2029-01-01T00:00:00", "recurrence": "HOURLY",
+        })
+        year = await client.get("/events/", headers=headers, params={
+            "from": "2030-01-01T00:00:00", "to": "2031-01-01T00:00:00", "limit": 3,
+        })
+        too_long = await client.get("/events/", headers=headers, params={
+            "from": "2030-01-01T00:00:00", "to": "2032-01-01T00:00:00",
+        })
+        return year.json(), year.headers.get("X-Next-Cursor"), too_long.status_code
+
+    page, cursor, too_long = api.run(scenario)
+    assert [e["start_time"] for e in page] == ["2030-01-01T00:00:00", "2030-01-01T01:00:00", "2030-01-01T02:00:00"]
+    assert cursor
+    assert too_long == 400
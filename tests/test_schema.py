@@ -0,0 +1,115 @@
+import asyncio
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import event as sa_event, inspect, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from app.db import Base
+from app.schema import ensure_schema, head_revision
+
+
+def _diff(sync_conn):
+    return compare_metadata(MigrationContext.configure(sync_conn, opts={"compare_type": True}), Base.metadata)
+
+
+def test_migrations_build_the_model_schema_and_skip_ddl_when_current(tmp_path):
+    async def scenario():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'fresh.db'}")
+        try:
+            await ensure_schema(engine)
+            statements = []
+
+            def record(*args):
+                statements.append(args[2])
+
+            sa_event.listen(engine.sync_engine, "before_cursor_execute", record)
+            await ensure_schema(engine)
+            sa_event.remove(engine.sync_engine, "before_cursor_execute", record)
+            async with engine.connect() as conn:
+                return await conn.run_sync(_diff), statements
+        finally:
+            await engine.dispose()
+
+    diff, statements = asyncio.run(scenario())
+    assert diff == []
+    assert not [s for s in statements if s.lstrip().upper().startswith(("CREATE", "ALTER", "DROP"))]
+
+
+# схема app.db из репозитория: create_all до появления компаний
+_PRE_COMPANIES_SCHEMA = (
+    "CREATE TABLE users (id INTEGER NOT NULL, name VARCHAR(120), email VARCHAR(255) NOT NULL, "
+    "password_hash VARCHAR(255) NOT NULL, telegram_id VARCHAR(64), created_at DATETIME NOT NULL, PRIMARY KEY (id))",
+    "CREATE INDEX ix_users_id ON users (id)",
+    "CREATE UNIQUE INDEX ix_users_email ON users (email)",
+    "CREATE INDEX ix_users_telegram_id ON users (telegram_id)",
+    "CREATE TABLE events (id INTEGER NOT NULL, user_id INTEGER NOT NULL, title VARCHAR(200) NOT NULL, "
+    "description TEXT, start_time DATETIME NOT NULL, recurrence VARCHAR(50), created_at DATETIME NOT NULL, "
+    "PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES users (id) ON DELETE CASCADE)",
+    "CREATE INDEX ix_events_user_id ON events (user_id)",
+    "CREATE INDEX ix_events_start_time ON events (start_time)",
+    "CREATE TABLE telegram_links (id INTEGER NOT NULL, user_id INTEGER NOT NULL, code VARCHAR(32) NOT NULL, "
+    "confirmed BOOLEAN NOT NULL, created_at DATETIME NOT NULL, PRIMARY KEY (id), "
+    "FOREIGN KEY(user_id) REFERENCES users (id) ON DELETE CASCADE)",
+    "CREATE INDEX ix_telegram_links_user_id ON telegram_links (user_id)",
+    "CREATE UNIQUE INDEX ix_telegram_links_code ON telegram_links (code)",
+    "CREATE TABLE reminders (id INTEGER NOT NULL, event_id INTEGER NOT NULL, remind_at DATETIME NOT NULL, "
+    "sent BOOLEAN NOT NULL, PRIMARY KEY (id), FOREIGN KEY(event_id) REFERENCES events (id) ON DELETE CASCADE)",
+    "CREATE INDEX ix_reminders_event_id ON reminders (event_id)",
+    "CREATE INDEX ix_reminders_remind_at ON reminders (remind_at)",
+)
+
+# create_all перед серией миграций: с компаниями, но без ledger доставок и полей повторений
+_PRE_SERIES_SCHEMA = _PRE_COMPANIES_SCHEMA[:4] + (
+    "CREATE TABLE companies (id INTEGER NOT NULL, name VARCHAR(200) NOT NULL, description TEXT, "
+    "created_by INTEGER NOT NULL, created_at DATETIME NOT NULL, PRIMARY KEY (id), "
+    "FOREIGN KEY(created_by) REFERENCES users (id) ON DELETE CASCADE)",
+    "CREATE INDEX ix_companies_id ON companies (id)",
+    "CREATE INDEX ix_companies_created_by ON companies (created_by)",
+    "CREATE TABLE events (id INTEGER NOT NULL, user_id INTEGER NOT NULL, company_id INTEGER, "
+    "title VARCHAR(200) NOT NULL, description TEXT, start_time DATETIME NOT NULL, recurrence VARCHAR(50), "
+    "created_at DATETIME NOT NULL, PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES users (id) ON DELETE CASCADE, "
+    "FOREIGN KEY(company_id) REFERENCES companies (id) ON DELETE CASCADE)",
+    "CREATE INDEX ix_events_user_id ON events (user_id)",
+    "CREATE INDEX ix_events_company_id ON events (company_id)",
+    "CREATE INDEX ix_events_start_time ON events (start_time)",
+    "CREATE TABLE company_members (id INTEGER NOT NULL, company_id INTEGER NOT NULL, user_id INTEGER NOT NULL, "
+    "role VARCHAR(50) NOT NULL, joined_at DATETIME NOT NULL, PRIMARY KEY (id), "
+    "FOREIGN KEY(company_id) REFERENCES companies (id) ON DELETE CASCADE, "
+    "FOREIGN KEY(user_id) REFERENCES users (id) ON DELETE CASCADE)",
+    "CREATE INDEX ix_company_members_id ON company_members (id)",
+    "CREATE INDEX ix_company_members_user_id ON company_members (user_id)",
+    "CREATE INDEX ix_company_members_company_id ON company_members (company_id)",
+) + _PRE_COMPANIES_SCHEMA[7:]
+
+
+@pytest.mark.parametrize("schema", [_PRE_COMPANIES_SCHEMA, _PRE_SERIES_SCHEMA], ids=["pre-companies", "pre-series"])
+def test_legacy_database_is_upgraded_to_the_model_schema(tmp_path, schema):
+    async def scenario():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'legacy.db'}")
+        try:
+            async with engine.begin() as conn:
+                for statement in schema:
+                    await conn.execute(text(statement))
+                await conn.execute(text(
+                    "INSERT INTO users (id, email, password_hash, created_at) VALUES (1, 'a@example.com', 'x', '2025-01-01')"
+                ))
+                await conn.execute(text(
+                    "INSERT INTO events (id, user_id, title, start_time, created_at) "
+                    "VALUES (1, 1, 'Standup', '2030-01-01', '2025-01-01')"
+                ))
+            await ensure_schema(engine)
+            async with engine.connect() as conn:
+                version = (await conn.execute(text("SELECT version_num FROM alembic_version"))).scalar()
+                users = (await conn.execute(text("SELECT count(*) FROM users"))).scalar()
+                events = (await conn.execute(text("SELECT count(*) FROM events"))).scalar()
+                return version, await conn.run_sync(_diff), users, events
+        finally:
+            await engine.dispose()
+
+    version, diff, users, events = asyncio.run(scenario())
+    assert version == head_revision()
+    assert diff == []
+    assert (users, events) == (1, 1)
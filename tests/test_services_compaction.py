@@ -0,0 +1,102 @@
+import asyncio
+from datetime import datetime, timedelta
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from sqlalchemy import event as sa_event, func, select, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from app.db import Base
+from app.models import User, Event, Reminder, ReminderArchive, ReminderDelivery
+from app.services_compaction import compact_reminders
+
+
+def test_compaction_archives_old_sent_reminders_in_batches(tmp_path):
+    async def scenario():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+        now = datetime.utcnow()
+        try:
+            async with session_factory() as db:
+                user = User(email="a@example.com", password_hash="x")
+                db.add(user)
+                await db.flush()
+                event = Event(user_id=user.id, title="Standup", start_time=now)
+                db.add(event)
+                await db.flush()
+                old = [Reminder(event_id=event.id, remind_at=now - timedelta(days=40, minutes=i), sent=True)
+                       for i in range(5)]
+                keep = [
+                    Reminder(event_id=event.id, remind_at=now - timedelta(days=40), sent=False),
+                    Reminder(event_id=event.id, remind_at=now - timedelta(days=1), sent=True),
+                ]
+                db.add_all(old + keep)
+                await db.flush()
+                db.add(ReminderDelivery(reminder_id=old[0].id, chat_id="42", status="sent"))
+                await db.commit()
+
+            statements = []
+            sa_event.listen(engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+            report = await compact_reminders(session_factory, now=now, retention_days=30, batch_size=2)
+
+            async with session_factory() as db:
+                remaining = set((await db.execute(select(Reminder.id))).scalars())
+                archived = set((await db.execute(select(ReminderArchive.reminder_id))).scalars())
+                deliveries = (await db.execute(select(func.count()).select_from(ReminderDelivery))).scalar()
+                plan = (await db.execute(text(
+                    "EXPLAIN QUERY PLAN SELECT id FROM reminders WHERE sent = 0 AND remind_at <= '2030-01-01' "
+                    "ORDER BY remind_at, id"
+                ))).all()
+            return report, remaining, archived, deliveries, plan, statements, {r.id for r in old}, {r.id for r in keep}
+        finally:
+            await engine.dispose()
+
+    report, remaining, archived, deliveries, plan, statements, old_ids, keep_ids = asyncio.run(scenario())
+    assert report["compacted"] == 5
+    assert remaining == keep_ids
+    assert archived == old_ids
+    assert deliveries == 0
+    # пачки по 2: 2 + 2 + 1
+    assert sum(s.startswith("DELETE FROM reminders ") for s in statements) == 3
+    assert report["before"]["tables"]["reminders"]["total_bytes"] > 0
+    assert "ix_reminders_pending_remind_at" in report["after"]["indexes"]
+    assert "ix_reminders_pending_remind_at" in plan[0][-1]
+
+
+def test_compaction_archives_a_reused_reminder_id_again(tmp_path):
+    async def scenario():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+        now = datetime.utcnow()
+        try:
+            async with session_factory() as db:
+                user = User(email="a@example.com", password_hash="x")
+                db.add(user)
+                await db.flush()
+                event = Event(user_id=user.id, title="Standup", start_time=now)
+                db.add(event)
+                await db.flush()
+                event_id = event.id
+                await db.commit()
+            archived = []
+            for _ in range(2):
+                # без AUTOINCREMENT SQLite отдаёт новой строке id только что удалённой
+                async with session_factory() as db:
+                    reminder = Reminder(event_id=event_id, remind_at=now - timedelta(days=40), sent=True)
+                    db.add(reminder)
+                    await db.commit()
+                    archived.append(reminder.id)
+                await compact_reminders(session_factory, now=now, retention_days=30)
+            async with session_factory() as db:
+                rows = (await db.execute(select(ReminderArchive.id, ReminderArchive.reminder_id))).all()
+            return archived, rows
+        finally:
+            await engine.dispose()
+
+    archived, rows = asyncio.run(scenario())
+    assert archived[0] == archived[1]
+    assert len({archive_id for archive_id, _ in rows}) == 2
+    assert [reminder_id for _, reminder_id in rows] == archived
@@ -0,0 +1,74 @@
+import asyncio
+import json
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+import httpx
+from app.services_delivery import DeliveryEngine, TokenBucket
+from app.services_notifications import FakeBackend, TelegramBackend
+
+
+def test_token_bucket_delays_after_burst():
+    bucket = TokenBucket(rate=10)
+    delays = [bucket.reserve() for _ in range(12)]
+    assert delays[:10] == [0.0] * 10
+    assert 0.05 < delays[10] < delays[11] <= 0.2
+
+
+def _fake_bot_api(calls):
+    """Фейковый Bot API на httpx.MockTransport: первый запрос в чат "1" получает 429."""
+    def send_message(request):
+        assert request.url.path == "/bottest-token/sendMessage"
+        chat_id = json.loads(request.content)["chat_id"]
+        calls.append(chat_id)
+        if chat_id == "1" and calls.count("1") == 1:
+            return httpx.Response(429, json={"ok": False, "error_code": 429, "parameters": {"retry_after": 1}})
+        if chat_id == "blocked":
+            return httpx.Response(403, json={"ok": False, "error_code": 403})
+        return httpx.Response(200, json={"ok": True, "result": {}})
+
+    return httpx.MockTransport(send_message)
+
+
+def test_engine_fans_out_and_honours_retry_after():
+    async def scenario():
+        calls = []
+        backend = TelegramBackend("test-token", api_url="http://bot.test", transport=_fake_bot_api(calls))
+        engine = DeliveryEngine(backend.send, workers=4, global_rate=1e9, chat_rate=1e9)
+        try:
+            results = await asyncio.gather(
+                *(engine.deliver(chat_id, "hi") for chat_id in ["1", "2", "3", "blocked", "5"])
+            )
+            return results, calls, engine.snapshot(), backend.stats
+        finally:
+            await engine.close()
+            await backend.close()
+
+    results, calls, stats, latency = asyncio.run(scenario())
+    assert [r.ok for r in results] == [True, True, True, False, True]
+    assert results[3].status == 403
+    assert calls.count("1") == 2
+    assert calls.count("blocked") == 1
+    assert stats["sent"] == 4
+    assert stats["failed"] == 1
+    assert stats["rate_limited"] == 1
+    assert stats["queue_depth"] == 0
+    assert latency.count == 6
+    assert latency.statuses == {200: 4, 429: 1, 403: 1}
+
+
+def test_chat_limit_does_not_hold_a_worker():
+    async def scenario():
+        backend = FakeBackend()
+        engine = DeliveryEngine(backend.send, workers=1, global_rate=1e9, chat_rate=5)
+        try:
+            # второе и третье сообщение в чат "a" ждут лимита чата; "b" не должен стоять за ними
+            futures = [await engine.submit(chat_id, "hi") for chat_id in ["a", "a", "a", "b"]]
+            results = await asyncio.gather(*futures)
+            return results, [chat_id for chat_id, _ in backend.messages]
+        finally:
+            await engine.close()
+
+    results, order = asyncio.run(scenario())
+    assert all(r.ok for r in results)
+    assert order == ["a", "b", "a", "a"]
@@ -0,0 +1,59 @@
+import asyncio
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from app.cache import LRUCache
+from app.db import Base
+from app.models import User, Company, CompanyMember
+from app.services_directory import RecipientDirectory
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.stats()["evictions"] == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_directory_caches_linked_chats_until_invalidated(tmp_path):
+    async def scenario():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'dir.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+        directory = RecipientDirectory(maxsize=10, ttl=60)
+        try:
+            async with session_factory() as db:
+                linked = User(email="a@example.com", password_hash="x", telegram_id="1")
+                unlinked = User(email="b@example.com", password_hash="x")
+                db.add_all([linked, unlinked])
+                await db.flush()
+                company = Company(name="Acme", created_by=linked.id)
+                db.add(company)
+                await db.flush()
+                db.add_all([
+                    CompanyMember(company_id=company.id, user_id=linked.id),
+                    CompanyMember(company_id=company.id, user_id=unlinked.id),
+                ])
+                await db.commit()
+
+                first = await directory.get_many(db, [company.id])
+                unlinked.telegram_id = "2"
+                await db.commit()
+                cached = await directory.get_many(db, [company.id])
+                directory.invalidate(company.id)
+                refreshed = await directory.get_many(db, [company.id])
+                return company.id, first, cached, refreshed, directory.stats()
+        finally:
+            await engine.dispose()
+
+    company_id, first, cached, refreshed, stats = asyncio.run(scenario())
+    assert first == {company_id: ("1",)}
+    assert cached == first
+    assert sorted(refreshed[company_id]) == ["1", "2"]
+    assert (stats["hits"], stats["misses"]) == (1, 2)
@@ -0,0 +1,80 @@
+import asyncio
+from datetime import datetime, timedelta
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from app.db import Base
+from app.models import User, Event, Reminder
+from app.services_recurrence import (
+    EXPANDED_FOREVER, InvalidRecurrence, expand_recurring_events, parse_recurrence,
+)
+
+
+def test_parse_rrule_keyword_and_cron():
+    start = datetime(2025, 1, 6, 9, 30)  # понедельник
+    daily = parse_recurrence("DAILY", start)
+    assert daily.between(start, start + timedelta(days=2)) == [
+        datetime(2025, 1, 7, 9, 30), datetime(2025, 1, 8, 9, 30),
+    ]
+    weekdays = parse_recurrence("30 9 * * 1-5", start)
+    week = weekdays.between(start - timedelta(seconds=1), start + timedelta(days=7))
+    assert [d.weekday() for d in week] == [0, 1, 2, 3, 4, 0]
+    limited = parse_recurrence("FREQ=WEEKLY;COUNT=2", start)
+    assert limited.after(start + timedelta(days=7)) is None
+    with pytest.raises(InvalidRecurrence):
+        parse_recurrence("every other tuesday", start)
+
+
+
+def test_sub_hourly_rules_are_rejected_and_occurrences_are_taken_lazily():
+    start = datetime(2025, 1, 6, 9, 30)
+    for rule in ("FREQ=MINUTELY", "FREQ=SECONDLY", "* * * * *", "0,30 * * * *", "FREQ=HOURLY;BYMINUTE=0,15"):
+        with pytest.raises(InvalidRecurrence):
+            parse_recurrence(rule, start)
+    # правило, которое не совпадает никогда, проверяется за ограниченное время
+    assert parse_recurrence("0 0 31 2 *", start).between(start, start + timedelta(days=30)) == []
+
+    hourly = parse_recurrence("HOURLY", start - timedelta(days=365))
+    window = hourly.between(start, start + timedelta(days=3650), limit=3)
+    assert window == [start + timedelta(hours=h) for h in (1, 2, 3)]
+    cron = parse_recurrence("0 * * * *", start)
+    assert len(cron.between(start, start + timedelta(days=3650), limit=5)) == 5
+
+def test_expansion_materialises_only_the_horizon(tmp_path):
+    async def scenario():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'rec.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+        now = datetime(2025, 3, 1, 12, 0)
+        try:
+            async with session_factory() as db:
+                user = User(email="a@example.com", password_hash="x")
+                db.add(user)
+                await db.flush()
+                start = datetime(2024, 1, 1, 18, 0)
+                daily = Event(user_id=user.id, title="Gym", start_time=start, recurrence="DAILY",
+                              reminder_offsets="0,30", expanded_until=start)
+                ended = Event(user_id=user.id, title="Sprint", start_time=start,
+                              recurrence="FREQ=DAILY;COUNT=3", reminder_offsets="0", expanded_until=start)
+                db.add_all([daily, ended])
+                await db.commit()
+
+                created = await expand_recurring_events(db, now=now)
+                await db.commit()
+                again = await expand_recurring_events(db, now=now + timedelta(hours=1))
+                await db.commit()
+                times = (await db.execute(select(Reminder.remind_at).order_by(Reminder.remind_at))).scalars().all()
+                marks = (await db.execute(select(Event.expanded_until).order_by(Event.id))).scalars().all()
+                return created, again, times, marks
+        finally:
+            await engine.dispose()
+
+    created, again, times, marks = asyncio.run(scenario())
+    assert len(created) == 2
+    assert again == []
+    assert times == [datetime(2025, 3, 1, 17, 30), datetime(2025, 3, 1, 18, 0)]
+    assert marks == [datetime(2025, 3, 2, 12, 0), EXPANDED_FOREVER]
@@ -0,0 +1,215 @@
+import asyncio
+from datetime import datetime, timedelta
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from app.db import Base
+from app.models import User, Event, Reminder
+from app import metrics, services_reminders
+from app.services_delivery import DeliveryEngine
+from app.services_notifications import FakeBackend
+from app.services_directory import recipient_directory
+
+
+def _run_with_db(tmp_path, coro_fn):
+    recipient_directory.clear()
+
+    async def runner():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'test.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+        try:
+            async with session_factory() as db:
+                return await coro_fn(db)
+        finally:
+            await engine.dispose()
+    return asyncio.run(runner())
+
+
+def test_process_due_reminders_skips_future_and_walks_batches(tmp_path, monkeypatch):
+    backend = FakeBackend()
+    monkeypatch.setattr(services_reminders, "delivery_engine", DeliveryEngine(backend.send, chat_rate=1e9))
+    monkeypatch.setattr(services_reminders.settings, "reminder_batch_size", 2)
+
+    async def scenario(db):
+        now = datetime.utcnow()
+        user = User(email="a@example.com", password_hash="x", telegram_id="42")
+        db.add(user)
+        await db.flush()
+        event = Event(user_id=user.id, title="Standup", start_time=now)
+        db.add(event)
+        await db.flush()
+        for minutes in (-30, -20, -10, -5, 60):
+            db.add(Reminder(event_id=event.id, remind_at=now + timedelta(minutes=minutes)))
+        await db.commit()
+
+        lags = metrics.dispatch_lag_seconds.count()
+        count = await services_reminders.process_due_reminders(db)
+        result = await db.execute(select(Reminder.sent).order_by(Reminder.remind_at))
+        return count, [row[0] for row in result.all()], metrics.dispatch_lag_seconds.count() - lags
+
+    count, flags, lags = _run_with_db(tmp_path, scenario)
+    assert count == 4
+    assert lags == 4
+    assert flags == [True, True, True, True, False]
+    assert [chat_id for chat_id, _ in backend.messages] == ["42"] * 4
+
+
+def test_dispatch_query_count_does_not_grow_with_recipients(tmp_path, monkeypatch):
+    from sqlalchemy import event as sa_event
+    from app.models import Company, CompanyMember
+
+    backend = FakeBackend()
+    monkeypatch.setattr(services_reminders, "delivery_engine", DeliveryEngine(backend.send, global_rate=1e9, chat_rate=1e9))
+
+    def count_tick(members, reminders):
+        async def scenario(db):
+            now = datetime.utcnow()
+            users = [User(email=f"u{i}@example.com", password_hash="x", telegram_id=str(i)) for i in range(members)]
+            db.add_all(users)
+            await db.flush()
+            company = Company(name="Acme", created_by=users[0].id)
+            db.add(company)
+            await db.flush()
+            db.add_all(CompanyMember(company_id=company.id, user_id=u.id) for u in users)
+            event = Event(user_id=users[0].id, company_id=company.id, title="Sync", start_time=now)
+            personal = Event(user_id=users[0].id, title="Gym", start_time=now)
+            db.add_all([event, personal])
+            await db.flush()
+            for i in range(reminders):
+                db.add(Reminder(event_id=event.id, remind_at=now - timedelta(minutes=i + 1)))
+                db.add(Reminder(event_id=personal.id, remind_at=now - timedelta(minutes=i + 1)))
+            await db.commit()
+
+            statements = []
+            sync_engine = db.bind.sync_engine
+            listener = lambda *args: statements.append(args[2])  # noqa: E731
+            sa_event.listen(sync_engine, "before_cursor_execute", listener)
+            try:
+                count = await services_reminders.process_due_reminders(db)
+            finally:
+                sa_event.remove(sync_engine, "before_cursor_execute", listener)
+            assert count == reminders * 2
+            return len(statements)
+        return _run_with_db(tmp_path / f"{members}-{reminders}", scenario)
+
+    (tmp_path / "2-1").mkdir()
+    (tmp_path / "50-20").mkdir()
+    assert count_tick(2, 1) == count_tick(50, 20)
+
+
+def test_failed_recipients_are_retried_alone(tmp_path, monkeypatch):
+    from app.models import Company, CompanyMember, ReminderDelivery
+    from app.services_notifications import SendResult
+
+    flaky = {"2"}
+
+    def responder(chat_id, text):
+        if chat_id in flaky:
+            return SendResult(ok=False, status=502)
+        return SendResult(ok=True, status=200)
+
+    backend = FakeBackend(responder)
+    engine = DeliveryEngine(backend.send, global_rate=1e9, chat_rate=1e9, max_retries=0)
+    monkeypatch.setattr(services_reminders, "delivery_engine", engine)
+    monkeypatch.setattr(services_reminders.settings, "delivery_retry_seconds", 0)
+
+    async def scenario(db):
+        now = datetime.utcnow()
+        users = [User(email=f"u{i}@example.com", password_hash="x", telegram_id=str(i)) for i in range(3)]
+        db.add_all(users)
+        await db.flush()
+        company = Company(name="Acme", created_by=users[0].id)
+        db.add(company)
+        await db.flush()
+        db.add_all(CompanyMember(company_id=company.id, user_id=u.id) for u in users)
+        event = Event(user_id=users[0].id, company_id=company.id, title="Sync", start_time=now)
+        db.add(event)
+        await db.flush()
+        db.add(Reminder(event_id=event.id, remind_at=now - timedelta(minutes=1)))
+        await db.commit()
+
+        first = await services_reminders.process_due_reminders(db)
+        first_messages = sorted(chat_id for chat_id, _ in backend.messages)
+        backend.messages.clear()
+        flaky.clear()
+        second = await services_reminders.process_due_reminders(db)
+        statuses = (await db.execute(select(ReminderDelivery.chat_id, ReminderDelivery.status))).all()
+        sent_flag = (await db.execute(select(Reminder.sent))).scalar_one()
+        return first, first_messages, second, backend.messages, sorted(statuses), sent_flag
+
+    first, first_messages, second, retried, statuses, sent_flag = _run_with_db(tmp_path, scenario)
+    assert (first, second) == (0, 1)
+    assert first_messages == ["0", "1", "2"]
+    assert [chat_id for chat_id, _ in retried] == ["2"]
+    assert statuses == [("0", "sent"), ("1", "sent"), ("2", "sent")]
+    assert sent_flag is True
+
+
+def test_reminders_without_recipients_are_finalized(tmp_path, monkeypatch):
+    from app.models import Company, CompanyMember
+
+    backend = FakeBackend()
+    monkeypatch.setattr(services_reminders, "delivery_engine", DeliveryEngine(backend.send, chat_rate=1e9))
+
+    async def scenario(db):
+        now = datetime.utcnow()
+        # пользователь только из веба, без Telegram, и компания без привязанных участников
+        user = User(email="web@example.com", password_hash="x")
+        db.add(user)
+        await db.flush()
+        company = Company(name="Acme", created_by=user.id)
+        db.add(company)
+        await db.flush()
+        db.add(CompanyMember(company_id=company.id, user_id=user.id))
+        personal = Event(user_id=user.id, title="Personal", start_time=now)
+        shared = Event(user_id=user.id, company_id=company.id, title="Shared", start_time=now)
+        db.add_all([personal, shared])
+        await db.flush()
+        db.add_all(Reminder(event_id=e.id, remind_at=now - timedelta(minutes=1)) for e in (personal, shared))
+        await db.commit()
+
+        first = await services_reminders.process_due_reminders(db)
+        second = await services_reminders.process_due_reminders(db)
+        flags = (await db.execute(select(Reminder.sent))).scalars().all()
+        return first, second, flags
+
+    first, second, flags = _run_with_db(tmp_path, scenario)
+    assert (first, second) == (2, 0)
+    assert flags == [True, True]
+    assert backend.messages == []
+
+
+def test_rate_limited_send_is_retried_through_the_ledger(tmp_path, monkeypatch):
+    from app.models import ReminderDelivery
+    from app.services_notifications import SendResult
+
+    backend = FakeBackend(lambda chat_id, text: SendResult(ok=False, status=429, retry_after=30))
+    # у движка по умолчанию есть повторы в памяти — диспетчер не должен их ждать
+    engine = DeliveryEngine(backend.send, global_rate=1e9, chat_rate=1e9, max_retries=3)
+    monkeypatch.setattr(services_reminders, "delivery_engine", engine)
+
+    async def scenario(db):
+        now = datetime.utcnow()
+        user = User(email="a@example.com", password_hash="x", telegram_id="42")
+        db.add(user)
+        await db.flush()
+        event = Event(user_id=user.id, title="Standup", start_time=now)
+        db.add(event)
+        await db.flush()
+        db.add(Reminder(event_id=event.id, remind_at=now - timedelta(minutes=1)))
+        await db.commit()
+
+        started = datetime.utcnow()
+        sent = await services_reminders.process_due_reminders(db)
+        elapsed = (datetime.utcnow() - started).total_seconds()
+        delivery = (await db.execute(select(ReminderDelivery))).scalar_one()
+        return sent, elapsed, len(backend.messages), delivery.status, delivery.next_attempt_at - started
+
+    sent, elapsed, calls, status, next_attempt = _run_with_db(tmp_path, scenario)
+    assert (sent, calls, status) == (0, 1, "retry")
+    assert elapsed < 5
+    assert next_attempt >= timedelta(seconds=30)
@@ -0,0 +1,55 @@
+import asyncio
+from datetime import datetime, timedelta
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from app.db import Base
+from app.models import User, Event, Reminder
+from app.services_timer import ReminderTimer
+
+
+def test_timer_fires_at_remind_at_and_skips_cancelled(tmp_path):
+    async def scenario():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'timer.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+
+        now = datetime.utcnow()
+        async with session_factory() as db:
+            user = User(email="a@example.com", password_hash="x")
+            db.add(user)
+            await db.flush()
+            event = Event(user_id=user.id, title="Standup", start_time=now)
+            db.add(event)
+            await db.flush()
+            loaded = Reminder(event_id=event.id, remind_at=now + timedelta(milliseconds=200))
+            later = Reminder(event_id=event.id, remind_at=now + timedelta(hours=1))
+            db.add_all([loaded, later])
+            await db.commit()
+
+        fired = []
+
+        async def dispatch():
+            fired.append(datetime.utcnow())
+
+        timer = ReminderTimer(horizon=timedelta(minutes=15), session_factory=session_factory)
+        timer.start(dispatch)
+        try:
+            await asyncio.sleep(0.1)
+            # вне окна — не попадает в кучу
+            assert len(timer) == 1
+            timer.schedule(1000, datetime.utcnow() + timedelta(milliseconds=150))
+            timer.schedule(1001, datetime.utcnow() + timedelta(milliseconds=50))
+            timer.cancel([1001])
+            await asyncio.sleep(0.4)
+        finally:
+            await timer.stop()
+            await engine.dispose()
+        return now, fired
+
+    now, fired = asyncio.run(scenario())
+    assert len(fired) == 2
+    lateness = fired[-1] - (now + timedelta(milliseconds=250))
+    assert lateness < timedelta(milliseconds=200)
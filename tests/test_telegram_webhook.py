@@ -0,0 +1,75 @@
+import asyncio
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from datetime import datetime
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.types import Chat, Message
+from app.config import settings
+from src import bot as telegram_bot
+
+
+class RecordingSession(BaseSession):
+    """Вместо Bot API запоминает вызовы sendMessage."""
+
+    def __init__(self):
+        super().__init__()
+        self.sent = []
+
+    async def make_request(self, bot, method, timeout=None):
+        self.sent.append((method.chat_id, method.text))
+        return Message(message_id=len(self.sent), date=datetime.now(), chat=Chat(id=method.chat_id, type="private"), text=method.text)
+
+    async def stream_content(self, *args, **kwargs):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+def _update(update_id: int, user_id: int, text: str) -> dict:
+    user = {"id": user_id, "is_bot": False, "first_name": "Test"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id, "date": 1735689600, "text": text,
+            "chat": {"id": user_id, "type": "private"}, "from": user,
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}],
+        },
+    }
+
+
+def test_webhook_feeds_dispatcher_with_in_process_api(api, monkeypatch, tmp_path):
+    session = RecordingSession()
+    monkeypatch.setattr(settings, "telegram_webhook_secret", "s3cret")
+    monkeypatch.setattr(telegram_bot, "_bot", Bot(token="123:abc", session=session))
+    monkeypatch.setattr(telegram_bot, "token_store", telegram_bot.TokenStore(tmp_path / "tokens.json"))
+    monkeypatch.setattr(telegram_bot, "api", None)
+
+    async def scenario(client):
+        headers = await api.login(client, "tg@example.com")
+        code = (await client.post("/telegram/link/start", headers=headers)).json()["code"]
+        await telegram_bot.start_webhook(api.app)
+
+        secret = {"X-Telegram-Bot-Api-Secret-Token": "s3cret"}
+        denied = await client.post("/telegram/webhook", json=_update(1, 42, "/myevents"),
+                                   headers={"X-Telegram-Bot-Api-Secret-Token": "wrong"})
+        updates = [_update(2, 42, f"/link {code}"), _update(3, 99, "/myevents")]
+        statuses = [(await client.post("/telegram/webhook", json=u, headers=secret)).status_code for u in updates]
+        # апдейты обрабатываются в фоне: ждём привязку перед следующей командой
+        await asyncio.gather(*telegram_bot._updates)
+        await client.post("/telegram/webhook", json=_update(4, 42, "/addevent 2030-01-01 10:00 Demo"), headers=secret)
+        await telegram_bot.stop_webhook()
+        events = (await client.get("/events/", headers=headers)).json()
+        return denied.status_code, statuses, events
+
+    denied, statuses, events = api.run(scenario)
+    assert denied == 403
+    assert statuses == [200, 200]
+    assert sorted(session.sent) == [
+        (42, "✅ Account linked!"),
+        (42, "✅ Event added for 2030-01-01 10:00"),
+        (99, "❗ Сначала привяжите аккаунт командой /link <code>"),
+    ]
+    assert [e["title"] for e in events] == ["Demo"]
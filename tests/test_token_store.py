@@ -0,0 +1,44 @@
+import asyncio
+import base64
+import json
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.token_store import TokenStore, token_expires_at
+
+
+def _jwt(exp: float) -> str:
+    payload = base64.urlsafe_b64encode(json.dumps({"sub": "a@example.com", "exp": exp}).encode()).decode().rstrip("=")
+    return f"header.{payload}.signature"
+
+
+def test_writes_are_debounced_and_atomic(tmp_path, monkeypatch):
+    path = tmp_path / "tokens.json"
+    path.write_text(json.dumps({"1": "old"}), encoding="utf-8")
+    writes = []
+
+    async def scenario():
+        store = TokenStore(path, flush_delay=0.05)
+        original = store._write
+        monkeypatch.setattr(store, "_write", lambda snapshot: (writes.append(snapshot), original(snapshot)))
+        assert store.get("1") == "old"
+        for i in range(100):
+            store.set(str(i), f"t{i}")
+        await asyncio.sleep(0.2)
+        store.set("late", "x")
+        await store.close()
+
+    asyncio.run(scenario())
+    assert len(writes) == 2
+    saved = json.loads(path.read_text(encoding="utf-8"))
+    assert saved["1"] == "t1" and saved["late"] == "x" and len(saved) == 101
+    assert not (tmp_path / "tokens.json.tmp").exists()
+
+
+def test_expiry_is_read_locally():
+    store = TokenStore("unused.json", refresh_margin=60)
+    assert token_expires_at(_jwt(1000)) == 1000
+    assert store.is_fresh(_jwt(1000), now=900)
+    assert not store.is_fresh(_jwt(1000), now=950)
+    assert store.is_fresh("not-a-jwt")
+    assert not store.is_fresh(None)